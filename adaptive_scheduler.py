@@ -0,0 +1,176 @@
+"""
+Volatility-adaptive refresh scheduling.
+
+Instead of polling every symbol on a fixed interval, AdaptiveScheduler picks
+each symbol's cadence from:
+
+- realized volatility: an EWMA of squared log returns between observations,
+  normalised to the base interval, so a market moving twice as fast as
+  target_volatility is polled twice as often;
+- open positions: symbols the bot holds are polled position_factor times faster;
+- interest: symbols many users watch are polled faster (logarithmically).
+
+Intervals are clamped to [min_interval, max_interval]. When the combined
+request rate of all symbols would exceed an exchange's budget, every interval
+is stretched by the same factor so the budget holds.
+
+get_state()/restore_state() round-trip the scheduler through JSON, so
+processes that take turns refreshing (e.g. Celery workers) can share it.
+"""
+import math
+import time
+
+# Requests per minute each source is allowed to receive from one process
+DEFAULT_BUDGETS = {
+    'coingecko': 30,
+    'binance': 600,
+    'coinbase': 300,
+    'kraken': 60,
+    'kucoin': 300,
+    'okx': 300,
+    'bybit': 300,
+}
+
+
+class AdaptiveScheduler:
+    """Per-symbol refresh intervals driven by volatility, positions and interest."""
+
+    def __init__(self, base_interval=300, min_interval=15, max_interval=900, target_volatility=0.005,
+                 alpha=0.2, position_factor=0.5, interest_weight=0.5, budgets=None, sources=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_volatility = target_volatility
+        self.alpha = alpha
+        self.position_factor = position_factor
+        self.interest_weight = interest_weight
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        # Sources hit by one refresh of a symbol; defaults to every budgeted source
+        self.sources = list(sources) if sources is not None else list(self.budgets)
+        self._last = {}
+        self._variance = {}
+        self._positions = set()
+        self._interest = {}
+        self._intervals = {}
+        self._next_due = {}
+
+    # --- Inputs --------------------------------------------------------------
+
+    def observe(self, symbol, value, timestamp=None):
+        """Record a price (or any positive series) observation for symbol."""
+        if not value or value <= 0:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        last = self._last.get(symbol)
+        self._last[symbol] = (timestamp, value)
+        if last is None:
+            return
+        dt = timestamp - last[0]
+        if dt <= 0:
+            return
+        # Squared log return scaled to one base interval
+        r2 = math.log(value / last[1]) ** 2 * self.base_interval / dt
+        prev = self._variance.get(symbol)
+        self._variance[symbol] = r2 if prev is None else self.alpha * r2 + (1 - self.alpha) * prev
+        self._intervals.pop(symbol, None)
+
+    def set_position(self, symbol, is_open):
+        if is_open:
+            self._positions.add(symbol)
+        else:
+            self._positions.discard(symbol)
+        self._intervals.pop(symbol, None)
+
+    def set_interest(self, symbol, watchers):
+        self._interest[symbol] = max(0, watchers)
+        self._intervals.pop(symbol, None)
+
+    def forget(self, symbol):
+        for table in (self._last, self._variance, self._interest, self._intervals, self._next_due):
+            table.pop(symbol, None)
+        self._positions.discard(symbol)
+
+    # --- State ---------------------------------------------------------------
+
+    def get_state(self):
+        """JSON-serializable observations, positions, interest and due times."""
+        return {
+            'last': {s: list(obs) for s, obs in self._last.items()},
+            'variance': dict(self._variance),
+            'positions': sorted(self._positions),
+            'interest': dict(self._interest),
+            'next_due': dict(self._next_due),
+        }
+
+    def restore_state(self, state):
+        self._last = {s: tuple(obs) for s, obs in state.get('last', {}).items()}
+        self._variance = dict(state.get('variance', {}))
+        self._positions = set(state.get('positions', []))
+        self._interest = dict(state.get('interest', {}))
+        self._next_due = dict(state.get('next_due', {}))
+        self._intervals = {}
+
+    # --- Outputs -------------------------------------------------------------
+
+    def volatility(self, symbol):
+        """EWMA realized volatility per base interval, or None before two observations."""
+        variance = self._variance.get(symbol)
+        return math.sqrt(variance) if variance is not None else None
+
+    def _desired_interval(self, symbol):
+        interval = self._intervals.get(symbol)
+        if interval is not None:
+            return interval
+        interval = float(self.base_interval)
+        vol = self.volatility(symbol)
+        if vol is not None:
+            interval *= self.target_volatility / max(vol, 1e-9)
+        if symbol in self._positions:
+            interval *= self.position_factor
+        watchers = self._interest.get(symbol, 0)
+        if watchers:
+            interval /= 1 + self.interest_weight * math.log1p(watchers)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        self._intervals[symbol] = interval
+        return interval
+
+    def budget_scale(self):
+        """Factor (>= 1) every interval must be stretched by to stay within the budgets."""
+        symbols = set(self._last) | set(self._positions) | set(self._interest)
+        if not symbols:
+            return 1.0
+        rate = sum(60.0 / self._desired_interval(s) for s in symbols)  # refreshes per minute
+        scale = 1.0
+        for source in self.sources:
+            budget = self.budgets.get(source)
+            if budget:
+                scale = max(scale, rate / budget)
+        return scale
+
+    def interval(self, symbol):
+        """Seconds until symbol should be refreshed again."""
+        return self._desired_interval(symbol) * self.budget_scale()
+
+    def due(self, symbol, now=None):
+        """True if symbol has never been refreshed or its interval has elapsed."""
+        now = time.time() if now is None else now
+        return now >= self._next_due.get(symbol, 0.0)
+
+    def mark_refreshed(self, symbol, now=None):
+        """Record a refresh and return the delay until the next one."""
+        now = time.time() if now is None else now
+        delay = self.interval(symbol)
+        self._next_due[symbol] = now + delay
+        return delay
+
+    def snapshot(self):
+        scale = self.budget_scale()
+        return {
+            symbol: {
+                'interval': self._desired_interval(symbol) * scale,
+                'volatility': self.volatility(symbol),
+                'open_position': symbol in self._positions,
+                'watchers': self._interest.get(symbol, 0),
+            }
+            for symbol in set(self._last) | set(self._positions) | set(self._interest)
+        }
@@ -1,63 +1,232 @@
-from fetch_volume import fetch_all_historical, calculate_rsi, fetch_price_history
-
-
-def backtest_volume_spike(coin, days=30, spike_threshold=2.0, buy_amount=100):
-    hist = fetch_all_historical(coin.upper(), days)
-    price_hist = fetch_price_history(coin, days)
-    if not hist or not price_hist:
-        print('Not enough data for backtest.')
-        return
-    cash = 1000
-    position = 0
-    trades = []
-    for i in range(2, len(price_hist)):
-        vols = [h[i] for h in hist.values() if len(h) > i]
-        if not vols:
-            continue
-        avg_vol = sum(vols[:-1]) / len(vols[:-1]) if len(vols) > 1 else 0
-        if avg_vol == 0:
-            continue
-        spike = vols[-1] / avg_vol
-        price = price_hist[i]
-        if spike > spike_threshold and cash >= buy_amount:
-            qty = buy_amount / price
-            position += qty
-            cash -= buy_amount
-            trades.append(('BUY', i, price, qty))
-        elif position > 0 and spike < 1.0:
-            cash += position * price
-            trades.append(('SELL', i, price, position))
-            position = 0
-    final_value = cash + position * price_hist[-1]
-    returns = (final_value - 1000) / 1000 * 100
-    print(f'Backtest (Volume Spike): {coin.upper()}')
-    print(f'Trades: {len(trades)}, Final Value: ${final_value:.2f}, Return: {returns:.2f}%')
-    for t in trades:
-        print(f'{t[0]} at day {t[1]}: price={t[2]:.2f}, qty={t[3]:.4f}')
-
-def backtest_rsi(coin, days=30, buy_amount=100):
-    price_hist = fetch_price_history(coin, days)
-    if not price_hist or len(price_hist) < 15:
-        print('Not enough data for backtest.')
-        return
-    cash = 1000
-    position = 0
-    trades = []
-    for i in range(15, len(price_hist)):
-        rsi = calculate_rsi(price_hist[max(0, i-14):i+1])
-        price = price_hist[i]
-        if rsi and rsi < 30 and cash >= buy_amount:
-            qty = buy_amount / price
-            position += qty
-            cash -= buy_amount
-            trades.append(('BUY', i, price, qty))
-        elif rsi and rsi > 70 and position > 0:
-            cash += position * price
-            trades.append(('SELL', i, price, position))
-            position = 0
-    final_value = cash + position * price_hist[-1]
-    returns = (final_value - 1000) / 1000 * 100
-    print(f'Backtest (RSI): {coin.upper()}')
-    print(f'Trades: {len(trades)}, Final Value: ${final_value:.2f}, Return: {returns:.2f}%')
-    for t in trades:
-        print(f'{t[0]} at day {t[1]}: price={t[2]:.2f}, qty={t[3]:.4f}') 
\ No newline at end of file
+"""
+Backtests of the volume spike and RSI signals with fixed-size buys.
+
+Both strategies buy buy_amount dollars of the coin on every entry signal while
+cash lasts and sell the whole position on an exit signal. The indicators are
+computed in one pass over aligned price/volume arrays (Wilder RSI, volume over
+its trailing average), and run_signals() settles the orders one round trip at a
+time instead of bar by bar, so minute bars backtest as fast as daily ones.
+
+Results are dicts of trades, the equity curve and metrics; print_backtest()
+prints one. The indicator functions are shared with advanced_backtest.py.
+"""
+import numpy as np
+import pandas as pd
+
+from fetch_volume import fetch_all_historical, fetch_price_history
+
+# Crypto trades every day of the year
+DAYS_PER_YEAR = 365
+
+
+def wilder_rsi(prices, period=14):
+    """RSI with Wilder's smoothing of gains and losses; NaN for the first period bars.
+
+    The averages start as the simple mean of the first period changes and
+    then decay by 1/period per bar, as in Wilder's definition.
+    """
+    prices = np.asarray(prices, dtype=float)
+    rsi = np.full(len(prices), np.nan)
+    if len(prices) <= period:
+        return rsi
+    delta = np.diff(prices)
+
+    def smoothed(values):
+        seeded = np.concatenate([[values[:period].mean()], values[period:]])
+        return pd.Series(seeded).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+    gain, loss = smoothed(np.clip(delta, 0, None)), smoothed(np.clip(-delta, 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[period:] = 100 - 100 / (1 + gain / loss)
+    # No losses: fully overbought, or neutral if the price did not move at all
+    rsi[period:] = np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), rsi[period:])
+    return rsi
+
+
+def macd_lines(prices, fast=12, slow=26, signal=9):
+    """(MACD, signal line) arrays from exponential moving averages."""
+    series = pd.Series(np.asarray(prices, dtype=float))
+    macd = series.ewm(span=fast, adjust=False).mean() - series.ewm(span=slow, adjust=False).mean()
+    return macd.to_numpy(), macd.ewm(span=signal, adjust=False).mean().to_numpy()
+
+
+def volume_ratio(volume, window=20):
+    """Each bar's volume over the mean of up to window previous bars; NaN without two previous bars."""
+    volume = np.asarray(volume, dtype=float)
+    total = np.concatenate([[0.0], np.cumsum(volume)])
+    bars = np.arange(len(volume))
+    count = np.minimum(bars, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = (total[bars] - total[bars - count]) / count
+        return np.where((count >= 2) & (average > 0), volume / average, np.nan)
+
+
+def rsi_signals(prices, period=14, oversold=30, overbought=70):
+    """(entries, exits): RSI below oversold, RSI above overbought."""
+    rsi = wilder_rsi(prices, period)
+    return rsi < oversold, rsi > overbought
+
+
+def volume_spike_signals(volume, spike_threshold=2.0, window=20):
+    """(entries, exits): volume above spike_threshold x its trailing average, volume below the average."""
+    ratio = volume_ratio(volume, window)
+    return ratio > spike_threshold, ratio < 1.0
+
+
+def macd_signals(prices, fast=12, slow=26, signal=9):
+    """(entries, exits): MACD crossing above its signal line, crossing below it."""
+    macd, line = macd_lines(prices, fast, slow, signal)
+    above = macd > line
+    previous = np.concatenate([[False], above[:-1]])
+    return above & ~previous, ~above & previous
+
+
+def run_signals(prices, entries, exits, buy_amount=100, initial_cash=1000, bars_per_year=DAYS_PER_YEAR):
+    """Settle fixed-size buys and sell-everything exits on aligned signal arrays.
+
+    A bar that has both signals buys if there is cash and sells otherwise.
+    Returns bar indices of the buys and sells, the cash/quantity/equity curves
+    and metrics.
+    """
+    prices = np.asarray(prices, dtype=float)
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool)
+    n = len(prices)
+    entry_bars = np.flatnonzero(entries)
+    exit_only = np.flatnonzero(exits & ~entries)
+    exit_and_entry = np.flatnonzero(exits & entries)
+    # Quantity bought by consecutive entry bars, as a prefix sum
+    bought = np.concatenate([[0.0], np.cumsum(buy_amount / prices[entry_bars])]) if buy_amount > 0 else None
+
+    cash = float(initial_cash)
+    buys, sell_bars, costs, proceeds = [], [], [], []
+    start = 0
+    while bought is not None and cash >= buy_amount:
+        j = np.searchsorted(entry_bars, start)
+        if j == len(entry_bars):
+            break
+        max_buys = int(cash // buy_amount)
+        first = entry_bars[j]
+        last = entry_bars[min(j + max_buys, len(entry_bars)) - 1]
+        # Exit on the first exit-only bar, or on a bar with both signals once cash has run out
+        i = np.searchsorted(exit_only, first, side='right')
+        k = np.searchsorted(exit_and_entry, last, side='right')
+        end = min(exit_only[i] if i < len(exit_only) else n,
+                  exit_and_entry[k] if k < len(exit_and_entry) else n)
+        count = min(max_buys, np.searchsorted(entry_bars, end) - j)
+        buys.append(entry_bars[j:j + count])
+        cash -= count * buy_amount
+        if end == n:
+            break
+        sell_bars.append(end)
+        costs.append(count * buy_amount)
+        proceeds.append((bought[j + count] - bought[j]) * prices[end])
+        cash += proceeds[-1]
+        start = end + 1
+
+    buy_bars = np.concatenate(buys) if buys else np.empty(0, dtype=int)
+    sell_bars = np.asarray(sell_bars, dtype=int)
+    cash_flow = np.zeros(n)
+    cash_flow[buy_bars] -= buy_amount
+    cash_flow[sell_bars] += proceeds
+    cash_curve = initial_cash + np.cumsum(cash_flow)
+    quantity = np.zeros(n)
+    quantity[buy_bars] = buy_amount / prices[buy_bars]
+    held = np.cumsum(quantity)
+    sold = np.zeros(n)
+    sold[sell_bars] = held[sell_bars]
+    # held only grows, so the last sell's level is a running maximum
+    quantity = held - np.maximum.accumulate(sold)
+    equity = cash_curve + quantity * prices
+
+    returns = equity[1:] / equity[:-1] - 1 if n > 1 else np.empty(0)
+    std = returns.std() if len(returns) else 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1 if n else equity
+    final_value = float(equity[-1]) if n else float(initial_cash)
+    wins = np.asarray(proceeds) > np.asarray(costs)
+    return {
+        'buy_bars': buy_bars,
+        'sell_bars': sell_bars,
+        'cash': cash_curve,
+        'quantity': quantity,
+        'equity': equity,
+        'drawdown': drawdown,
+        'final_value': final_value,
+        'total_return': final_value / initial_cash - 1,
+        'sharpe_ratio': float(returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()) if n else 0.0,
+        'exposure': float(np.mean(quantity > 0)) if n else 0.0,
+        'buy_trades': len(buy_bars),
+        'sell_trades': len(sell_bars),
+        'num_trades': len(buy_bars) + len(sell_bars),
+        'win_rate': float(wins.mean()) if len(wins) else 0.0,
+    }
+
+
+def _trades(result, prices, buy_amount):
+    """Buys and sells of a run_signals() result as dicts, in bar order."""
+    trades = [('BUY', bar, buy_amount / prices[bar]) for bar in result['buy_bars'].tolist()]
+    # A sell closes the quantity held at the bar before it
+    trades += [('SELL', bar, result['quantity'][bar - 1]) for bar in result['sell_bars'].tolist()]
+    return [{'side': side, 'bar': bar, 'price': float(prices[bar]), 'qty': float(qty)}
+            for side, bar, qty in sorted(trades, key=lambda t: t[1])]
+
+
+def _result(coin, strategy, prices, signals, buy_amount, initial_cash, bars_per_year):
+    result = run_signals(prices, *signals, buy_amount=buy_amount, initial_cash=initial_cash,
+                         bars_per_year=bars_per_year)
+    result.update(coin=coin.lower(), strategy=strategy, bars=len(prices), trades=_trades(result, prices, buy_amount))
+    return result
+
+
+def fetch_bars(coin, days=30):
+    """(prices, volume) of coin's last days, aligned on their most recent bars; volume is the exchanges' total."""
+    prices = fetch_price_history(coin, days) or []
+    series = [h for h in (fetch_all_historical(coin.upper(), days) or {}).values() if h]
+    common = min((len(h) for h in series), default=0)
+    volume = np.sum([h[len(h) - common:] for h in series], axis=0) if common else []
+    return _aligned(prices, volume)
+
+
+def _aligned(prices, volume):
+    n = min(len(prices), len(volume))
+    return np.asarray(prices, dtype=float)[len(prices) - n:], np.asarray(volume, dtype=float)[len(volume) - n:]
+
+
+def backtest_volume_spike(coin, days=30, spike_threshold=2.0, buy_amount=100, window=20, prices=None, volume=None,
+                          initial_cash=1000, bars_per_year=DAYS_PER_YEAR):
+    """Volume spike backtest of coin; returns a run_signals() result with trades, or None without data.
+
+    Volume is the coin's total across exchanges. prices and volume may be
+    passed in (e.g. minute bars); they are aligned on their most recent bars.
+    """
+    if prices is None or volume is None:
+        fetched = fetch_bars(coin, days)
+        prices = fetched[0] if prices is None else prices
+        volume = fetched[1] if volume is None else volume
+    prices, volume = _aligned(prices, volume)
+    if len(prices) < 3:
+        return None
+    return _result(coin, 'volume_spike', prices, volume_spike_signals(volume, spike_threshold, window),
+                   buy_amount, initial_cash, bars_per_year)
+
+
+def backtest_rsi(coin, days=30, buy_amount=100, period=14, oversold=30, overbought=70, prices=None,
+                 initial_cash=1000, bars_per_year=DAYS_PER_YEAR):
+    """RSI backtest of coin; returns a run_signals() result with trades, or None without data."""
+    if prices is None:
+        prices = fetch_price_history(coin, days)
+    if prices is None or len(prices) <= period:
+        return None
+    prices = np.asarray(prices, dtype=float)
+    return _result(coin, 'rsi', prices, rsi_signals(prices, period, oversold, overbought),
+                   buy_amount, initial_cash, bars_per_year)
+
+
+def print_backtest(result):
+    names = {'volume_spike': 'Volume Spike', 'rsi': 'RSI'}
+    print(f"Backtest ({names.get(result['strategy'], result['strategy'])}): {result['coin'].upper()}")
+    print(f"Trades: {result['num_trades']}, Final Value: ${result['final_value']:.2f}, "
+          f"Return: {result['total_return'] * 100:.2f}%, Max Drawdown: {result['max_drawdown'] * 100:.2f}%")
+    for t in result['trades']:
+        print(f"{t['side']} at bar {t['bar']}: price={t['price']:.2f}, qty={t['qty']:.4f}")
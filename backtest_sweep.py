@@ -0,0 +1,258 @@
+"""
+Parallel parameter sweeps of the backtest strategies.
+
+sweep() backtests every combination of a parameter grid per strategy (RSI,
+volume spike, MACD; see backtest.py) on every coin and returns them ranked.
+Each coin's price and volume arrays are copied once into shared memory, and a
+process pool attaches to them instead of receiving copies with every task.
+Combinations are batched so a batch shares its indicator: every worker caches
+indicator arrays by (coin, indicator parameters), so e.g. the RSI of one period
+is computed once and only the threshold comparisons and order settlement run
+per combination. Tens of thousands of combinations over years of daily bars
+take minutes on one machine.
+
+iter_sweep() yields result rows as batches finish (sweep() can also append
+them to a CSV while it runs); heatmap() pivots a result table over two
+parameters and writes it as an interactive chart.
+"""
+import csv
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import DAYS_PER_YEAR, fetch_bars, macd_lines, run_signals, volume_ratio, wilder_rsi
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRIDS = {
+    'rsi': {
+        'period': [7, 14, 21],
+        'oversold': [20, 25, 30, 35, 40],
+        'overbought': [60, 65, 70, 75, 80],
+        'buy_amount': [50, 100, 200, 500],
+    },
+    'volume_spike': {
+        'window': [10, 20, 30, 50],
+        'spike_threshold': [1.25, 1.5, 2.0, 2.5, 3.0, 4.0],
+        'buy_amount': [50, 100, 200, 500],
+    },
+    'macd': {
+        'fast': [8, 12, 16],
+        'slow': [21, 26, 34],
+        'signal': [5, 9, 12],
+        'buy_amount': [50, 100, 200, 500],
+    },
+}
+
+# Parameters an indicator array depends on; the rest only threshold or size it
+INDICATOR_PARAMS = {
+    'rsi': ('period',),
+    'volume_spike': ('window',),
+    'macd': ('fast', 'slow', 'signal'),
+}
+
+HEATMAP_AXES = {
+    'rsi': ('oversold', 'overbought'),
+    'volume_spike': ('window', 'spike_threshold'),
+    'macd': ('fast', 'slow'),
+}
+
+METRICS = ('final_value', 'total_return', 'sharpe_ratio', 'max_drawdown', 'exposure', 'num_trades', 'win_rate')
+
+
+def combinations(grid):
+    """Every parameter dict of a {name: [values]} grid; MACD combinations need fast < slow."""
+    names = sorted(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    return [c for c in combos if c.get('fast', 0) < c.get('slow', np.inf)]
+
+
+# --- Workers -----------------------------------------------------------------
+
+_market = {}
+_segments = []
+
+
+def _attach(layout):
+    """Pool initializer: map every coin's shared (2, n) price/volume block."""
+    for coin, (name, n) in layout.items():
+        segment = shared_memory.SharedMemory(name=name)
+        _segments.append(segment)
+        _market[coin] = np.ndarray((2, n), dtype=float, buffer=segment.buf)
+
+
+def _compute_indicator(strategy, prices, volume, key):
+    if strategy == 'rsi':
+        return wilder_rsi(prices, *key)
+    if strategy == 'volume_spike':
+        return volume_ratio(volume, *key)
+    macd, signal = macd_lines(prices, *key)
+    return macd - signal
+
+
+@lru_cache(maxsize=64)
+def _indicator(coin, strategy, key):
+    return _compute_indicator(strategy, *_market[coin], key)
+
+
+def _signals(strategy, indicator, params):
+    if strategy == 'rsi':
+        return indicator < params['oversold'], indicator > params['overbought']
+    if strategy == 'volume_spike':
+        return indicator > params['spike_threshold'], indicator < 1.0
+    above = indicator > 0
+    previous = np.concatenate([[False], above[:-1]])
+    return above & ~previous, ~above & previous
+
+
+def strategy_signals(strategy, prices, volume, params):
+    """(entries, exits) of one parameter combination of strategy on price/volume arrays."""
+    key = tuple(params[p] for p in INDICATOR_PARAMS[strategy])
+    return _signals(strategy, _compute_indicator(strategy, prices, volume, key), params)
+
+
+def _run_batch(coin, strategy, batch, initial_cash, bars_per_year):
+    """Worker: result rows of batch (parameter dicts sharing one indicator) on coin."""
+    key = tuple(batch[0][p] for p in INDICATOR_PARAMS[strategy])
+    indicator = _indicator(coin, strategy, key)
+    prices = _market[coin][0]
+    rows = []
+    for params in batch:
+        result = run_signals(prices, *_signals(strategy, indicator, params), buy_amount=params['buy_amount'],
+                             initial_cash=initial_cash, bars_per_year=bars_per_year)
+        rows.append(dict(params, coin=coin, strategy=strategy, **{m: result[m] for m in METRICS}))
+    return rows
+
+
+# --- Running -----------------------------------------------------------------
+
+def load_market(coins, days=365):
+    """{coin: (prices, volume)} for every coin with data."""
+    market = {}
+    for coin in coins:
+        try:
+            prices, volume = fetch_bars(coin, days)
+        except Exception as e:
+            logger.error(f"[sweep] could not load {coin}: {e}")
+            continue
+        if len(prices) >= 3:
+            market[coin.lower()] = (prices, volume)
+    return market
+
+
+def _batches(market, grids, chunk_size):
+    for strategy, grid in grids.items():
+        combos = combinations(grid)
+        combos.sort(key=lambda c: tuple(c[p] for p in INDICATOR_PARAMS[strategy]))
+        for _, group in itertools.groupby(combos, key=lambda c: tuple(c[p] for p in INDICATOR_PARAMS[strategy])):
+            group = list(group)
+            for coin in market:
+                for i in range(0, len(group), chunk_size):
+                    yield coin, strategy, group[i:i + chunk_size]
+
+
+def iter_sweep(market, grids=None, workers=None, chunk_size=256, initial_cash=1000, bars_per_year=DAYS_PER_YEAR):
+    """Yield one result row per (coin, strategy, parameter combination) as batches complete.
+
+    market is {coin: (prices, volume)}; grids is {strategy: {param: [values]}}
+    (default DEFAULT_GRIDS). Rows hold the parameters, coin, strategy and
+    METRICS.
+    """
+    grids = DEFAULT_GRIDS if grids is None else grids
+    unknown = set(grids) - set(INDICATOR_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown strategies: {sorted(unknown)}")
+    segments, layout = [], {}
+    try:
+        for coin, (prices, volume) in market.items():
+            block = np.vstack([np.asarray(prices, dtype=float), np.asarray(volume, dtype=float)])
+            segment = shared_memory.SharedMemory(create=True, size=max(block.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(block.shape, dtype=float, buffer=segment.buf)[:] = block
+            layout[coin] = (segment.name, block.shape[1])
+
+        workers = max(1, workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(layout,)) as pool:
+            futures = {pool.submit(_run_batch, coin, strategy, batch, initial_cash, bars_per_year): (coin, strategy)
+                       for coin, strategy, batch in _batches(market, grids, chunk_size)}
+            for future in as_completed(futures):
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.warning(f"[sweep] {futures[future][1]} batch failed for {futures[future][0]}: {e}")
+                    continue
+                yield from rows
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def rank(table, by='sharpe_ratio', ascending=False):
+    """Result table sorted best first by one metric, with a 1-based rank column."""
+    table = table.sort_values(by, ascending=ascending, kind='stable').reset_index(drop=True)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table
+
+
+def sweep(market, grids=None, workers=None, chunk_size=256, rank_by='sharpe_ratio', output=None,
+          initial_cash=1000, bars_per_year=DAYS_PER_YEAR):
+    """Run iter_sweep() and return its rows as a ranked DataFrame.
+
+    With output, rows are also appended to that CSV as they arrive, so a long
+    sweep can be followed (or salvaged) while it runs.
+    """
+    started = time.perf_counter()
+    grids = DEFAULT_GRIDS if grids is None else grids
+    fields = ['coin', 'strategy'] + sorted({p for grid in grids.values() for p in grid}) + list(METRICS)
+    rows, handle = [], None
+    try:
+        if output:
+            handle = open(output, 'w', newline='')
+            writer = csv.DictWriter(handle, fieldnames=fields, restval='')
+            writer.writeheader()
+        for row in iter_sweep(market, grids, workers, chunk_size, initial_cash, bars_per_year):
+            rows.append(row)
+            if handle is not None:
+                writer.writerow(row)
+    finally:
+        if handle is not None:
+            handle.close()
+    logger.info(f"[sweep] {len(rows)} backtests in {time.perf_counter() - started:.1f}s")
+    return rank(pd.DataFrame(rows), rank_by) if rows else pd.DataFrame()
+
+
+def heatmap(table, x, y, value='sharpe_ratio', path=None, title=None):
+    """Best value per (x, y) cell over every other parameter; written as HTML if path is given.
+
+    Returns the pivot table (y values as rows, x values as columns).
+    """
+    pivot = table.pivot_table(index=y, columns=x, values=value, aggfunc='max')
+    if path:
+        import plotly.graph_objects as go
+
+        fig = go.Figure(go.Heatmap(z=pivot.to_numpy(), x=[str(c) for c in pivot.columns],
+                                   y=[str(i) for i in pivot.index], colorbar={'title': value}))
+        fig.update_layout(title=title or f"Best {value} by {x} and {y}", xaxis_title=x, yaxis_title=y)
+        fig.write_html(path)
+    return pivot
+
+
+def print_sweep(table, top=10):
+    if table.empty:
+        print('No sweep results.')
+        return
+    for (coin, strategy), group in table.groupby(['coin', 'strategy'], sort=True):
+        print(f"\n{coin.upper()} {strategy}: {len(group)} combinations")
+        for _, row in group.head(top).iterrows():
+            params = ' '.join(f"{p}={row[p]:g}" for p in DEFAULT_GRIDS.get(strategy, {})
+                              if p in row and pd.notna(row[p]))
+            print(f"  #{row['rank']:<6} sharpe {row['sharpe_ratio']:6.2f}  return {row['total_return'] * 100:7.2f}%  "
+                  f"max dd {row['max_drawdown'] * 100:6.2f}%  trades {int(row['num_trades']):4d}  {params}")
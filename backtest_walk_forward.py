@@ -0,0 +1,217 @@
+"""
+Walk-forward optimization of the backtest strategies.
+
+A parameter set picked by one in-sample sweep is fitted to the noise of that
+sample. walk_forward_optimize() instead cuts a coin's bars into folds: the
+parameters are optimized by a sweep (backtest_sweep.py) over a training
+window, then traded on the next test_bars bars, which the optimization never
+saw. The windows roll (or, anchored, expand) by test_bars, and the test
+windows' equity curves are stitched into one out-of-sample equity curve, each
+window starting with the cash the previous one ended with. A position still
+open at the end of a test window is valued at its last close.
+
+The training sweeps of every coin and fold run together on one process pool.
+Each fold's optimization and its out-of-sample result are cached on disk,
+keyed by a hash of the bars they depend on and of the parameters, so
+re-running after more bars have been appended only computes the new folds.
+Given the absolute number of the last bar (its day, say), fold boundaries are
+aligned to it rather than to the first bar, so a trailing window that has moved
+forward still reuses the optimization of every fold it fully covers.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backtest import DAYS_PER_YEAR, run_signals
+from backtest_sweep import DEFAULT_GRIDS, METRICS, combinations, iter_sweep, strategy_signals
+
+logger = logging.getLogger(__name__)
+
+
+class FoldCache:
+    """JSON results by key, in memory and (with a directory) on disk."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._entries = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    entry = self._entries[key] = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+        self.stats['hits' if entry is not None else 'misses'] += 1
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f, default=float)
+            os.replace(tmp_path, self._path(key))
+
+
+def _key(kind, digest, **params):
+    text = json.dumps(dict(params, kind=kind, data=digest), sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def _digest(block, start, end):
+    return hashlib.sha256(np.ascontiguousarray(block[:, start:end]).tobytes()).hexdigest()
+
+
+def folds(n_bars, train_bars, test_bars, anchored=False, first_bar=None):
+    """(train_start, train_end, test_end) of every fold; test windows are [train_end, test_end).
+
+    With first_bar, the absolute number of bar 0, test windows start on
+    multiples of test_bars counted in absolute bars instead of right after the
+    first training window.
+    """
+    found = []
+    train_end = train_bars
+    if first_bar is not None:
+        train_end += -(first_bar + train_bars) % test_bars
+    while train_end + test_bars <= n_bars:
+        found.append((0 if anchored else train_end - train_bars, train_end, train_end + test_bars))
+        train_end += test_bars
+    return found
+
+
+def walk_forward_optimize(market, strategy='rsi', grid=None, train_bars=180, test_bars=30, anchored=False,
+                          rank_by='sharpe_ratio', workers=None, cache=None, initial_cash=1000,
+                          bars_per_year=DAYS_PER_YEAR, last_bar=None):
+    """Walk-forward optimize strategy on every coin of market ({coin: (prices, volume)}).
+
+    Each training window picks the grid combination (default
+    DEFAULT_GRIDS[strategy]) with the highest rank_by. cache is a FoldCache or
+    a cache directory. Returns {coin: result}; a result holds the folds (windows,
+    chosen parameters, in- and out-of-sample metrics), the stitched
+    out-of-sample equity curve from bar test_start on and its metrics, and how
+    many folds had to be optimized rather than read from the cache. Coins too
+    short for one fold are left out. last_bar is the absolute number (e.g. the
+    day ordinal) of every coin's last bar; see folds().
+    """
+    started = time.perf_counter()
+    grid = DEFAULT_GRIDS[strategy] if grid is None else grid
+    if not combinations(grid):
+        raise ValueError(f"empty {strategy} parameter grid")
+    cache = cache if isinstance(cache, FoldCache) else FoldCache(cache)
+    settings = dict(strategy=strategy, grid=grid, rank_by=rank_by, initial_cash=initial_cash,
+                    bars_per_year=bars_per_year)
+
+    blocks = {coin: np.vstack([np.asarray(prices, dtype=float), np.asarray(volume, dtype=float)])
+              for coin, (prices, volume) in market.items()}
+    plans = {coin: folds(block.shape[1], train_bars, test_bars, anchored,
+                         None if last_bar is None else last_bar - block.shape[1] + 1)
+             for coin, block in blocks.items()}
+
+    # Optimize every training window that is not cached, all in one sweep
+    optimized, pending = {}, {}
+    for coin, plan in plans.items():
+        for train_start, train_end, _ in plan:
+            key = _key('train', _digest(blocks[coin], train_start, train_end), **settings)
+            entry = cache.get(key)
+            if entry is None:
+                pending[f"{coin}:{train_start}:{train_end}"] = (key, coin, train_start, train_end)
+            else:
+                optimized[(coin, train_start, train_end)] = entry
+    if pending:
+        windows = {name: tuple(blocks[coin][:, start:end]) for name, (_, coin, start, end) in pending.items()}
+        names = sorted(grid)
+        best = {}
+        for row in iter_sweep(windows, {strategy: grid}, workers, initial_cash=initial_cash,
+                              bars_per_year=bars_per_year):
+            current = best.get(row['coin'])
+            # Rows arrive in completion order; ties (e.g. every no-trade combination) go to the
+            # smallest parameters so the choice does not depend on worker timing
+            if current is None or row[rank_by] > current[rank_by] or (
+                    row[rank_by] == current[rank_by]
+                    and tuple(row[p] for p in names) < tuple(current[p] for p in names)):
+                best[row['coin']] = row
+        for name, (key, coin, start, end) in pending.items():
+            row = best.get(name)
+            if row is None:
+                raise RuntimeError(f"no {strategy} backtest of {name} succeeded")
+            entry = {'params': {p: row[p] for p in grid}, 'train': {m: row[m] for m in METRICS}}
+            cache.put(key, entry)
+            optimized[(coin, start, end)] = entry
+
+    results = {}
+    for coin, plan in plans.items():
+        if not plan:
+            continue
+        block = blocks[coin]
+        cash, curves, fold_results = float(initial_cash), [], []
+        # The out-of-sample result depends on every bar up to the end of its window
+        prefix = hashlib.sha256()
+        hashed = 0
+        for train_start, train_end, test_end in plan:
+            prefix.update(np.ascontiguousarray(block[:, hashed:test_end]).tobytes())
+            hashed = test_end
+            entry = optimized[(coin, train_start, train_end)]
+            key = _key('test', prefix.copy().hexdigest(), train_end=train_end, params=entry['params'],
+                       cash=cash, **settings)
+            test = cache.get(key)
+            if test is None:
+                prices, volume = block[:, :test_end]
+                entries, exits = strategy_signals(strategy, prices, volume, entry['params'])
+                outcome = run_signals(prices[train_end:], entries[train_end:], exits[train_end:],
+                                      buy_amount=entry['params']['buy_amount'], initial_cash=cash,
+                                      bars_per_year=bars_per_year)
+                test = dict({m: outcome[m] for m in METRICS}, equity=outcome['equity'].tolist())
+                cache.put(key, test)
+            curves.append(np.asarray(test['equity']))
+            fold_results.append({
+                'train_start': train_start,
+                'train_end': train_end,
+                'test_end': test_end,
+                'params': entry['params'],
+                'train': entry['train'],
+                'test': {m: test[m] for m in METRICS},
+            })
+            cash = test['final_value']
+        equity = np.concatenate(curves)
+        returns = equity[1:] / equity[:-1] - 1
+        std = returns.std()
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+        results[coin] = {
+            'strategy': strategy,
+            'folds': fold_results,
+            'test_start': plan[0][1],
+            'equity': equity,
+            'final_value': float(equity[-1]),
+            'total_return': float(equity[-1] / initial_cash - 1),
+            'sharpe_ratio': float(returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0,
+            'max_drawdown': float(drawdown.min()),
+            'num_trades': int(sum(f['test']['num_trades'] for f in fold_results)),
+            'optimized_folds': sum(1 for _, c, _, _ in pending.values() if c == coin),
+        }
+    logger.info(f"[walk-forward] {sum(len(p) for p in plans.values())} folds, {len(pending)} optimized, "
+                f"{time.perf_counter() - started:.1f}s")
+    return results
+
+
+def print_walk_forward(results):
+    for coin, result in sorted(results.items()):
+        print(f"\n{coin.upper()} {result['strategy']} walk-forward: {len(result['folds'])} folds, "
+              f"out-of-sample return {result['total_return'] * 100:.2f}%, sharpe {result['sharpe_ratio']:.2f}, "
+              f"max dd {result['max_drawdown'] * 100:.2f}%, trades {result['num_trades']}")
+        for fold in result['folds']:
+            params = ' '.join(f"{p}={v:g}" for p, v in fold['params'].items())
+            print(f"  bars {fold['train_end']:>6}-{fold['test_end']:<6} "
+                  f"in-sample sharpe {fold['train']['sharpe_ratio']:6.2f}  "
+                  f"out-of-sample return {fold['test']['total_return'] * 100:7.2f}%  {params}")
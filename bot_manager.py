@@ -0,0 +1,198 @@
+"""
+Multi-coin orchestration for the trading bot.
+
+BotManager runs the AdvancedTradingBot strategies for many coins concurrently on
+one event loop. All coins trade against a single bot instance, so they share its
+portfolio and risk book, and every market data request goes through one shared
+MarketDataHub. Each coin runs in its own supervised task that is restarted with
+exponential backoff if it crashes. Event loop lag and per-stage iteration
+latency are reported by status(), and the latency histograms can be written
+periodically to a Prometheus textfile.
+"""
+import asyncio
+import logging
+import os
+
+from market_data import MarketDataHub
+from trading_bot import AdvancedTradingBot
+
+logger = logging.getLogger(__name__)
+
+
+class BotManager:
+    """Supervise per-coin strategy tasks that share one portfolio."""
+
+    def __init__(self, strategy_config, coins=None, demo_mode=True, market_data=None,
+                 max_restarts=5, restart_backoff=5.0, max_backoff=300.0, stagger=0.0,
+                 metrics_path=None, metrics_interval=15.0):
+        self.market_data = market_data if market_data is not None else MarketDataHub()
+        self.bot = AdvancedTradingBot(strategy_config, demo_mode=demo_mode, market_data=self.market_data)
+        self.coins = []
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.stagger = stagger
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._metrics_task = None
+        self.tasks = {}
+        self.restart_counts = {}
+        self.consecutive_failures = {}
+        self.iterations = {}
+        self.last_errors = {}
+        self.failed = set()
+        for coin in coins or []:
+            self._register(coin)
+
+    @property
+    def is_running(self):
+        return self.bot.is_running
+
+    def _register(self, coin):
+        coin = coin.lower()
+        if coin not in self.coins:
+            self.coins.append(coin)
+            self.restart_counts.setdefault(coin, 0)
+            self.consecutive_failures.setdefault(coin, 0)
+            self.iterations.setdefault(coin, 0)
+        return coin
+
+    async def _run_coin(self, coin):
+        while self.is_running:
+            delay = await self.bot.run_strategy_iteration(coin)
+            self.iterations[coin] += 1
+            self.consecutive_failures[coin] = 0
+            await asyncio.sleep(delay)
+
+    async def _supervise(self, coin, initial_delay=0.0):
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+        while self.is_running:
+            try:
+                await self._run_coin(coin)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.restart_counts[coin] += 1
+                self.consecutive_failures[coin] += 1
+                self.last_errors[coin] = str(e)
+                failures = self.consecutive_failures[coin]
+                if failures > self.max_restarts:
+                    logger.error(f"[BotManager] {coin} failed {failures} times in a row; giving up: {e}")
+                    self.failed.add(coin)
+                    return
+                backoff = min(self.restart_backoff * 2 ** (failures - 1), self.max_backoff)
+                logger.warning(f"[BotManager] {coin} crashed ({e}); restarting in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+
+    def _spawn(self, coin, initial_delay=0.0):
+        self.failed.discard(coin)
+        self.consecutive_failures[coin] = 0
+        task = asyncio.create_task(self._supervise(coin, initial_delay))
+        self.tasks[coin] = task
+        return task
+
+    def add_coin(self, coin):
+        """Start trading a coin; takes effect immediately if the manager is running."""
+        coin = self._register(coin)
+        task = self.tasks.get(coin)
+        if self.is_running and (task is None or task.done()):
+            self._spawn(coin)
+        return coin
+
+    def remove_coin(self, coin):
+        """Stop trading a coin. Open positions are left untouched."""
+        coin = coin.lower()
+        if coin in self.coins:
+            self.coins.remove(coin)
+        task = self.tasks.pop(coin, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def write_metrics(self):
+        """Atomically write the bot's latency histograms to metrics_path."""
+        tmp_path = f"{self.metrics_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.bot.export_metrics())
+        os.replace(tmp_path, self.metrics_path)
+
+    async def _export_metrics(self):
+        while self.is_running:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                self.write_metrics()
+            except OSError as e:
+                logger.warning(f"[BotManager] Failed to write metrics to {self.metrics_path}: {e}")
+
+    def start(self, resume=False):
+        """Spawn one supervised task per coin. Must be called from a running event loop.
+
+        With resume=True the shared bot first restores its latest checkpoint.
+        """
+        if resume:
+            self.bot.resume_from_checkpoint()
+        self.bot.is_running = True
+        self.bot.loop_monitor.start()
+        if self.metrics_path:
+            self._metrics_task = asyncio.create_task(self._export_metrics())
+        print(f"Starting trading bot manager for {len(self.coins)} coins: {', '.join(c.upper() for c in self.coins)}")
+        for i, coin in enumerate(self.coins):
+            self._spawn(coin, initial_delay=i * self.stagger)
+        return list(self.tasks.values())
+
+    async def run(self, duration=None, resume=False):
+        """Start all coins and wait until they finish, or stop after duration seconds."""
+        tasks = self.start(resume=resume)
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            else:
+                await asyncio.wait(tasks, timeout=duration)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Cancel every coin task, checkpoint the bot and release the shared market data session."""
+        self.bot.is_running = False
+        tasks = [t for t in self.tasks.values() if not t.done()]
+        if self._metrics_task is not None and not self._metrics_task.done():
+            tasks.append(self._metrics_task)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.bot.close()
+        self.bot.save_checkpoint()
+        if self.metrics_path:
+            self.write_metrics()
+        close = getattr(self.market_data, 'close', None)
+        if close is not None:
+            await close()
+
+    def status(self):
+        """Per-coin supervision state plus the shared portfolio value."""
+        coins = {}
+        for coin in self.coins:
+            task = self.tasks.get(coin)
+            if coin in self.failed:
+                state = 'failed'
+            elif task is not None and not task.done():
+                state = 'running'
+            else:
+                state = 'stopped'
+            coins[coin] = {
+                'state': state,
+                'iterations': self.iterations.get(coin, 0),
+                'restarts': self.restart_counts.get(coin, 0),
+                'last_error': self.last_errors.get(coin),
+            }
+        return {
+            'running': self.is_running,
+            'coins': coins,
+            'portfolio_value': self.bot.get_portfolio_value(),
+            'loop_lag': self.bot.loop_monitor.snapshot(),
+            'latency': self.bot.timings.summary(),
+            'market_data': dict(getattr(self.market_data, 'stats', {})),
+            'schedule': self.bot.scheduler.snapshot() if self.bot.scheduler is not None else None,
+        }
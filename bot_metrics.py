@@ -0,0 +1,139 @@
+"""
+Runtime metrics for the trading bot.
+
+LoopLagMonitor measures event loop responsiveness: it repeatedly sleeps for a
+fixed interval and records how late it wakes up. Anything that blocks the loop
+(synchronous HTTP, model training, heavy pandas work) shows up directly as lag.
+
+StageTimer records how long each stage of a bot iteration takes (data fetches,
+indicators, ML inference, risk checks, order routing). Percentiles come from a
+recent window of samples; cumulative histogram buckets are kept for export in
+the Prometheus text format.
+"""
+import asyncio
+import bisect
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class LoopLagMonitor:
+    """Sample event loop scheduling lag in a background task."""
+
+    def __init__(self, interval=0.1, window=600, enabled=True):
+        self.interval = interval
+        self.enabled = enabled
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.total_samples = 0
+        self._task = None
+
+    def start(self):
+        """Start sampling on the running loop. Safe to call more than once."""
+        if not self.enabled:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - expected))
+
+    def record(self, lag):
+        self.samples.append(lag)
+        self.total_samples += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def snapshot(self):
+        """Lag statistics in milliseconds over the recent window."""
+        if not self.samples:
+            return {'samples': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        values = np.fromiter(self.samples, dtype=float) * 1000
+        return {
+            'samples': self.total_samples,
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p99_ms': float(np.percentile(values, 99)),
+            'max_ms': self.max_lag * 1000,
+        }
+
+
+# Histogram bucket upper bounds in seconds (1ms .. 30s)
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageTimer:
+    """Per-stage latency histograms with windowed percentiles."""
+
+    def __init__(self, window=1000, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.window = window
+        self.buckets = tuple(buckets)
+        self._samples = {}
+        self._bucket_counts = {}
+        self._counts = {}
+        self._sums = {}
+        self._max = {}
+
+    @contextmanager
+    def time(self, stage):
+        """Time the enclosed block (including any awaits) under stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+            self._bucket_counts[stage] = [0] * (len(self.buckets) + 1)
+            self._counts[stage] = 0
+            self._sums[stage] = 0.0
+            self._max[stage] = 0.0
+        samples.append(seconds)
+        self._bucket_counts[stage][bisect.bisect_left(self.buckets, seconds)] += 1
+        self._counts[stage] += 1
+        self._sums[stage] += seconds
+        if seconds > self._max[stage]:
+            self._max[stage] = seconds
+
+    def summary(self):
+        """p50/p95/p99 in milliseconds per stage over the recent window."""
+        result = {}
+        for stage, samples in sorted(self._samples.items()):
+            values = np.fromiter(samples, dtype=float) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[stage] = {
+                'count': self._counts[stage],
+                'mean_ms': float(values.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': self._max[stage] * 1000,
+            }
+        return result
+
+    def prometheus(self, name='trading_bot_stage_latency_seconds'):
+        """Cumulative histograms in the Prometheus text exposition format."""
+        lines = [f'# HELP {name} Trading bot iteration stage latency.', f'# TYPE {name} histogram']
+        for stage in sorted(self._samples):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._bucket_counts[stage]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {self._counts[stage]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {self._sums[stage]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {self._counts[stage]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,93 @@
+"""
+Atomic state checkpoints for the trading bot.
+
+A checkpoint is a single pickle holding everything a bot needs to resume
+trading quickly: portfolio, risk counters, trained models and scalers, and the
+cached market history. Files are written to a temporary name, fsynced and then
+renamed into place, so a crash mid-write never leaves a truncated checkpoint.
+Only the newest few checkpoints are kept.
+"""
+import os
+import pickle
+import tempfile
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+class BotCheckpointer:
+    """Periodically persist and restore bot state."""
+
+    def __init__(self, directory='checkpoints', interval=300, keep=3):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.last_saved = time.monotonic()
+
+    def _checkpoints(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [n for n in os.listdir(self.directory) if n.startswith('checkpoint-') and n.endswith('.pkl')]
+        return [os.path.join(self.directory, n) for n in sorted(names, reverse=True)]
+
+    def save(self, state):
+        """Atomically write state and prune old checkpoints. Returns the file path."""
+        os.makedirs(self.directory, exist_ok=True)
+        state = dict(state, checkpoint_version=CHECKPOINT_VERSION, saved_at=time.time())
+        path = os.path.join(self.directory, f"checkpoint-{time.time_ns():020d}.pkl")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.checkpoint-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.last_saved = time.monotonic()
+
+        for old in self._checkpoints()[self.keep:]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+    def due(self):
+        """True when interval seconds have passed since the last save (or since startup)."""
+        return time.monotonic() - self.last_saved >= self.interval
+
+    def maybe_save(self, get_state):
+        """Save get_state() if a checkpoint is due.
+
+        Failures are logged, not raised, and the next attempt waits another
+        interval, so an unwritable directory never stops the bot.
+        """
+        if not self.due():
+            return None
+        try:
+            return self.save(get_state())
+        except Exception as e:
+            self.last_saved = time.monotonic()
+            logger.error(f"[Checkpoint] Failed to save checkpoint: {e}")
+            return None
+
+    def load_latest(self):
+        """Newest readable checkpoint, or None. Falls back to older files if one is corrupt."""
+        for path in self._checkpoints():
+            try:
+                with open(path, 'rb') as f:
+                    state = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"[Checkpoint] Skipping unreadable checkpoint {path}: {e}")
+                continue
+            if state.get('checkpoint_version') != CHECKPOINT_VERSION:
+                logger.warning(f"[Checkpoint] Skipping {path}: unsupported version {state.get('checkpoint_version')}")
+                continue
+            return state
+        return None
@@ -7,13 +7,22 @@ from fetch_volume import (
     fetch_market_dominance
 )
 from trading_bot import TradingBot, create_strategy_config
+from bot_manager import BotManager
+from replay import RecordedMarketFeed, run_replay
+from ml_training import train_many, print_training_summary
+from model_tuning import tune, print_tuning_summary
+from ml_predictions import CryptoPricePredictor
+import os
 import requests
 import csv
 import asyncio
 import websockets
 import json
-from backtest import backtest_volume_spike, backtest_rsi
-from utils import format_currency, format_large_number
+from datetime import datetime, timezone
+from backtest import backtest_volume_spike, backtest_rsi, print_backtest
+from backtest_sweep import DEFAULT_GRIDS, HEATMAP_AXES, heatmap, load_market, print_sweep, sweep
+from backtest_walk_forward import print_walk_forward, walk_forward_optimize
+from utils import data_path, format_currency, format_large_number
 
 def fetch_price(symbol):
     url = f'https://api.coingecko.com/api/v3/simple/price?ids={symbol.lower()}&vs_currencies=usd'
@@ -65,8 +74,31 @@ def main():
     parser.add_argument('--dominance', action='store_true', help='Show market dominance data')
     parser.add_argument('--live', action='store_true', help='Stream real-time price/volume updates (Binance only)')
     parser.add_argument('--bot', action='store_true', help='Start automated trading bot (DEMO MODE)')
+    parser.add_argument('--bot-coins', type=str, help='Comma-separated coins to trade concurrently with one shared portfolio (DEMO MODE)')
+    parser.add_argument('--metrics-file', type=str, help='Write trading bot stage latency histograms to this Prometheus textfile')
+    parser.add_argument('--replay', type=str, help='Replay the trading bot in virtual time against a recorded CSV feed (timestamp,coin,price[,volume])')
+    parser.add_argument('--replay-start', type=str, help='Replay start time (ISO-8601 or epoch seconds)')
+    parser.add_argument('--replay-end', type=str, help='Replay end time (ISO-8601 or epoch seconds)')
+    parser.add_argument('--resume', action='store_true', help='Resume the trading bot from its latest checkpoint')
     parser.add_argument('--bot-strategy', type=str, choices=['volume_spike', 'rsi', 'price_alerts', 'all'], default='all', help='Trading strategy to use')
+    parser.add_argument('--train-models', type=str, help='Comma-separated coins to (re)train ML prediction models for in parallel')
+    parser.add_argument('--train-days', type=int, default=180, help='Days of history to train on (default: 180)')
+    parser.add_argument('--train-workers', type=int, help='Maximum training processes (default: all CPUs)')
+    parser.add_argument('--train-window', type=int, help='Rolling walk-forward window in rows (default: expanding)')
+    parser.add_argument('--tune-models', type=str, help='Comma-separated coins to tune RandomForest/GradientBoosting hyperparameters for (used by later trainings)')
+    parser.add_argument('--tune-candidates', type=int, default=27, help='Parameter candidates per model to start successive halving with (default: 27)')
+    parser.add_argument('--update-models', type=str, help='Comma-separated coins whose saved ML models to update with new days instead of retraining')
     parser.add_argument('--backtest', action='store_true', help='Run backtest on historical data')
+    parser.add_argument('--sweep', type=str, help='Comma-separated coins to backtest every strategy parameter combination on')
+    parser.add_argument('--sweep-strategies', type=str, default='rsi,volume_spike,macd', help='Comma-separated strategies to sweep (default: rsi,volume_spike,macd)')
+    parser.add_argument('--sweep-days', type=int, default=365, help='Days of history to sweep over (default: 365)')
+    parser.add_argument('--sweep-workers', type=int, help='Maximum sweep processes (default: all CPUs)')
+    parser.add_argument('--sweep-output', type=str, default='sweep_results.csv', help='CSV the ranked sweep results are written to; heatmaps go next to it')
+    parser.add_argument('--optimize', type=str, help='Comma-separated coins to walk-forward optimize a strategy on (uses --sweep-days/--sweep-workers)')
+    parser.add_argument('--optimize-strategy', type=str, choices=['rsi', 'volume_spike', 'macd'], default='rsi', help='Strategy to walk-forward optimize (default: rsi)')
+    parser.add_argument('--optimize-train', type=int, default=180, help='Bars each optimization window trains on (default: 180)')
+    parser.add_argument('--optimize-test', type=int, default=30, help='Out-of-sample bars traded after each window (default: 30)')
+    parser.add_argument('--optimize-cache', type=str, default=data_path('backtest_cache', 'BACKTEST_CACHE_DIR', legacy='backtest_cache'), help='Directory of cached walk-forward folds (default: $DATA_DIR/backtest_cache)')
     parser.add_argument('--backtest-strategy', type=str, choices=['volume_spike', 'rsi'], default='volume_spike', help='Backtest strategy to use')
     args = parser.parse_args()
 
@@ -107,17 +139,89 @@ def main():
             print('Error: --coin is required for backtesting')
             return
         if args.backtest_strategy == 'volume_spike':
-            backtest_volume_spike(args.coin)
-        elif args.backtest_strategy == 'rsi':
-            backtest_rsi(args.coin)
+            result = backtest_volume_spike(args.coin)
+        else:
+            result = backtest_rsi(args.coin)
+        if result is None:
+            print('Not enough data for backtest.')
+        else:
+            print_backtest(result)
+        return
+
+    if args.sweep:
+        coins = [c.strip() for c in args.sweep.split(',') if c.strip()]
+        strategies = [s.strip() for s in args.sweep_strategies.split(',') if s.strip()]
+        unknown = [s for s in strategies if s not in DEFAULT_GRIDS]
+        if unknown:
+            print(f"Error: unknown sweep strategies {', '.join(unknown)} (choose from {', '.join(DEFAULT_GRIDS)})")
+            return
+        market = load_market(coins, args.sweep_days)
+        if not market:
+            print('Not enough data for sweep.')
+            return
+        table = sweep(market, {s: DEFAULT_GRIDS[s] for s in strategies}, workers=args.sweep_workers,
+                      output=args.sweep_output)
+        table.to_csv(args.sweep_output, index=False)
+        print_sweep(table)
+        directory = os.path.dirname(args.sweep_output)
+        for (coin, strategy), group in table.groupby(['coin', 'strategy']):
+            path = os.path.join(directory, f"sweep_{coin}_{strategy}.html")
+            heatmap(group, *HEATMAP_AXES[strategy], path=path, title=f"{coin.upper()} {strategy}: best Sharpe ratio")
+        print(f"\nRanked results written to {args.sweep_output}")
+        return
+
+    if args.optimize:
+        coins = [c.strip() for c in args.optimize.split(',') if c.strip()]
+        market = load_market(coins, args.sweep_days)
+        # Daily bars end today; aligning the folds to dates keeps them cached as the window moves
+        results = walk_forward_optimize(market, args.optimize_strategy, train_bars=args.optimize_train,
+                                        test_bars=args.optimize_test, workers=args.sweep_workers,
+                                        cache=args.optimize_cache,
+                                        last_bar=datetime.now(timezone.utc).date().toordinal())
+        if not results:
+            print('Not enough data for walk-forward optimization.')
+            return
+        print_walk_forward(results)
+        return
+
+    if args.train_models:
+        coins = [c.strip() for c in args.train_models.split(',') if c.strip()]
+        summary = train_many(coins, days=args.train_days, cpu_budget=args.train_workers, window=args.train_window)
+        print_training_summary(summary)
+        return
+
+    if args.tune_models:
+        coins = [c.strip() for c in args.tune_models.split(',') if c.strip()]
+        summary = tune(coins, n_candidates=args.tune_candidates, days=args.train_days, cpu_budget=args.train_workers)
+        print_tuning_summary(summary)
+        return
+
+    if args.update_models:
+        predictor = CryptoPricePredictor()
+        for coin in [c.strip() for c in args.update_models.split(',') if c.strip()]:
+            if predictor.update_models(coin, days=args.train_days):
+                predictor.save_models(coin)
+        return
+
+    if args.bot and args.replay:
+        coins = [c.strip() for c in (args.bot_coins or args.coin or '').split(',') if c.strip()] or None
+        result = run_replay(RecordedMarketFeed.from_csv(args.replay), coins=coins,
+                            strategy_config=create_strategy_config(),
+                            start=args.replay_start, end=args.replay_end)
+        metrics = result['metrics']
+        print(f"\nReplayed {', '.join(c.upper() for c in result['coins'])} from {result['start']} to {result['end']}")
+        print(f"Simulated {result['simulated_seconds'] / 86400:.1f} days in {result['wall_seconds']:.1f}s")
+        print(f"Final portfolio value: {format_currency(metrics['portfolio_value'])}")
+        print(f"Total return: {metrics['total_return']:.2f}%  Max drawdown: {metrics['max_drawdown'] * 100:.2f}%")
+        print(f"Trades: {metrics['total_trades']}  Win rate: {metrics['win_rate'] * 100:.1f}%  Fees: {format_currency(metrics['fees'])}")
         return
 
     if args.bot:
-        if not args.coin:
-            print("Error: --coin is required when using --bot")
+        if not args.coin and not args.bot_coins:
+            print("Error: --coin or --bot-coins is required when using --bot")
             return
         
-        print(f"Starting trading bot for {args.coin} in DEMO MODE")
+        print(f"Starting trading bot for {args.bot_coins or args.coin} in DEMO MODE")
         print("WARNING: This is for educational purposes only. No real money will be traded.")
         
         config = create_strategy_config()
@@ -133,10 +237,19 @@ def main():
             config['volume_spike_enabled'] = False
             config['rsi_enabled'] = False
         
+        if args.bot_coins:
+            coins = [c.strip() for c in args.bot_coins.split(',') if c.strip()]
+            manager = BotManager(config, coins=coins, demo_mode=True, metrics_path=args.metrics_file)
+            try:
+                asyncio.run(manager.run(resume=args.resume))
+            except KeyboardInterrupt:
+                manager.bot.stop()
+            return
+        
         bot = TradingBot(config, demo_mode=True)
         
         try:
-            bot.start(args.coin)
+            bot.start(args.coin, resume=args.resume)
         except KeyboardInterrupt:
             bot.stop()
         return
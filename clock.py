@@ -0,0 +1,78 @@
+"""
+Clocks for the trading bot.
+
+The bot reads time through a clock object instead of calling datetime.now()
+directly. WallClock is the real thing. VirtualClock drives an asyncio event
+loop in simulated time: whenever every task is waiting on a timer, the loop
+jumps straight to the next deadline instead of sleeping, so unmodified code
+using asyncio.sleep runs as fast as the CPU allows and in a deterministic order.
+"""
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+class WallClock:
+    """Real time."""
+
+    def now(self):
+        return datetime.now()
+
+    def time(self):
+        return time.time()
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Executor that runs each call immediately in the submitting thread.
+
+    Used under a VirtualClock so run_in_executor work (model training, blocking
+    I/O) completes before simulated time moves on. Subclasses ThreadPoolExecutor
+    only so asyncio accepts it as a default executor; no threads are started.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class VirtualClock:
+    """Simulated time for an asyncio event loop, starting at start."""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else datetime(2024, 1, 1)
+        self.elapsed = 0.0
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def time(self):
+        return self.start.timestamp() + self.elapsed
+
+    def install(self, loop):
+        """Make loop run on this clock. Only selector-based loops are supported."""
+        select = loop._selector.select
+
+        def virtual_select(timeout=None):
+            # The loop only asks to block when nothing is ready; skip the wait
+            if timeout is not None and timeout > 0:
+                self.elapsed += timeout
+                timeout = 0
+            return select(timeout)
+
+        loop._selector.select = virtual_select
+        loop.time = lambda: self.elapsed
+        loop.set_default_executor(InlineExecutor())
+        return loop
+
+    def run(self, coro):
+        """Run coro to completion on a fresh event loop in virtual time."""
+        loop = self.install(asyncio.SelectorEventLoop())
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
@@ -11,6 +11,8 @@ except ImportError:
     pass
 from typing import Optional
 
+from utils import data_path
+
 
 class Config:
     """Application configuration class."""
@@ -23,6 +25,13 @@ class Config:
     
     # Database Configuration
     DATABASE_PATH: str = os.environ.get('DATABASE_PATH', 'users.db')
+    # Runtime data lives under DATA_DIR unless overridden one by one
+    DATA_DIR: str = os.environ.get('DATA_DIR', 'data')
+    BOT_JOURNAL_PATH: str = data_path('trade_journal.db', 'BOT_JOURNAL_PATH', legacy='trade_journal.db')
+    BOT_CHECKPOINT_DIR: str = data_path('checkpoints', 'BOT_CHECKPOINT_DIR', legacy='checkpoints')
+    FEATURE_STORE_DIR: str = data_path('feature_store', 'FEATURE_STORE_DIR', legacy='feature_store')
+    MODEL_DIR: str = data_path('models', 'MODEL_DIR', legacy='models')
+    BACKTEST_CACHE_DIR: str = data_path('backtest_cache', 'BACKTEST_CACHE_DIR', legacy='backtest_cache')
     
     # Redis Configuration
     REDIS_URL: str = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
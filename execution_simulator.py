@@ -0,0 +1,396 @@
+"""
+Paper-trading execution simulator.
+
+SimulatedExchange fills market, limit and stop orders against a per-coin order
+book instead of at the last traded price. Books are either synthetic (built
+around the current mid price with a configurable spread and depth profile) or
+recorded snapshots supplied by the caller. Fills walk the book level by level,
+consume liquidity, pay maker or taker fees, may be partial, and arrive after a
+configurable order latency.
+
+The simulator has no clock of its own: every call takes a timestamp, so the same
+code runs against the wall clock or a replayed feed.
+"""
+import heapq
+import random
+import time
+from itertools import count
+
+import numpy as np
+
+
+class Order:
+    """A simulated order and its running fill state."""
+
+    __slots__ = (
+        'order_id', 'coin', 'side', 'order_type', 'quantity', 'limit_price',
+        'stop_price', 'submitted_at', 'arrival', 'filled_quantity', 'notional',
+        'fees', 'status', 'meta',
+    )
+
+    def __init__(self, order_id, coin, side, order_type, quantity, limit_price=None,
+                 stop_price=None, submitted_at=0.0, arrival=0.0, meta=None):
+        self.order_id = order_id
+        self.coin = coin
+        self.side = side
+        self.order_type = order_type
+        self.quantity = quantity
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.submitted_at = submitted_at
+        self.arrival = arrival
+        self.filled_quantity = 0.0
+        self.notional = 0.0
+        self.fees = 0.0
+        self.status = 'pending'
+        self.meta = meta
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled_quantity
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled_quantity if self.filled_quantity else None
+
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'coin': self.coin,
+            'side': self.side,
+            'order_type': self.order_type,
+            'quantity': self.quantity,
+            'limit_price': self.limit_price,
+            'stop_price': self.stop_price,
+            'filled_quantity': self.filled_quantity,
+            'avg_price': self.avg_price,
+            'fees': self.fees,
+            'status': self.status,
+        }
+
+
+class Fill:
+    """One execution against the book."""
+
+    __slots__ = ('order_id', 'coin', 'side', 'quantity', 'price', 'fee', 'liquidity', 'timestamp')
+
+    def __init__(self, order_id, coin, side, quantity, price, fee, liquidity, timestamp):
+        self.order_id = order_id
+        self.coin = coin
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.fee = fee
+        self.liquidity = liquidity
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'coin': self.coin,
+            'side': self.side,
+            'quantity': self.quantity,
+            'price': self.price,
+            'fee': self.fee,
+            'liquidity': self.liquidity,
+            'timestamp': self.timestamp,
+        }
+
+
+class OrderBook:
+    """Price levels for one coin, best level first on each side."""
+
+    __slots__ = ('bid_px', 'bid_sz', 'ask_px', 'ask_sz', 'mid', 'timestamp')
+
+    def __init__(self, bid_px, bid_sz, ask_px, ask_sz, mid, timestamp):
+        self.bid_px = bid_px
+        self.bid_sz = bid_sz
+        self.ask_px = ask_px
+        self.ask_sz = ask_sz
+        self.mid = mid
+        self.timestamp = timestamp
+
+    @property
+    def best_bid(self):
+        live = np.nonzero(self.bid_sz > 0)[0]
+        return float(self.bid_px[live[0]]) if len(live) else None
+
+    @property
+    def best_ask(self):
+        live = np.nonzero(self.ask_sz > 0)[0]
+        return float(self.ask_px[live[0]]) if len(live) else None
+
+
+class SimulatedExchange:
+    """Order-book based fill simulator for demo trading and replay."""
+
+    ORDER_TYPES = ('market', 'limit', 'stop')
+
+    def __init__(self, maker_fee=0.001, taker_fee=0.001, latency=0.0, latency_jitter=0.0,
+                 levels=20, half_spread_bps=5.0, level_step_bps=5.0, depth_per_level=50000.0,
+                 depth_growth=0.25, on_fill=None, seed=None):
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.levels = levels
+        self.half_spread_bps = half_spread_bps
+        self.level_step_bps = level_step_bps
+        self.depth_per_level = depth_per_level
+        self.depth_growth = depth_growth
+        self.on_fill = on_fill
+        self._rng = random.Random(seed)
+        self._ids = count(1)
+        self._seq = count()
+        self._pending = []
+        self._resting = {}
+        self.books = {}
+        # Live (pending or resting) orders only; finished orders are dropped
+        self.orders = {}
+        self.stats = {'orders': 0, 'fills': 0, 'rejected': 0, 'volume': 0.0, 'fees': 0.0}
+
+        # Synthetic book shape is the same for every coin; only the mid changes
+        steps = np.arange(levels, dtype=float)
+        self._offsets = (half_spread_bps + steps * level_step_bps) / 10000.0
+        self._depth_notional = depth_per_level * (1.0 + steps * depth_growth)
+
+    # --- Market data -------------------------------------------------------
+
+    def update_market(self, coin, price, timestamp=None, release=True):
+        """Replace coin's book with a synthetic one centred on price.
+
+        Orders that arrive before timestamp are matched against the previous
+        book first; resting limit and stop orders are then checked against the
+        new one. Returns the fills produced. With release=False queued orders
+        are left for the next advance(), as when prices are polled and the new
+        quote is the first one an order can meet.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        fills = self.advance(timestamp) if release else []
+        bid_px = price * (1.0 - self._offsets)
+        ask_px = price * (1.0 + self._offsets)
+        self.books[coin] = OrderBook(
+            bid_px, self._depth_notional / bid_px, ask_px, self._depth_notional / ask_px, price, timestamp
+        )
+        fills.extend(self._check_resting(coin, timestamp))
+        return fills
+
+    def set_order_book(self, coin, bids, asks, timestamp=None):
+        """Install a recorded book snapshot given as (price, size) pairs."""
+        timestamp = time.time() if timestamp is None else timestamp
+        fills = self.advance(timestamp)
+        bids = sorted(bids, key=lambda level: -level[0])
+        asks = sorted(asks, key=lambda level: level[0])
+        bid_px = np.array([b[0] for b in bids], dtype=float)
+        bid_sz = np.array([b[1] for b in bids], dtype=float)
+        ask_px = np.array([a[0] for a in asks], dtype=float)
+        ask_sz = np.array([a[1] for a in asks], dtype=float)
+        if len(bid_px) and len(ask_px):
+            mid = (bid_px[0] + ask_px[0]) / 2
+        else:
+            mid = bid_px[0] if len(bid_px) else (ask_px[0] if len(ask_px) else None)
+        self.books[coin] = OrderBook(bid_px, bid_sz, ask_px, ask_sz, mid, timestamp)
+        fills.extend(self._check_resting(coin, timestamp))
+        return fills
+
+    def book_mid(self, coin):
+        book = self.books.get(coin)
+        return book.mid if book is not None else None
+
+    # --- Orders --------------------------------------------------------------
+
+    def submit_order(self, coin, side, quantity, order_type='market', limit_price=None,
+                     stop_price=None, timestamp=None, meta=None):
+        """Queue an order; it reaches the book after the configured latency."""
+        side = side.lower()
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Unknown order side: {side}")
+        if order_type not in self.ORDER_TYPES:
+            raise ValueError(f"Unknown order type: {order_type}")
+        if order_type == 'limit' and limit_price is None:
+            raise ValueError("Limit orders require limit_price")
+        if order_type == 'stop' and stop_price is None:
+            raise ValueError("Stop orders require stop_price")
+
+        timestamp = time.time() if timestamp is None else timestamp
+        latency = self.latency
+        if self.latency_jitter:
+            latency += self._rng.uniform(0, self.latency_jitter)
+        order = Order(next(self._ids), coin, side, order_type, float(quantity), limit_price,
+                      stop_price, timestamp, timestamp + latency, meta)
+        self.stats['orders'] += 1
+        if quantity <= 0:
+            order.status = 'rejected'
+            self.stats['rejected'] += 1
+            return order
+        self.orders[order.order_id] = order
+        heapq.heappush(self._pending, (order.arrival, next(self._seq), order))
+        return order
+
+    def cancel_order(self, order_id):
+        """Cancel a pending or resting order. Returns True if it was still live."""
+        order = self.orders.get(order_id)
+        if order is None or order.status not in ('pending', 'open', 'partially_filled'):
+            return False
+        resting = self._resting.get(order.coin)
+        if resting and order in resting:
+            resting.remove(order)
+        order.status = 'cancelled'
+        self.orders.pop(order_id, None)
+        return True
+
+    def advance(self, timestamp):
+        """Match every queued order whose arrival time is at or before timestamp."""
+        fills = []
+        pending = self._pending
+        while pending and pending[0][0] <= timestamp:
+            _, _, order = heapq.heappop(pending)
+            if order.status == 'pending':
+                fills.extend(self._on_arrival(order))
+        return fills
+
+    def flush(self):
+        """Match all queued orders against the current books, ignoring latency."""
+        fills = []
+        while self._pending:
+            _, _, order = heapq.heappop(self._pending)
+            if order.status == 'pending':
+                fills.extend(self._on_arrival(order))
+        return fills
+
+    def estimate_fill(self, coin, side, quantity, limit_price=None):
+        """Walk the book without consuming it. Returns (quantity, avg_price, taker_fee)."""
+        book = self.books.get(coin)
+        if book is None or quantity <= 0:
+            return 0.0, None, 0.0
+        px, sz = self._side_levels(book, side)
+        n = self._crossing_levels(px, side, limit_price)
+        qty, notional = self._walk(px, sz, quantity, n, consume=False)
+        if qty <= 0:
+            return 0.0, None, 0.0
+        return qty, notional / qty, notional * self.taker_fee
+
+    # --- Matching ------------------------------------------------------------
+
+    @staticmethod
+    def _side_levels(book, side):
+        # Buyers take from the asks, sellers from the bids
+        return (book.ask_px, book.ask_sz) if side == 'buy' else (book.bid_px, book.bid_sz)
+
+    @staticmethod
+    def _crossing_levels(px, side, limit_price):
+        if limit_price is None:
+            return len(px)
+        if side == 'buy':
+            return int(np.searchsorted(px, limit_price, side='right'))
+        return int(np.searchsorted(-px, -limit_price, side='right'))
+
+    @staticmethod
+    def _walk(px, sz, quantity, n_levels, consume=True):
+        if n_levels == 0:
+            return 0.0, 0.0
+        cum = np.cumsum(sz[:n_levels])
+        take = min(quantity, float(cum[-1]))
+        if take <= 0:
+            return 0.0, 0.0
+        k = int(np.searchsorted(cum, take))
+        prev = float(cum[k - 1]) if k else 0.0
+        notional = float(np.dot(px[:k], sz[:k])) + (take - prev) * float(px[k])
+        if consume:
+            if take >= cum[-1]:
+                sz[:n_levels] = 0.0
+            else:
+                sz[:k] = 0.0
+                sz[k] = max(float(sz[k]) - (take - prev), 0.0)
+        return take, notional
+
+    def _on_arrival(self, order):
+        fills = self._match_arrival(order)
+        if order.status not in ('open', 'partially_filled') or order.order_type == 'market':
+            self.orders.pop(order.order_id, None)
+        return fills
+
+    def _match_arrival(self, order):
+        book = self.books.get(order.coin)
+        if order.order_type == 'stop':
+            order.status = 'open'
+            self._resting.setdefault(order.coin, []).append(order)
+            return self._check_resting(order.coin, order.arrival) if book is not None else []
+        if book is None:
+            order.status = 'rejected'
+            self.stats['rejected'] += 1
+            return []
+
+        fills = self._take(order, book, order.limit_price, order.arrival)
+        if order.order_type == 'limit' and order.remaining > 1e-12:
+            order.status = 'partially_filled' if order.filled_quantity else 'open'
+            self._resting.setdefault(order.coin, []).append(order)
+        elif order.order_type == 'market':
+            # Market orders are immediate-or-cancel against available depth
+            if order.remaining <= 1e-12:
+                order.status = 'filled'
+            elif order.filled_quantity:
+                order.status = 'partially_filled'
+            else:
+                order.status = 'rejected'
+                self.stats['rejected'] += 1
+        else:
+            order.status = 'filled'
+        return fills
+
+    def _take(self, order, book, limit_price, timestamp):
+        px, sz = self._side_levels(book, order.side)
+        n = self._crossing_levels(px, order.side, limit_price)
+        qty, notional = self._walk(px, sz, order.remaining, n)
+        if qty <= 0:
+            return []
+        return [self._record_fill(order, qty, notional, 'taker', timestamp)]
+
+    def _check_resting(self, coin, timestamp):
+        resting = self._resting.get(coin)
+        book = self.books.get(coin)
+        if not resting or book is None:
+            return []
+        fills = []
+        still_resting = []
+        for order in resting:
+            if order.status not in ('open', 'partially_filled'):
+                continue
+            if order.order_type == 'stop':
+                triggered = (book.mid >= order.stop_price) if order.side == 'buy' else (book.mid <= order.stop_price)
+                if not triggered:
+                    still_resting.append(order)
+                    continue
+                fills.extend(self._take(order, book, None, timestamp))
+                order.status = 'filled' if order.remaining <= 1e-12 else (
+                    'partially_filled' if order.filled_quantity else 'rejected')
+                self.orders.pop(order.order_id, None)
+                continue
+
+            # Resting limit: filled at its own price by liquidity that crosses it
+            px, sz = self._side_levels(book, order.side)
+            n = self._crossing_levels(px, order.side, order.limit_price)
+            qty, _ = self._walk(px, sz, order.remaining, n)
+            if qty > 0:
+                fills.append(self._record_fill(order, qty, qty * order.limit_price, 'maker', timestamp))
+            if order.remaining > 1e-12:
+                order.status = 'partially_filled' if order.filled_quantity else 'open'
+                still_resting.append(order)
+            else:
+                order.status = 'filled'
+                self.orders.pop(order.order_id, None)
+        self._resting[coin] = still_resting
+        return fills
+
+    def _record_fill(self, order, qty, notional, liquidity, timestamp):
+        fee = notional * (self.maker_fee if liquidity == 'maker' else self.taker_fee)
+        order.filled_quantity += qty
+        order.notional += notional
+        order.fees += fee
+        fill = Fill(order.order_id, order.coin, order.side, qty, notional / qty, fee, liquidity, timestamp)
+        self.stats['fills'] += 1
+        self.stats['volume'] += notional
+        self.stats['fees'] += fee
+        if self.on_fill is not None:
+            self.on_fill(order, fill)
+        return fill
@@ -0,0 +1,208 @@
+"""
+Persisted per-coin feature store for the ML predictors.
+
+Each coin has a directory of flat binary column files (raw bars as float64,
+features and targets as float32) plus a meta.json describing them. New bars
+are appended: only their feature rows are computed, from a short warmup tail
+of earlier bars, so refreshing a coin costs O(new bars) rather than
+recomputing every indicator over the whole history. A newest bar that comes
+back with a different price or volume is rewritten, and bars that have not
+closed yet can be held back from the store. Training reads the
+columns as memory maps; inference reads just the last row.
+
+meta.json is rewritten (atomically) after the column files, so it is the
+source of truth: bytes past the recorded row count left by an interrupted
+append are truncated before the next write.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+STORE_VERSION = 1
+
+# Raw bars, kept apart from feature columns that may share a name (e.g. volume)
+RAW_COLUMNS = {'bar_date': 'int64', 'bar_price': 'float64', 'bar_volume': 'float64'}
+
+
+class FeatureStore:
+    """Append-only float32 feature columns per coin.
+
+    featurize(raw_df) must return one feature row per raw bar (NaN where a
+    row cannot be computed yet), given a DataFrame with date, price and volume
+    columns. Only the last warmup bars before new data are passed back to it.
+    """
+
+    def __init__(self, root, featurize, feature_names, warmup=200):
+        self.root = root
+        self.featurize = featurize
+        self.feature_names = list(feature_names)
+        self.warmup = warmup
+
+    # --- Layout --------------------------------------------------------------
+
+    def _dir(self, coin):
+        return os.path.join(self.root, coin.lower())
+
+    def _path(self, coin, column):
+        return os.path.join(self._dir(coin), f"{column}.bin")
+
+    def _dtypes(self):
+        dtypes = dict(RAW_COLUMNS)
+        dtypes.update({name: 'float32' for name in self.feature_names})
+        dtypes['target'] = 'float32'
+        return dtypes
+
+    def meta(self, coin):
+        """Stored metadata for coin, or None if the coin has no usable data."""
+        try:
+            with open(os.path.join(self._dir(coin), META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != STORE_VERSION or meta.get('feature_names') != self.feature_names:
+            return None
+        return meta
+
+    def _write_meta(self, coin, meta):
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir(coin), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self._dir(coin), META_FILE))
+
+    def _column(self, coin, column, rows, dtype):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(coin, column), dtype=dtype, mode='r', shape=(rows,))
+
+    # --- Writes --------------------------------------------------------------
+
+    def update(self, coin, bars, closed_before=None):
+        """Append bars newer than the stored ones. Returns the number of rows written.
+
+        bars is a DataFrame with date, price and volume columns, oldest first.
+        Bars reaching further back than the store rebuild it from scratch. If
+        the stored newest bar differs from its copy in bars, it is replaced
+        (and its features recomputed). Bars dated closed_before or later are
+        still forming and are not stored.
+        """
+        bars = bars[['date', 'price', 'volume']].copy()
+        bars['date'] = pd.to_datetime(bars['date']).dt.normalize()
+        if closed_before is not None:
+            bars = bars[bars['date'] < pd.Timestamp(closed_before).normalize()]
+        meta = self.meta(coin)
+        if meta and not bars.empty and bars['date'].iloc[0] < pd.Timestamp(meta['first_date']):
+            meta = None
+        rows = meta['rows'] if meta else 0
+        if meta:
+            last = pd.Timestamp(meta['last_date'])
+            bars = bars[bars['date'] >= last]
+            if not bars.empty and bars['date'].iloc[0] == last:
+                stored = (self._column(coin, 'bar_price', rows, 'float64')[-1],
+                          self._column(coin, 'bar_volume', rows, 'float64')[-1])
+                if (bars['price'].iloc[0], bars['volume'].iloc[0]) == stored:
+                    bars = bars.iloc[1:]
+                else:
+                    rows -= 1  # Revised since it was stored; rewrite it
+        if bars.empty:
+            return 0
+
+        dtypes = self._dtypes()
+        os.makedirs(self._dir(coin), exist_ok=True)
+        if meta is None:
+            for column in dtypes:
+                open(self._path(coin, column), 'wb').close()
+            history = bars.iloc[0:0]
+        else:
+            # Recompute the new rows' indicators from a short tail of stored bars
+            start = max(0, rows - self.warmup)
+            history = pd.DataFrame({
+                'date': self._column(coin, 'bar_date', rows, 'int64')[start:].astype('datetime64[ns]'),
+                'price': np.array(self._column(coin, 'bar_price', rows, 'float64')[start:]),
+                'volume': np.array(self._column(coin, 'bar_volume', rows, 'float64')[start:]),
+            })
+
+        frame = pd.concat([history, bars], ignore_index=True)
+        features = np.asarray(self.featurize(frame), dtype=np.float32)[len(history):]
+        new_prices = bars['price'].to_numpy(dtype=float)
+        # Each row's target is the next bar's price; the newest row has none yet
+        targets = np.append(new_prices[1:], np.nan).astype(np.float32)
+        new_columns = {
+            'bar_date': bars['date'].to_numpy(dtype='datetime64[ns]').astype('int64'),
+            'bar_price': new_prices,
+            'bar_volume': bars['volume'].to_numpy(dtype=float),
+            'target': targets,
+        }
+        for i, name in enumerate(self.feature_names):
+            new_columns[name] = features[:, i]
+
+        for column, dtype in dtypes.items():
+            path = self._path(coin, column)
+            with open(path, 'r+b') as f:
+                # Drop anything past the committed rows, e.g. from an interrupted append
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                if column == 'target' and rows:
+                    # The previous newest row now has a next bar
+                    f.seek(-np.dtype(dtype).itemsize, os.SEEK_END)
+                    f.write(np.float32(new_prices[0]).tobytes())
+                f.write(np.ascontiguousarray(new_columns[column], dtype=dtype).tobytes())
+
+        self._write_meta(coin, {
+            'version': STORE_VERSION,
+            'rows': rows + len(bars),
+            'first_date': meta['first_date'] if meta and rows else bars['date'].iloc[0].isoformat(),
+            'last_date': bars['date'].iloc[-1].isoformat(),
+            'feature_names': self.feature_names,
+        })
+        return len(bars)
+
+    # --- Reads ---------------------------------------------------------------
+
+    def training_matrix(self, coin, last=None, horizons=None):
+        """(X, y, dates) for rows with complete features and a known target.
+
+        last limits the result to the most recent rows of the store. With
+        horizons (bars ahead, e.g. [1, 2, 3]) y has one column per horizon,
+        the price that many bars later, and rows need every one of them.
+        """
+        meta = self.meta(coin)
+        if meta is None:
+            y_shape = (0, len(horizons)) if horizons else (0,)
+            return np.empty((0, len(self.feature_names)), dtype=np.float32), np.empty(y_shape, dtype=np.float32), []
+        rows = meta['rows']
+        start = max(0, rows - last) if last else 0
+        X = np.column_stack([self._column(coin, name, rows, 'float32')[start:] for name in self.feature_names])
+        if horizons:
+            y = self._horizon_targets(coin, rows, start, horizons)
+        else:
+            y = np.array(self._column(coin, 'target', rows, 'float32')[start:])
+        dates = self._column(coin, 'bar_date', rows, 'int64')[start:].astype('datetime64[ns]')
+        keep = ~np.isnan(X).any(axis=1) & ~np.isnan(y.reshape(len(y), -1)).any(axis=1)
+        return X[keep], y[keep], list(pd.to_datetime(dates[keep]))
+
+    def _horizon_targets(self, coin, rows, start, horizons):
+        prices = self._column(coin, 'bar_price', rows, 'float64')
+        idx = np.arange(start, rows)
+        y = np.full((len(idx), len(horizons)), np.nan, dtype=np.float32)
+        for j, h in enumerate(horizons):
+            known = idx + h < rows
+            y[known, j] = prices[idx[known] + h]
+        return y
+
+    def latest(self, coin):
+        """Newest feature row as a (1, n_features) float32 array plus its date and price, or None."""
+        meta = self.meta(coin)
+        if meta is None:
+            return None
+        rows = meta['rows']
+        vector = np.array([[self._column(coin, name, rows, 'float32')[-1] for name in self.feature_names]],
+                          dtype=np.float32)
+        return {
+            'features': vector,
+            'date': pd.Timestamp(meta['last_date']),
+            'price': float(self._column(coin, 'bar_price', rows, 'float64')[-1]),
+        }
@@ -0,0 +1,108 @@
+"""
+Micro-batching for model inference.
+
+Callers submit one key at a time (a coin, say) and get a Future back. A single
+worker thread waits for the first request, keeps collecting for up to
+max_delay seconds or until max_batch keys are queued, then makes one call to
+batch_fn with all of them. Concurrent requests arriving within a few
+milliseconds of each other therefore share one batched prediction, and the
+same key requested twice in a window is only computed once.
+
+Works from threads (Flask request handlers) via predict(), and from asyncio
+via asyncio.wrap_future(batcher.submit(key)).
+"""
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-key requests into calls of batch_fn(keys) -> {key: result}.
+
+    Keys missing from batch_fn's result resolve to None.
+    """
+
+    def __init__(self, batch_fn, max_batch=32, max_delay=0.005):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {'requests': 0, 'batches': 0, 'keys': 0, 'largest_batch': 0}
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, key):
+        """Queue key for the next batch; returns a Future of its result."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed')
+            self.stats['requests'] += 1
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+                self._cond.notify()
+            return future
+
+    def predict(self, key, timeout=None):
+        """Blocking submit."""
+        return self.submit(key).result(timeout)
+
+    def close(self):
+        """Stop the worker after the queued keys are served."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            # Give concurrent callers a moment to join this batch
+            deadline = time.monotonic() + self.max_delay
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            keys = list(self._pending)[:self.max_batch]
+            return {key: self._pending.pop(key) for key in keys}
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self.stats['batches'] += 1
+            self.stats['keys'] += len(batch)
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+            try:
+                results = self.batch_fn(list(batch))
+            except Exception as e:
+                logger.error(f"[MicroBatcher] batch of {len(batch)} failed: {e}")
+                for future in batch.values():
+                    future.set_exception(e)
+                continue
+            for key, future in batch.items():
+                future.set_result(results.get(key))
+
+
+_prediction_batcher = None
+_prediction_batcher_lock = threading.Lock()
+
+
+def get_prediction_batcher():
+    """Process-wide batcher serving CryptoPricePredictor.predict_many by coin, with every forecast horizon."""
+    global _prediction_batcher
+    with _prediction_batcher_lock:
+        if _prediction_batcher is None:
+            from ml_predictions import HORIZONS, CryptoPricePredictor
+            predictor = CryptoPricePredictor()
+            _prediction_batcher = MicroBatcher(functools.partial(predictor.predict_many, horizons=HORIZONS))
+        return _prediction_batcher
@@ -0,0 +1,131 @@
+"""
+Shared market data access for the trading bots.
+
+A single MarketDataHub is handed to every strategy running on the event loop.
+Results are cached for a short TTL and concurrent requests for the same key are
+coalesced into one HTTP call, so fifty coins polling the same exchanges cost
+one request per endpoint instead of fifty.
+"""
+import asyncio
+import time
+import logging
+
+import aiohttp
+
+from fetch_volume import fetch_all_volumes_async, fetch_all_historical_async
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_SIMPLE_PRICE_URL = 'https://api.coingecko.com/api/v3/simple/price'
+
+
+class MarketDataHub:
+    """Async, cached and request-coalescing market data source."""
+
+    def __init__(self, ttl=30, history_ttl=300, session=None):
+        self.ttl = ttl
+        self.history_ttl = history_ttl
+        self._session = session
+        self._owns_session = session is None
+        self._cache = {}
+        self._inflight = {}
+        self._last_prices = {}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0}
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        """Close the underlying HTTP session if the hub created it."""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _cached(self, key, ttl, fetch):
+        entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            self.stats['cache_hits'] += 1
+            return entry[1]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        self.stats['requests'] += 1
+        pending = asyncio.ensure_future(fetch())
+        self._inflight[key] = pending
+        try:
+            value = await pending
+        finally:
+            self._inflight.pop(key, None)
+
+        # Failed lookups are not cached so the next caller retries
+        if value:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+
+    async def get_price(self, coin):
+        """Latest USD price for a CoinGecko coin id, or None."""
+        coin = coin.lower()
+
+        async def fetch():
+            session = await self._get_session()
+            params = {'ids': coin, 'vs_currencies': 'usd'}
+            try:
+                async with session.get(COINGECKO_SIMPLE_PRICE_URL, params=params) as response:
+                    if response.status != 200:
+                        logger.error(f"[CoinGecko] Failed to fetch price for {coin}: HTTP {response.status}")
+                        return None
+                    data = await response.json()
+                return data.get(coin, {}).get('usd')
+            except Exception as e:
+                logger.error(f"[CoinGecko] Exception fetching price for {coin}: {e}")
+                return None
+
+        price = await self._cached(('price', coin), self.ttl, fetch)
+        if price:
+            self._last_prices[coin] = price
+        return price
+
+    async def get_volumes(self, symbol):
+        """24h volume per exchange, as returned by fetch_all_volumes."""
+        symbol = symbol.upper()
+
+        async def fetch():
+            session = await self._get_session()
+            return await fetch_all_volumes_async(symbol, session)
+
+        return await self._cached(('volumes', symbol), self.ttl, fetch)
+
+    async def get_historical(self, symbol, days=7):
+        """Daily history per exchange, as returned by fetch_all_historical."""
+        symbol = symbol.upper()
+
+        async def fetch():
+            session = await self._get_session()
+            return await fetch_all_historical_async(symbol, days, session)
+
+        return await self._cached(('historical', symbol, days), self.history_ttl, fetch)
+
+    def export_state(self):
+        """Cached histories and last prices, with their age, for checkpointing."""
+        now = time.monotonic()
+        history = {key: (now - fetched, value) for key, (fetched, value) in self._cache.items()
+                   if key[0] == 'historical'}
+        return {'history': history, 'last_prices': dict(self._last_prices), 'exported_at': time.time()}
+
+    def import_state(self, state):
+        """Seed the cache from export_state(); entries keep aging across the restart."""
+        downtime = max(0.0, time.time() - state.get('exported_at', time.time()))
+        now = time.monotonic()
+        for key, (age, value) in state.get('history', {}).items():
+            self._cache[key] = (now - age - downtime, value)
+        self._last_prices.update(state.get('last_prices', {}))
+
+    def last_price(self, coin):
+        """Most recent price seen for coin without any I/O, or None."""
+        return self._last_prices.get(coin.lower())
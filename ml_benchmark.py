@@ -0,0 +1,289 @@
+"""
+Performance benchmarks for the price prediction pipeline.
+
+run_benchmark() builds a synthetic market (geometric random walk prices with
+volume bursts, any length and number of coins) and measures:
+
+- prepare_features / feature store ingestion throughput (rows per second);
+- per-model train time, both a plain fit and walk-forward training;
+- single-row and batch inference latency of the served (compiled) models,
+  plus end-to-end predict_many for all coins, uncached and cached;
+- model load time from the registry, cold and from its cache;
+- peak Python-tracked memory (tracemalloc) of feature preparation, each
+  model's training and loading.
+
+Results are written as JSON together with the commit and library versions, so
+runs can be compared across commits; find_regressions() flags the timings and
+memory figures that grew beyond a tolerance. From the command line:
+
+    python ml_benchmark.py --days 730 --coins 5 --output bench.json --baseline main.json
+
+exits with status 1 when the run regressed against the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from ml_predictions import (FEATURE_NAMES, HORIZONS, MODEL_NAMES, CryptoPricePredictor, create_models,
+                            train_walk_forward)
+from ml_training import atomic_write_json
+from model_registry import ModelRegistry
+
+# Result keys holding costs, i.e. where larger is worse
+COST_SUFFIXES = ('_ms', '_seconds', '_mb')
+
+
+def synthetic_prices(days, seed=0, start_price=100.0, drift=0.0005, volatility=0.03, end=None):
+    """Daily date/price/volume bars: a geometric random walk with occasional volume bursts."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end if end is not None else datetime.now()).normalize()
+    returns = rng.normal(drift, volatility, days)
+    volume = rng.lognormal(13, 0.4, days)
+    bursts = rng.random(days) < 0.03
+    volume[bursts] *= rng.uniform(3, 8, bursts.sum())
+    return pd.DataFrame({
+        'date': pd.date_range(end=end, periods=days, freq='D'),
+        'price': start_price * np.exp(np.cumsum(returns)),
+        'volume': volume,
+    })
+
+
+def synthetic_market(n_coins, days, seed=0):
+    """{coin name: bars} for n_coins independent synthetic coins."""
+    rng = np.random.default_rng(seed)
+    return {
+        f"coin{i}": synthetic_prices(days, seed=seed + i, start_price=float(rng.uniform(0.5, 50000)),
+                                     volatility=float(rng.uniform(0.01, 0.06)))
+        for i in range(n_coins)
+    }
+
+
+def _timings(fn, repeat):
+    """Latency summary (milliseconds) of repeat calls to fn."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'p50_ms': float(np.median(samples)), 'p95_ms': float(np.percentile(samples, 95)),
+            'min_ms': float(np.min(samples))}
+
+
+def _peak_mb(fn):
+    """Peak memory allocated while running fn, in MB (tracemalloc; NumPy arrays included)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit or None,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmark(days=730, n_coins=5, repeat=50, batch_size=256, models=None, walk_forward=True, seed=0,
+                  output=None):
+    """Run every benchmark on a synthetic market and return (and optionally save) the results."""
+    models = list(models or MODEL_NAMES)
+    market = synthetic_market(n_coins, days, seed)
+    coins = list(market)
+    scratch = tempfile.mkdtemp(prefix='ml-benchmark-')
+    try:
+        predictor = CryptoPricePredictor(feature_store_dir=os.path.join(scratch, 'features'),
+                                         model_dir=os.path.join(scratch, 'models'))
+        predictor.load_bars = lambda coin, days: market[coin]
+        results = {'environment': _environment(),
+                   'config': {'days': days, 'coins': n_coins, 'repeat': repeat, 'batch_size': batch_size,
+                              'models': models, 'walk_forward': walk_forward, 'horizons': HORIZONS}}
+
+        # --- Features ---------------------------------------------------------
+        frames = [predictor.add_indicators(bars) for bars in market.values()]
+        start = time.perf_counter()
+        rows = sum(len(predictor.prepare_features(frame)[0]) for frame in frames)
+        prepare_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for coin, bars in market.items():
+            predictor.feature_store.update(coin, bars)
+        ingest_seconds = time.perf_counter() - start
+        results['features'] = {
+            'rows': rows,
+            'prepare_seconds': prepare_seconds,
+            'prepare_rows_per_second': rows / prepare_seconds if prepare_seconds else None,
+            'store_ingest_seconds': ingest_seconds,
+            'store_rows_per_second': n_coins * days / ingest_seconds if ingest_seconds else None,
+            'prepare_peak_mb': _peak_mb(lambda: [predictor.prepare_features(frame) for frame in frames]),
+        }
+
+        # --- Training (first coin) -------------------------------------------
+        X, y, _ = predictor.feature_store.training_matrix(coins[0], horizons=HORIZONS)
+        trained, train = {}, {}
+        for name in models:
+            start = time.perf_counter()
+            create_models(n_jobs=1)[name].fit(X, y)
+            entry = {'fit_seconds': time.perf_counter() - start,
+                     'fit_peak_mb': _peak_mb(lambda: create_models(n_jobs=1)[name].fit(X, y))}
+            if walk_forward:
+                start = time.perf_counter()
+                trained[name], metrics, _ = train_walk_forward(create_models(n_jobs=1)[name], X, y)
+                entry['walk_forward_seconds'] = time.perf_counter() - start
+                entry['oos_rmse'] = metrics['rmse']
+            else:
+                trained[name] = create_models(n_jobs=1)[name].fit(X, y)
+            train[name] = entry
+        results['train'] = {'rows': len(X), 'models': train}
+
+        # --- Registry loads ---------------------------------------------------
+        registry = ModelRegistry(os.path.join(scratch, 'models'), cache_size=n_coins)
+        for coin in coins:
+            registry.register(coin, trained, feature_names=FEATURE_NAMES, horizons=HORIZONS)
+        start = time.perf_counter()
+        for coin in coins:
+            registry.load(coin)
+        cold_seconds = time.perf_counter() - start
+        registry.invalidate()
+        results['load'] = {
+            'cold_ms': cold_seconds * 1000 / n_coins,
+            'cold_peak_mb': _peak_mb(lambda: registry.load(coins[0])),
+            'cached': _timings(lambda: registry.load(coins[0]), repeat),
+        }
+
+        # --- Inference --------------------------------------------------------
+        served = registry.load(coins[0]).models
+        rng = np.random.default_rng(seed)
+        batch = X[rng.integers(0, len(X), batch_size)]
+        inference = {}
+        for name in models:
+            model = served[name]
+            single = _timings(lambda: model.predict(X[-1:]), repeat)
+            batched = _timings(lambda: model.predict(batch), max(3, repeat // 5))
+            inference[name] = {'single_row': single, 'batch': batched,
+                               'batch_rows_per_second': batch_size / (batched['p50_ms'] / 1000)
+                               if batched['p50_ms'] else None}
+        predictor.registry = registry
+        start = time.perf_counter()
+        predictor.predict_many(coins, horizons=HORIZONS)
+        uncached_ms = (time.perf_counter() - start) * 1000
+        inference['predict_many'] = {
+            'coins': n_coins,
+            'uncached_ms': uncached_ms,
+            'cached': _timings(lambda: predictor.predict_many(coins, horizons=HORIZONS), repeat),
+        }
+        results['inference'] = inference
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if output:
+        atomic_write_json(results, output)
+    return results
+
+
+def _costs(results, prefix=''):
+    """Flatten the cost figures of a results dict to {'a.b.c_ms': value}."""
+    costs = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            costs.update(_costs(value, f"{path}."))
+        elif key.endswith(COST_SUFFIXES) and isinstance(value, (int, float)):
+            costs[path] = float(value)
+    return costs
+
+
+def find_regressions(baseline, current, tolerance=0.25, min_ms=0.05):
+    """Cost figures at least tolerance (fractionally) worse than in baseline.
+
+    Returns [{'metric', 'baseline', 'current', 'change'}], worst first.
+    Timings below min_ms in both runs are ignored as noise.
+    """
+    before, after = _costs(baseline), _costs(current)
+    regressions = []
+    for metric, old in before.items():
+        new = after.get(metric)
+        if new is None or old <= 0:
+            continue
+        if metric.endswith('_ms') and max(old, new) < min_ms:
+            continue
+        if metric.endswith('_seconds') and max(old, new) * 1000 < min_ms:
+            continue
+        change = new / old - 1
+        if change > tolerance:
+            regressions.append({'metric': metric, 'baseline': old, 'current': new, 'change': change})
+    return sorted(regressions, key=lambda r: -r['change'])
+
+
+def print_benchmark(results):
+    features = results['features']
+    print(f"\nML benchmark: {results['config']['coins']} coins x {results['config']['days']} days "
+          f"(commit {results['environment']['commit']})")
+    print(f"prepare_features: {features['prepare_rows_per_second']:,.0f} rows/s, "
+          f"store ingest: {features['store_rows_per_second']:,.0f} rows/s, peak {features['prepare_peak_mb']:.1f} MB")
+    print(f"{'Model':<18} {'fit s':>8} {'wf s':>8} {'peak MB':>8} {'1-row p50 ms':>13} {'batch rows/s':>13}")
+    for name, entry in results['train']['models'].items():
+        inference = results['inference'].get(name, {})
+        print(f"{name:<18} {entry['fit_seconds']:>8.3f} {entry.get('walk_forward_seconds', float('nan')):>8.2f} "
+              f"{entry['fit_peak_mb']:>8.1f} {inference['single_row']['p50_ms']:>13.3f} "
+              f"{inference['batch_rows_per_second']:>13,.0f}")
+    load = results['load']
+    many = results['inference']['predict_many']
+    print(f"Model load: cold {load['cold_ms']:.1f} ms/coin, cached {load['cached']['p50_ms']:.3f} ms")
+    print(f"predict_many ({many['coins']} coins): uncached {many['uncached_ms']:.1f} ms, "
+          f"cached {many['cached']['p50_ms']:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ML feature preparation, training and inference')
+    parser.add_argument('--days', type=int, default=730, help='Days of synthetic history per coin (default: 730)')
+    parser.add_argument('--coins', type=int, default=5, help='Number of synthetic coins (default: 5)')
+    parser.add_argument('--repeat', type=int, default=50, help='Repetitions per latency measurement (default: 50)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Rows per batch inference call (default: 256)')
+    parser.add_argument('--models', type=str, help=f"Comma-separated models to benchmark (default: {','.join(MODEL_NAMES)})")
+    parser.add_argument('--no-walk-forward', action='store_true', help='Skip timing walk-forward training')
+    parser.add_argument('--output', type=str, help='Write results to this JSON file')
+    parser.add_argument('--baseline', type=str, help='Compare against a previous results file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs the baseline (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    models = [m.strip() for m in args.models.split(',') if m.strip()] if args.models else None
+    results = run_benchmark(days=args.days, n_coins=args.coins, repeat=args.repeat, batch_size=args.batch_size,
+                            models=models, walk_forward=not args.no_walk_forward, output=args.output)
+    print_benchmark(results)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        regressions = find_regressions(json.load(f), results, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.0%})")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
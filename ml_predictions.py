@@ -4,184 +4,353 @@ Machine Learning Prediction Module for Crypto Price Forecasting
 Uses multiple ML models and ensemble methods for price prediction
 """
 
+import warnings
+
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from fetch_volume import (
     fetch_all_historical, fetch_market_sentiment_analysis,
     calculate_rsi, calculate_macd
 )
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.model_selection import train_test_split
-import joblib
+from sklearn.multioutput import MultiOutputRegressor
 import os
 
+from feature_store import FeatureStore
+from model_registry import get_registry
+from online_models import RecursiveLeastSquares
+from walk_forward import ForecastErrors, IncrementalLinearRegression, advance, walk_forward
+from utils import data_path
+
+FEATURE_NAMES = [
+    'price_mean', 'price_std', 'price_min', 'price_max', 'window_change',
+    'return_mean', 'return_std', 'positive_return_ratio',
+    'rsi', 'macd', 'macd_signal',
+    'price_ma_5', 'price_ma_20',
+    'volume', 'volume_ma', 'volume_ratio',
+    'volatility',
+    'momentum_1', 'momentum_5', 'momentum_10',
+    'distance_from_high', 'distance_from_low',
+]
+
+MODEL_NAMES = ['RandomForest', 'GradientBoosting', 'LinearRegression', 'Online']
+
+# Days ahead forecast directly: every model has one output per horizon
+HORIZONS = list(range(1, 8))
+
+# Normalized over the models present, so older versions without a member still average correctly
+ENSEMBLE_WEIGHTS = {
+    'RandomForest': 0.35,
+    'GradientBoosting': 0.35,
+    'LinearRegression': 0.15,
+    'Online': 0.15
+}
+
+# Learns from every new bar between retrains; see online_models.py
+ONLINE_MODEL = 'Online'
+
+def create_models(n_jobs=None, params=None):
+    """Fresh, unfitted instances of the ensemble's models
+
+    params maps model names to hyperparameter overrides, e.g. the tuned
+    parameters stored in the model registry (see model_tuning.py). All
+    models accept one target column per forecast horizon.
+    """
+    models = {
+        'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs),
+        # Boosting is single-output: one booster per horizon
+        'GradientBoosting': MultiOutputRegressor(GradientBoostingRegressor(n_estimators=100, random_state=42)),
+        # Standardizes internally and can be updated row by row; see walk_forward.py
+        'LinearRegression': IncrementalLinearRegression(),
+        ONLINE_MODEL: RecursiveLeastSquares()
+    }
+    for model_name, overrides in (params or {}).items():
+        if overrides and model_name in models:
+            if isinstance(models[model_name], MultiOutputRegressor):
+                overrides = {f"estimator__{key}": value for key, value in overrides.items()}
+            models[model_name].set_params(**overrides)
+    return models
+
+def train_walk_forward(model, X, y, step=5, window=None):
+    """Walk-forward fit of one model; returns (model, out-of-sample metrics, window start row)"""
+    model, errors, start = walk_forward(model, X, y, step=step, window=window)
+    if 'n_jobs' in getattr(model, 'get_params', dict)():
+        # Serving predicts a row at a time, where worker threads only add overhead
+        model.set_params(n_jobs=None)
+    return model, errors.metrics(), start
+
 class CryptoPricePredictor:
-    def __init__(self):
+    def __init__(self, feature_store_dir=None, lookback=30, model_dir=None):
         self.models = {}
         self.scalers = {}
         self.feature_importance = {}
         self.model_performance = {}
+        self.model_version = None
+        self.model_params = {}
+        self.horizons = list(HORIZONS)
+        self.train_window = {}
+        self.lookback = lookback
+        # Shared per process, so loaded models are cached across predictors; see model_registry.py
+        self.registry = get_registry(model_dir)
+        self._backfills = set()
+        # Per-coin working copies of online models, caught up on bars newer than their version
+        self._online = {}
+        # (coin, horizons) -> (models, bar date, prediction); valid until a new bar or other models
+        self._predictions = {}
+        # Features are computed once per bar and persisted; see feature_store.py
+        self.feature_store = FeatureStore(
+            feature_store_dir or data_path('feature_store', 'FEATURE_STORE_DIR', legacy='feature_store'),
+            featurize=self.featurize,
+            feature_names=FEATURE_NAMES,
+        )
         
     def prepare_features(self, df, lookback=30):
-        """Prepare features for machine learning models"""
-        features = []
-        targets = []
-        dates = []
-        
-        for i in range(lookback, len(df) - 1):
-            # Price-based features
-            price_window = df['price'].iloc[i-lookback:i]
-            returns = df['returns'].iloc[i-lookback:i]
-            
-            feature_vector = [
+        """Prepare features for machine learning models.
+
+        Row i uses the lookback prices/returns before i plus the indicators at
+        i, and targets the next day's price. Computed column-wise over sliding
+        windows; rows containing NaN are dropped.
+        """
+        n_rows = len(df) - 1 - lookback
+        if n_rows <= 0:
+            return np.array([]), np.array([]), []
+        
+        idx = np.arange(lookback, len(df) - 1)
+        X = self._feature_rows(df, idx, lookback)
+        keep = ~np.isnan(X).any(axis=1)
+        dates = list(df['date'].iloc[idx[keep]])
+        return X[keep], df['price'].to_numpy(dtype=float)[idx + 1][keep], dates
+    
+    def featurize(self, bars):
+        """Feature row for every bar of a raw date/price/volume frame (NaN until lookback bars exist)"""
+        df = self.add_indicators(bars.reset_index(drop=True))
+        X = np.full((len(df), len(FEATURE_NAMES)), np.nan)
+        if len(df) > self.lookback:
+            idx = np.arange(self.lookback, len(df))
+            X[idx] = self._feature_rows(df, idx, self.lookback)
+        return X
+    
+    def _feature_rows(self, df, idx, lookback):
+        """The 22 feature columns for rows idx (all >= lookback) of an indicator frame"""
+        n_rows = len(idx)
+        price = df['price'].to_numpy(dtype=float)
+        current = price[idx]
+        
+        # Window j covers rows [j, j + lookback), i.e. the lookback rows before i = j + lookback
+        price_windows = sliding_window_view(price, lookback)[idx - lookback]
+        return_windows = sliding_window_view(df['returns'].to_numpy(dtype=float), lookback)[idx - lookback]
+        
+        with warnings.catch_warnings():
+            # All-NaN windows yield NaN rows, which are dropped below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            window_min = np.nanmin(price_windows, axis=1)
+            window_max = np.nanmax(price_windows, axis=1)
+            columns = [
                 # Price statistics
-                np.mean(price_window),
-                np.std(price_window),
-                np.min(price_window),
-                np.max(price_window),
-                price_window.iloc[-1] / price_window.iloc[0] - 1,  # Price change over window
+                np.nanmean(price_windows, axis=1),
+                np.nanstd(price_windows, axis=1),
+                window_min,
+                window_max,
+                price[idx - 1] / price[idx - lookback] - 1,  # Price change over window
                 
                 # Return statistics
-                np.mean(returns),
-                np.std(returns),
-                np.sum(returns > 0) / len(returns),  # Positive return ratio
-                
-                # Technical indicators
-                df['rsi'].iloc[i] if not np.isnan(df['rsi'].iloc[i]) else 50,
-                df['macd'].iloc[i] if not np.isnan(df['macd'].iloc[i]) else 0,
-                df['macd_signal'].iloc[i] if not np.isnan(df['macd_signal'].iloc[i]) else 0,
-                
-                # Moving averages
-                df['price_ma_5'].iloc[i] if not np.isnan(df['price_ma_5'].iloc[i]) else df['price'].iloc[i],
-                df['price_ma_20'].iloc[i] if not np.isnan(df['price_ma_20'].iloc[i]) else df['price'].iloc[i],
-                
-                # Volume features
-                df['volume'].iloc[i] if not np.isnan(df['volume'].iloc[i]) else 0,
-                df['volume_ma'].iloc[i] if not np.isnan(df['volume_ma'].iloc[i]) else 0,
-                df['volume'].iloc[i] / df['volume_ma'].iloc[i] if not np.isnan(df['volume_ma'].iloc[i]) and df['volume_ma'].iloc[i] > 0 else 1,
-                
-                # Volatility
-                df['volatility'].iloc[i] if not np.isnan(df['volatility'].iloc[i]) else 0,
-                
-                # Price momentum
-                df['price'].iloc[i] / df['price'].iloc[i-1] - 1,
-                df['price'].iloc[i] / df['price'].iloc[i-5] - 1,
-                df['price'].iloc[i] / df['price'].iloc[i-10] - 1,
-                
-                # Distance from highs/lows
-                (np.max(price_window) - df['price'].iloc[i]) / df['price'].iloc[i],
-                (df['price'].iloc[i] - np.min(price_window)) / df['price'].iloc[i],
+                np.nanmean(return_windows, axis=1),
+                np.nanstd(return_windows, axis=1),
+                np.sum(return_windows > 0, axis=1) / lookback,  # Positive return ratio
             ]
+        
+        def at(column, default):
+            values = df[column].to_numpy(dtype=float)[idx]
+            return np.where(np.isnan(values), default, values)
+        
+        volume = at('volume', 0)
+        volume_ma = df['volume_ma'].to_numpy(dtype=float)[idx]
+        valid_ma = ~np.isnan(volume_ma) & (volume_ma > 0)
+        columns += [
+            # Technical indicators
+            at('rsi', 50),
+            at('macd', 0),
+            at('macd_signal', 0),
+            
+            # Moving averages
+            at('price_ma_5', current),
+            at('price_ma_20', current),
+            
+            # Volume features
+            volume,
+            np.where(np.isnan(volume_ma), 0, volume_ma),
+            np.divide(df['volume'].to_numpy(dtype=float)[idx], volume_ma,
+                      out=np.ones(n_rows), where=valid_ma),
             
-            # Remove any NaN values
-            if not any(np.isnan(feature_vector)):
-                features.append(feature_vector)
-                targets.append(df['price'].iloc[i+1])  # Next day's price
-                dates.append(df['date'].iloc[i])
+            # Volatility
+            at('volatility', 0),
+            
+            # Price momentum
+            current / price[idx - 1] - 1,
+            current / price[idx - 5] - 1,
+            current / price[idx - 10] - 1,
+            
+            # Distance from highs/lows
+            (window_max - current) / current,
+            (current - window_min) / current,
+        ]
         
-        return np.array(features), np.array(targets), dates
+        return np.column_stack(columns)
     
-    def train_models(self, coin, days=180):
-        """Train multiple ML models for price prediction"""
+    def train_models(self, coin, days=180, window=None, step=5):
+        """Train multiple ML models for price prediction
+        
+        Models are trained walk-forward over the most recent days rows
+        (expanding, or rolling over window rows), so the reported metrics are
+        out-of-sample errors of predictions made before each step's rows were
+        learned. See walk_forward.py. Every model predicts the prices 1..H
+        days ahead (HORIZONS) directly.
+        """
         print(f"Training ML models for {coin.upper()}...")
         
-        # Load and prepare data
-        df = self.load_and_prepare_data(coin, days)
-        if df is None:
+        # Bring the feature store up to date and train on its most recent rows
+        if not self.refresh_features(coin, days):
             return False
         
-        # Prepare features
-        X, y, dates = self.prepare_features(df)
+        X, y, dates = self.feature_store.training_matrix(coin, last=days, horizons=HORIZONS)
         if len(X) < 50:
             print("Insufficient data for training")
             return False
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        self.models, self.scalers, self.model_performance = {}, {}, {}
+        self.model_version = None
+        self.horizons = list(HORIZONS)
+        self.model_params = self.registry.tuned_params(coin)
+        
+        # Train each model; the forest uses every core since coins are trained one at a time here
+        for model_name, model in create_models(n_jobs=-1, params=self.model_params).items():
+            print(f"Training {model_name}...")
+            model, metrics, start = train_walk_forward(model, X, y, step=step, window=window)
+            self._set_model(model_name, model, metrics)
+        
+        self.train_window = {'start': dates[start].isoformat(), 'end': dates[-1].isoformat(),
+                             'rows': len(X) - start, 'window': window, 'step': step}
+        return True
+    
+    def update_models(self, coin, days=180):
+        """Fold bars that arrived since the last training into the current models
+        
+        Loads the full estimators of the coin's current registry version, scores
+        them on the new rows (extending their out-of-sample metrics) and then
+        updates them incrementally instead of retraining. Returns True if the
+        models changed; save_models registers the result as a new version.
+        """
+        if not self.refresh_features(coin, days):
+            return False
+        loaded = self.registry.load_estimators(coin, feature_names=FEATURE_NAMES)
+        window = loaded[2].get('train_window', {}) if loaded else {}
+        if 'end' not in window:
+            print(f"No walk-forward models to update for {coin}; train them first")
+            return False
+        models, scalers, metadata = loaded
+        # Versions from before multi-horizon training predict the next day only
+        horizons = metadata.get('horizons')
         
-        # Define models
-        models = {
-            'RandomForest': RandomForestRegressor(n_estimators=100, random_state=42),
-            'GradientBoosting': GradientBoostingRegressor(n_estimators=100, random_state=42),
-            'LinearRegression': LinearRegression()
-        }
+        X, y, dates = self.feature_store.training_matrix(coin, horizons=horizons)
+        dates = pd.DatetimeIndex(dates)
+        start = int(dates.searchsorted(pd.Timestamp(window['start'])))
+        end = int(dates.searchsorted(pd.Timestamp(window['end']), side='right'))
+        if end >= len(X):
+            print(f"Models for {coin} are up to date")
+            return False
         
-        # Train each model
+        print(f"Updating ML models for {coin.upper()} with {len(X) - end} new rows...")
+        self.models, self.scalers, self.model_performance = {}, {}, {}
         for model_name, model in models.items():
-            print(f"Training {model_name}...")
-            
-            # Scale features (except for tree-based models)
-            if model_name == 'LinearRegression':
-                scaler = StandardScaler()
-                X_train_scaled = scaler.fit_transform(X_train)
-                X_test_scaled = scaler.transform(X_test)
-                self.scalers[model_name] = scaler
-            else:
-                X_train_scaled = X_train
-                X_test_scaled = X_test
-            
-            # Train model
-            model.fit(X_train_scaled, y_train)
-            self.models[model_name] = model
-            
-            # Make predictions
-            y_pred = model.predict(X_test_scaled)
-            
-            # Calculate metrics
-            mse = mean_squared_error(y_test, y_pred)
-            mae = mean_absolute_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
-            
-            self.model_performance[model_name] = {
-                'mse': mse,
-                'mae': mae,
-                'r2': r2,
-                'rmse': np.sqrt(mse)
-            }
-            
-            # Feature importance (for tree-based models)
-            if hasattr(model, 'feature_importances_'):
-                self.feature_importance[model_name] = model.feature_importances_
-            
-            print(f"  {model_name} - R²: {r2:.3f}, RMSE: {np.sqrt(mse):.2f}")
+            if model_name in scalers:
+                # Scaled batch regression from before incremental updates; replace it
+                model = IncrementalLinearRegression().fit(X[start:end], y[start:end])
+            errors = ForecastErrors.from_metrics(metadata.get('metrics', {}).get(model_name))
+            errors.update(y[end:], model.predict(X[end:]))
+            new_start = advance(model, X, y, start, end, len(X), window=window.get('window'))
+            self._set_model(model_name, model, errors.metrics())
         
+        self.train_window = dict(window, start=dates[new_start].isoformat(), end=dates[-1].isoformat(),
+                                 rows=len(X) - new_start)
+        self.model_version = None
+        self.horizons = horizons or [1]
         return True
     
+    def _set_model(self, model_name, model, metrics):
+        self.models[model_name] = model
+        self.model_performance[model_name] = metrics
+        
+        # Feature importance (for tree-based models)
+        if hasattr(model, 'feature_importances_'):
+            self.feature_importance[model_name] = model.feature_importances_
+        
+        print(f"  {model_name} - R²: {metrics['r2']:.3f}, RMSE: {metrics['rmse']:.2f}")
+    
+    def load_bars(self, coin, days):
+        """Fetch raw daily date/price/volume bars, or None"""
+        hist_data = fetch_all_historical(coin.upper(), days=days)
+        if not hist_data or not hist_data.get('binance'):
+            return None
+        
+        prices = hist_data['binance']
+        dates = pd.date_range(end=datetime.now(), periods=len(prices), freq='D')
+        
+        return pd.DataFrame({
+            'date': dates,
+            'price': prices,
+            'volume': hist_data.get('binance_volume', [0] * len(prices))
+        })
+    
+    def refresh_features(self, coin, days):
+        """Append any newly closed bars to the coin's feature store; True if it has data
+
+        Today's bar is still forming, so only bars up to yesterday are stored
+        (models are trained on, and predict from, daily closes). History is
+        only fetched when yesterday's bar is missing, or once per session when
+        the store holds fewer than days bars (a backfill).
+        """
+        today = pd.Timestamp(datetime.now()).normalize()
+        meta = self.feature_store.meta(coin)
+        stale = meta is None or pd.Timestamp(meta['last_date']) < today - pd.Timedelta(days=1)
+        short = meta is not None and meta['rows'] < days and (coin, days) not in self._backfills
+        if short:
+            self._backfills.add((coin, days))
+        if stale or short:
+            try:
+                bars = self.load_bars(coin, days)
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                bars = None
+            if bars is not None:
+                self.feature_store.update(coin, bars, closed_before=today)
+        return self.feature_store.meta(coin) is not None
+    
     def load_and_prepare_data(self, coin, days):
         """Load and prepare data with technical indicators"""
         try:
-            hist_data = fetch_all_historical(coin.upper(), days=days)
-            if not hist_data or not hist_data.get('binance'):
+            df = self.load_bars(coin, days)
+            if df is None:
                 return None
-            
-            prices = hist_data['binance']
-            dates = pd.date_range(end=datetime.now(), periods=len(prices), freq='D')
-            
-            df = pd.DataFrame({
-                'date': dates,
-                'price': prices,
-                'volume': hist_data.get('binance_volume', [0] * len(prices))
-            })
-            
-            # Calculate technical indicators
-            df['returns'] = df['price'].pct_change()
-            df['rsi'] = self.calculate_rsi_series(df['price'])
-            df['macd'], df['macd_signal'] = self.calculate_macd_series(df['price'])
-            df['volume_ma'] = df['volume'].rolling(window=7).mean()
-            df['price_ma_5'] = df['price'].rolling(window=5).mean()
-            df['price_ma_20'] = df['price'].rolling(window=20).mean()
-            df['volatility'] = df['price'].rolling(window=10).std()
-            
-            return df
+            return self.add_indicators(df)
             
         except Exception as e:
             print(f"Error loading data: {e}")
             return None
     
+    def add_indicators(self, df):
+        """Add the technical indicator columns used by the feature builder"""
+        df = df.copy()
+        df['returns'] = df['price'].pct_change()
+        df['rsi'] = self.calculate_rsi_series(df['price'])
+        df['macd'], df['macd_signal'] = self.calculate_macd_series(df['price'])
+        df['volume_ma'] = df['volume'].rolling(window=7).mean()
+        df['price_ma_5'] = df['price'].rolling(window=5).mean()
+        df['price_ma_20'] = df['price'].rolling(window=20).mean()
+        df['volatility'] = df['price'].rolling(window=10).std()
+        return df
+    
     def calculate_rsi_series(self, prices, period=14):
         """Calculate RSI for a series of prices"""
         delta = prices.diff()
@@ -199,140 +368,221 @@ class CryptoPricePredictor:
         macd_signal = macd.ewm(span=signal).mean()
         return macd, macd_signal
     
-    def predict_price(self, coin, days_ahead=1):
-        """Predict future price using ensemble of models"""
+    def predict_price(self, coin, days_ahead=1, horizons=None):
+        """Predict future price using ensemble of models
+        
+        horizons (e.g. [1, 3, 7]) returns a forecast for each of them from the
+        same feature vector and model calls; see predict_many.
+        """
         if not self.models:
             print("No trained models available. Please train models first.")
             return None
         
-        # Load recent data
-        df = self.load_and_prepare_data(coin, days=60)
-        if df is None:
-            return None
-        
-        # Prepare features for prediction
-        X, _, _ = self.prepare_features(df)
-        if len(X) == 0:
+        prediction = self.predict_many([coin], days_ahead, models=self.models, scalers=self.scalers,
+                                       horizons=horizons).get(coin.lower())
+        if prediction is None:
             print("Insufficient recent data for prediction")
-            return None
+        return prediction
+    
+    def predict_many(self, coins, days_ahead=1, models=None, scalers=None, horizons=None):
+        """Predict several coins at once; returns {coin: prediction}.
+        
+        Models default to each coin's current registry version; pass models
+        (and scalers) to apply one ensemble to every coin. Feature rows of
+        coins served by the same models are stacked so that each model is
+        called once per batch instead of once per coin, and each call returns
+        every horizon the models were trained for.
         
-        # Use most recent feature vector
-        latest_features = X[-1:]
+        A prediction's 'forecast' lists the requested horizons (default:
+        days_ahead) that the models cover; its top-level price fields are
+        those of the first. Coins without models, recent features or any
+        requested horizon are left out of the result.
         
-        # Make predictions with all models
-        predictions = {}
-        for model_name, model in self.models.items():
-            if model_name in self.scalers:
-                features_scaled = self.scalers[model_name].transform(latest_features)
+        Predictions (confidence included) are cached per coin until a new bar
+        arrives or the coin's models change, so repeated requests only check
+        the feature store's metadata.
+        """
+        requested = list(horizons or [days_ahead])
+        groups, results = {}, {}
+        for coin in dict.fromkeys(c.lower() for c in coins):
+            if models is not None:
+                key, version, group_models, group_scalers, performance = (
+                    'shared', self.model_version, models, scalers or {}, self.model_performance)
+                trained_until = self.train_window.get('end')
+                model_horizons = self.horizons
             else:
-                features_scaled = latest_features
+                bundle = self.registry.load(coin, feature_names=FEATURE_NAMES)
+                if bundle is None:
+                    continue
+                key, version, group_models, group_scalers, performance = (
+                    (bundle.coin, bundle.version), bundle.version, bundle.models, bundle.scalers, bundle.metrics)
+                trained_until = bundle.metadata.get('train_window', {}).get('end')
+                model_horizons = bundle.metadata.get('horizons')
+            
+            # Most recent feature vector from the store; only fetches when a new bar is due
+            if not self.refresh_features(coin, days=60):
+                continue
+            cache_key = (coin, tuple(requested))
+            cached = self._predictions.get(cache_key)
+            if (cached and cached[0] is group_models
+                    and cached[1] == pd.Timestamp(self.feature_store.meta(coin)['last_date'])):
+                results[coin] = cached[2]
+                continue
+            latest = self.feature_store.latest(coin)
+            if np.isnan(latest['features']).any():
+                continue
+            group = groups.setdefault(key, {
+                'version': version, 'models': group_models, 'scalers': group_scalers,
+                'performance': performance, 'horizons': model_horizons or [1], 'coins': [], 'latest': [],
+            })
+            group['coins'].append(coin)
+            group['latest'].append(latest)
+            online = group_models.get(ONLINE_MODEL)
+            if online is not None:
+                group.setdefault('online', {})[coin] = self._online_model(coin, online, trained_until,
+                                                                          model_horizons)
+        
+        now = datetime.now()
+        for group in groups.values():
+            columns = [(h, group['horizons'].index(h)) for h in requested if h in group['horizons']]
+            if not columns:
+                continue
+            X = np.vstack([latest['features'] for latest in group['latest']])
+            batch = {}
+            for model_name, model in group['models'].items():
+                if model_name == ONLINE_MODEL:
+                    continue  # Per coin, below
+                if model_name in group['scalers']:
+                    features = group['scalers'][model_name].transform(X)
+                else:
+                    features = X
+                # One column per trained horizon
+                batch[model_name] = np.asarray(model.predict(features)).reshape(len(X), -1)
             
-            pred = model.predict(features_scaled)[0]
-            predictions[model_name] = pred
-        
-        # Ensemble prediction (weighted average)
-        weights = {
-            'RandomForest': 0.4,
-            'GradientBoosting': 0.4,
-            'LinearRegression': 0.2
-        }
-        
-        ensemble_prediction = sum(predictions[model] * weights[model] 
-                                for model in predictions.keys() 
-                                if model in weights)
-        
-        current_price = df['price'].iloc[-1]
-        
-        return {
-            'current_price': current_price,
-            'predicted_price': ensemble_prediction,
-            'predicted_change': (ensemble_prediction - current_price) / current_price,
-            'individual_predictions': predictions,
-            'prediction_date': datetime.now() + timedelta(days=days_ahead)
-        }
+            for i, (coin, latest) in enumerate(zip(group['coins'], group['latest'])):
+                predictions = {model_name: values[i] for model_name, values in batch.items()}
+                if coin in group.get('online', {}):
+                    predictions[ONLINE_MODEL] = np.ravel(group['online'][coin].predict(latest['features']))
+                # Ensemble prediction (weighted average), for all horizons at once
+                weights = {model: ENSEMBLE_WEIGHTS[model] for model in predictions if model in ENSEMBLE_WEIGHTS}
+                ensemble = (sum(predictions[model] * weight for model, weight in weights.items())
+                            / (sum(weights.values()) or 1.0))
+                current_price = latest['price']
+                forecast = [{
+                    'days_ahead': h,
+                    'predicted_price': float(ensemble[col]),
+                    'predicted_change': (float(ensemble[col]) - current_price) / current_price,
+                    'individual_predictions': {model: float(values[col]) for model, values in predictions.items()},
+                    'prediction_date': now + timedelta(days=h),
+                    'confidence': self._confidence(group['performance'], predictions, col),
+                } for h, col in columns]
+                results[coin] = dict(
+                    forecast[0],
+                    current_price=current_price,
+                    forecast=forecast,
+                    model_version=group['version'],
+                )
+                self._predictions[(coin, tuple(requested))] = (group['models'], latest['date'], results[coin])
+        return results
     
-    def get_prediction_confidence(self, coin):
-        """Get confidence level for predictions based on model performance"""
-        if not self.model_performance:
+    def _online_model(self, coin, model, trained_until, horizons=None):
+        """Working copy of an online model, updated with every row after trained_until
+
+        A row is learned once the prices of all its horizons are known.
+        """
+        state = self._online.get(coin)
+        if state is None or state['source'] is not model:
+            until = pd.Timestamp(trained_until) if trained_until else None
+            state = self._online[coin] = {'source': model, 'model': model.copy(), 'until': until, 'rows': None}
+        meta = self.feature_store.meta(coin)
+        if state['until'] is None or meta is None or meta['rows'] == state['rows']:
+            return state['model']
+        
+        # Only the bars appended since the last catch-up are read and learned
+        state['rows'] = meta['rows']
+        new_bars = (pd.Timestamp(meta['last_date']) - state['until']).days
+        if new_bars > 0:
+            X, y, dates = self.feature_store.training_matrix(coin, last=new_bars + 1, horizons=horizons)
+            fresh = np.array([date > state['until'] for date in dates], dtype=bool)
+            if fresh.any():
+                state['model'].partial_fit(X[fresh], y[fresh])
+                state['until'] = dates[-1]
+        return state['model']
+    
+    def get_prediction_confidence(self, coin, days_ahead=1):
+        """Confidence of the coin's current prediction (served from the prediction cache)"""
+        if self.models:
+            prediction = self.predict_many([coin], days_ahead, models=self.models, scalers=self.scalers)
+        else:
+            prediction = self.predict_many([coin], days_ahead)
+        return prediction[coin.lower()]['confidence'] if coin.lower() in prediction else 0.0
+    
+    def _confidence(self, performance, predictions, col=0):
+        """Out-of-sample skill of the ensemble discounted by member disagreement, in [0, 1]
+        
+        Skill is the ensemble-weighted walk-forward R² at the horizon in
+        column col. Members spreading further apart than their typical
+        out-of-sample error (RMSE) signal an unusual feature vector and
+        lower the confidence.
+        """
+        weights = {model: ENSEMBLE_WEIGHTS.get(model, 0.0) for model in predictions if model in performance}
+        total = sum(weights.values())
+        if not total:
             return 0.0
         
-        # Calculate average R² score
-        avg_r2 = np.mean([perf['r2'] for perf in self.model_performance.values()])
+        def at(metrics, name):
+            by_horizon = metrics.get(f"{name}_by_horizon")
+            value = by_horizon[col] if by_horizon and col < len(by_horizon) else metrics.get(name, np.nan)
+            return value if value is not None and np.isfinite(value) else np.nan
         
-        # Get recent volatility
-        df = self.load_and_prepare_data(coin, days=30)
-        if df is not None:
-            recent_volatility = df['volatility'].iloc[-1] / df['price'].iloc[-1]
-            # Higher volatility = lower confidence
-            volatility_factor = max(0.1, 1 - recent_volatility)
-        else:
-            volatility_factor = 0.5
+        skill = np.nansum([weight * at(performance[model], 'r2') for model, weight in weights.items()]) / total
+        rmse = np.nansum([weight * at(performance[model], 'rmse') for model, weight in weights.items()]) / total
+        
+        # Weighted standard deviation of the members' predictions
+        values = np.array([predictions[model][col] for model in weights])
+        w = np.array(list(weights.values())) / total
+        spread = np.sqrt(w @ (values - w @ values) ** 2)
+        agreement = 1.0 / (1.0 + (spread / rmse) ** 2) if rmse > 0 else 1.0
         
-        confidence = avg_r2 * volatility_factor
-        return min(max(confidence, 0.0), 1.0)
+        return float(min(max(skill * agreement, 0.0), 1.0))
     
     def save_models(self, coin):
-        """Save trained models to disk"""
+        """Register the trained models as a new version in the model registry"""
         if not self.models:
             print("No models to save")
-            return
+            return None
         
-        model_dir = f"models/{coin.lower()}"
-        os.makedirs(model_dir, exist_ok=True)
-        
-        for model_name, model in self.models.items():
-            model_path = f"{model_dir}/{model_name}.joblib"
-            joblib.dump(model, model_path)
-            print(f"Saved {model_name} to {model_path}")
-        
-        # Save scalers
-        for scaler_name, scaler in self.scalers.items():
-            scaler_path = f"{model_dir}/{scaler_name}_scaler.joblib"
-            joblib.dump(scaler, scaler_path)
-            print(f"Saved {scaler_name} scaler to {scaler_path}")
-        
-        # Save performance metrics
-        import json
-        perf_path = f"{model_dir}/performance.json"
-        with open(perf_path, 'w') as f:
-            json.dump(self.model_performance, f, indent=2)
-        print(f"Saved performance metrics to {perf_path}")
+        self.model_version = self.registry.register(
+            coin, self.models, self.scalers,
+            metrics=self.model_performance,
+            feature_names=FEATURE_NAMES,
+            train_window=self.train_window,
+            params=self.model_params,
+            horizons=self.horizons,
+        )
+        print(f"Saved {coin} models as version {self.model_version}")
+        return self.model_version
     
-    def load_models(self, coin):
-        """Load trained models from disk"""
-        model_dir = f"models/{coin.lower()}"
-        
-        if not os.path.exists(model_dir):
-            print(f"No saved models found for {coin}")
-            return False
-        
+    def load_models(self, coin, version=None):
+        """Load a model version (the current one by default) through the registry cache"""
         try:
-            # Load models
-            for model_name in ['RandomForest', 'GradientBoosting', 'LinearRegression']:
-                model_path = f"{model_dir}/{model_name}.joblib"
-                if os.path.exists(model_path):
-                    self.models[model_name] = joblib.load(model_path)
-                    print(f"Loaded {model_name} from {model_path}")
-            
-            # Load scalers
-            for scaler_name in ['LinearRegression']:
-                scaler_path = f"{model_dir}/{scaler_name}_scaler.joblib"
-                if os.path.exists(scaler_path):
-                    self.scalers[scaler_name] = joblib.load(scaler_path)
-                    print(f"Loaded {scaler_name} scaler from {scaler_path}")
-            
-            # Load performance metrics
-            perf_path = f"{model_dir}/performance.json"
-            if os.path.exists(perf_path):
-                with open(perf_path, 'r') as f:
-                    self.model_performance = json.load(f)
-                print(f"Loaded performance metrics from {perf_path}")
-            
-            return len(self.models) > 0
-            
+            bundle = self.registry.load(coin, version, feature_names=FEATURE_NAMES)
         except Exception as e:
             print(f"Error loading models: {e}")
             return False
+        
+        if bundle is None:
+            print(f"No saved models found for {coin}")
+            return False
+        
+        # Cached bundles are shared, so copy the containers rather than alias them
+        self.models = {name: bundle.models[name] for name in MODEL_NAMES if name in bundle.models}
+        self.scalers = dict(bundle.scalers)
+        self.model_performance = dict(bundle.metrics)
+        self.train_window = bundle.metadata.get('train_window', {})
+        self.horizons = bundle.metadata.get('horizons') or [1]
+        self.model_version = bundle.version
+        return len(self.models) > 0
     
     def print_model_performance(self):
         """Print detailed model performance metrics"""
@@ -0,0 +1,178 @@
+"""
+Batch training of the price prediction ensemble for many coins.
+
+train_many() refreshes each coin's feature store, writes the training matrix
+once to a scratch .npy file and then fans every (coin, model) pair out across
+a process pool. Workers memory-map the matrices read-only, so the feature data
+is shared through the page cache instead of being pickled to every process.
+The number of worker processes is capped by a CPU budget and every worker is
+limited to one BLAS/OpenMP thread so the budget is not oversubscribed.
+
+Workers write a coin's models into a model registry staging directory; once
+all of them have succeeded the coin is committed as a new registry version
+(see model_registry.py), so a partially trained coin is never served. A JSON
+summary of the run is saved next to the models.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from ml_predictions import (FEATURE_NAMES, HORIZONS, MODEL_NAMES, CryptoPricePredictor, create_models,
+                            train_walk_forward)
+from model_registry import get_registry, schema_hash, write_artifacts
+
+logger = logging.getLogger(__name__)
+
+MIN_TRAINING_ROWS = 50
+
+
+def _limit_worker_threads():
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def atomic_write_json(data, path):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=2, default=float)
+    os.replace(tmp_path, path)
+
+
+def _train_one(coin, model_name, x_path, y_path, out_dir, window=None, step=5, params=None):
+    """Worker: walk-forward fit one model for one coin from memory-mapped arrays and save it to out_dir."""
+    start = time.perf_counter()
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    model = create_models(n_jobs=1, params={model_name: (params or {}).get(model_name)})[model_name]
+    model, metrics, _ = train_walk_forward(model, X, y, step=step, window=window)
+
+    write_artifacts(out_dir, model_name, model)
+    metrics['seconds'] = time.perf_counter() - start
+    return coin, model_name, metrics
+
+
+def _prepare(predictor, coin, days, scratch, window=None, step=5):
+    """Refresh coin's features and dump its training matrix; returns (train_window, x_path, y_path)."""
+    if not predictor.refresh_features(coin, days):
+        return {'rows': 0}, None, None
+    X, y, dates = predictor.feature_store.training_matrix(coin, last=days, horizons=HORIZONS)
+    if len(X) < MIN_TRAINING_ROWS:
+        return {'rows': len(X)}, None, None
+    x_path = os.path.join(scratch, f"{coin}_X.npy")
+    y_path = os.path.join(scratch, f"{coin}_y.npy")
+    np.save(x_path, np.ascontiguousarray(X))
+    np.save(y_path, np.ascontiguousarray(y))
+    # Where walk_forward's final training window starts
+    start = max(0, len(X) - window) if window else 0
+    train_window = {'start': dates[start].isoformat(), 'end': dates[-1].isoformat(), 'rows': len(X) - start,
+                    'window': window, 'step': step}
+    return train_window, x_path, y_path
+
+
+def train_many(coins, days=180, cpu_budget=None, model_dir=None, feature_store_dir=None,
+               fetch_workers=8, window=None, step=5):
+    """Train the ensemble for every coin in parallel and return a summary report.
+
+    Each model is trained walk-forward (see walk_forward.py) with the given
+    rolling window (default: expanding) and step, so its metrics are out of
+    sample. cpu_budget caps the number of training processes (default: all CPUs).
+    model_dir defaults to the registry's (MODEL_DIR, else models).
+    Coins whose data cannot be loaded or is too short are reported, not raised.
+    """
+    started = time.perf_counter()
+    coins = [c.lower() for c in coins]
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    predictor = CryptoPricePredictor(feature_store_dir=feature_store_dir, model_dir=model_dir)
+    registry = get_registry(model_dir)
+    report = {coin: {'status': 'pending', 'samples': 0, 'models': {}} for coin in coins}
+    scratch = tempfile.mkdtemp(prefix='train-many-')
+    try:
+        # Data loading is network-bound, so it gets threads rather than the CPU budget
+        prepared = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(fetch_workers, len(coins)))) as pool:
+            futures = {pool.submit(_prepare, predictor, coin, days, scratch, window, step): coin for coin in coins}
+            for future in as_completed(futures):
+                coin = futures[future]
+                try:
+                    train_window, x_path, y_path = future.result()
+                except Exception as e:
+                    report[coin].update(status='failed', error=f"data: {e}")
+                    continue
+                report[coin]['samples'] = train_window['rows']
+                if x_path is None:
+                    report[coin]['status'] = 'insufficient_data'
+                else:
+                    prepared[coin] = (x_path, y_path, registry.stage(coin), train_window)
+
+        tasks = [(coin, name) for coin in prepared for name in MODEL_NAMES]
+        workers = min(cpu_budget, len(tasks)) if tasks else 0
+        if tasks:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_threads) as pool:
+                futures = {pool.submit(_train_one, coin, name, *prepared[coin][:3], window, step,
+                                       registry.tuned_params(coin)): (coin, name)
+                           for coin, name in tasks}
+                for future in as_completed(futures):
+                    coin, name = futures[future]
+                    try:
+                        _, _, metrics = future.result()
+                    except Exception as e:
+                        report[coin].setdefault('errors', {})[name] = str(e)
+                        logger.error(f"[train_many] {name} failed for {coin}: {e}")
+                        continue
+                    report[coin]['models'][name] = metrics
+
+        for coin, (_, _, staging_dir, train_window) in prepared.items():
+            entry = report[coin]
+            if len(entry['models']) != len(MODEL_NAMES):
+                registry.discard(staging_dir)
+                entry['status'] = 'failed'
+                continue
+            metrics = {name: {k: v for k, v in m.items() if k != 'seconds'} for name, m in entry['models'].items()}
+            entry['version'] = registry.commit(coin, staging_dir, {
+                'models': sorted(MODEL_NAMES),
+                'metrics': metrics,
+                'train_window': train_window,
+                'horizons': HORIZONS,
+                'params': registry.tuned_params(coin),
+                'feature_names': FEATURE_NAMES,
+                'feature_schema': schema_hash(FEATURE_NAMES),
+            })
+            entry['status'] = 'ok'
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        for coin, (_, _, staging_dir, _) in prepared.items():
+            if 'version' not in report[coin]:
+                registry.discard(staging_dir)
+
+    summary = {
+        'coins': report,
+        'trained': sorted(c for c, r in report.items() if r['status'] == 'ok'),
+        'failed': sorted(c for c, r in report.items() if r['status'] != 'ok'),
+        'days': days,
+        'workers': workers,
+        'cpu_budget': cpu_budget,
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+    os.makedirs(registry.root, exist_ok=True)
+    atomic_write_json(summary, os.path.join(registry.root, 'training_summary.json'))
+    return summary
+
+
+def print_training_summary(summary):
+    print(f"\nTrained {len(summary['trained'])}/{len(summary['coins'])} coins in "
+          f"{summary['elapsed_seconds']:.1f}s with {summary['workers']} workers")
+    print(f"{'Coin':<15} {'Status':<18} {'Rows':>6} " + ' '.join(f"{name[:16]:>16}" for name in MODEL_NAMES))
+    for coin, entry in sorted(summary['coins'].items()):
+        r2 = ' '.join(f"{entry['models'][name]['r2']:>16.3f}" if name in entry['models'] else f"{'-':>16}"
+                      for name in MODEL_NAMES)
+        print(f"{coin:<15} {entry['status']:<18} {entry['samples']:>6} {r2}")
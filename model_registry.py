@@ -0,0 +1,323 @@
+"""
+Versioned on-disk registry of trained prediction models, with an in-process cache.
+
+Every training run is registered as an immutable version directory:
+
+    models/<coin>/versions/<version>/<Model>.joblib
+                                     <Model>.compiled.joblib
+                                     <Model>_scaler.joblib
+                                     metadata.json
+    models/<coin>/current.json       -> {"version": ...}
+    models/<coin>/params.json        tuned hyperparameters for the next training
+
+metadata.json records the training window, metrics and a hash of the feature
+schema the models were fitted on, so a model is never served against feature
+vectors laid out differently. Artifacts are written into a staging directory
+that is renamed into place, and current.json is replaced atomically, so
+readers never see a half-written version.
+
+Tree ensembles are also saved compiled (see tree_compiler.py); serving loads
+only the compact compiled artifact and keeps the full estimator on disk for
+anything that needs it.
+
+Loaded versions are kept in an LRU cache shared by every predictor in the
+process, and arrays are loaded with joblib's mmap_mode so processes serving
+the same version share pages through the OS cache. After warm-up a prediction
+touches no model files. The current-version pointer is re-read at most every
+refresh_interval seconds to pick up versions registered by other processes.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+
+from tree_compiler import CompiledTreeEnsemble, compile_model
+from utils import data_path
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'current.json'
+PARAMS_FILE = 'params.json'
+METADATA_FILE = 'metadata.json'
+LEGACY_VERSION = 'legacy'
+COMPILED_SUFFIX = '.compiled.joblib'
+SCALER_SUFFIX = '_scaler.joblib'
+
+
+def schema_hash(feature_names):
+    """Short stable hash of an ordered feature schema."""
+    return hashlib.sha256(json.dumps(list(feature_names)).encode()).hexdigest()[:16]
+
+
+def write_artifacts(directory, name, model, scaler=None):
+    """Dump a fitted model (plus its compiled form and scaler) into a version directory."""
+    joblib.dump(model, os.path.join(directory, f"{name}.joblib"))
+    compiled = compile_model(model)
+    if isinstance(compiled, CompiledTreeEnsemble):
+        joblib.dump(compiled, os.path.join(directory, f"{name}{COMPILED_SUFFIX}"))
+    if scaler is not None:
+        joblib.dump(scaler, os.path.join(directory, f"{name}{SCALER_SUFFIX}"))
+
+
+def _write_json(data, path):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=2, default=float)
+    os.replace(tmp_path, path)
+
+
+class ModelBundle:
+    """One loaded model version: models and scalers by name plus its metadata."""
+
+    __slots__ = ('coin', 'version', 'models', 'scalers', 'metadata')
+
+    def __init__(self, coin, version, models, scalers, metadata):
+        self.coin = coin
+        self.version = version
+        self.models = models
+        self.scalers = scalers
+        self.metadata = metadata
+
+    @property
+    def metrics(self):
+        return self.metadata.get('metrics', {})
+
+
+class ModelRegistry:
+    """Register, list and load model versions per coin."""
+
+    def __init__(self, root='models', cache_size=32, mmap_mode='r', refresh_interval=60):
+        self.root = root
+        self.cache_size = cache_size
+        self.mmap_mode = mmap_mode
+        self.refresh_interval = refresh_interval
+        self._cache = OrderedDict()
+        self._current = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    # --- Layout --------------------------------------------------------------
+
+    def _coin_dir(self, coin):
+        return os.path.join(self.root, coin.lower())
+
+    def _version_dir(self, coin, version):
+        return os.path.join(self._coin_dir(coin), 'versions', version)
+
+    # --- Writes --------------------------------------------------------------
+
+    def stage(self, coin):
+        """Empty staging directory to write artifacts into before commit()."""
+        versions = os.path.join(self._coin_dir(coin), 'versions')
+        os.makedirs(versions, exist_ok=True)
+        return tempfile.mkdtemp(dir=versions, prefix='.staging-')
+
+    def commit(self, coin, staging_dir, metadata):
+        """Publish a staged version and make it current. Returns the version id."""
+        version = f"v{time.time_ns():020d}"
+        metadata = dict(metadata, coin=coin.lower(), version=version, created_at=time.time())
+        _write_json(metadata, os.path.join(staging_dir, METADATA_FILE))
+        os.replace(staging_dir, self._version_dir(coin, version))
+        _write_json({'version': version}, os.path.join(self._coin_dir(coin), CURRENT_FILE))
+        with self._lock:
+            self._current[coin.lower()] = (version, time.monotonic())
+        return version
+
+    def discard(self, staging_dir):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def register(self, coin, models, scalers=None, metrics=None, feature_names=None, train_window=None, **extra):
+        """Save fitted models (and scalers) as a new current version of coin."""
+        staging_dir = self.stage(coin)
+        try:
+            for name, model in models.items():
+                write_artifacts(staging_dir, name, model, (scalers or {}).get(name))
+            metadata = dict(
+                extra,
+                models=sorted(models),
+                scalers=sorted(scalers or {}),
+                metrics=metrics or {},
+                train_window=train_window or {},
+                feature_names=list(feature_names) if feature_names is not None else None,
+                feature_schema=schema_hash(feature_names) if feature_names is not None else None,
+            )
+            return self.commit(coin, staging_dir, metadata)
+        except BaseException:
+            self.discard(staging_dir)
+            raise
+
+    def save_params(self, coin, params, **info):
+        """Store tuned hyperparameters ({model name: {param: value}}) for coin's future trainings."""
+        os.makedirs(self._coin_dir(coin), exist_ok=True)
+        _write_json(dict(info, params=params, tuned_at=time.time()), os.path.join(self._coin_dir(coin), PARAMS_FILE))
+
+    # --- Reads ---------------------------------------------------------------
+
+    def tuned_params(self, coin):
+        """Hyperparameters stored by save_params, or {} if coin was never tuned."""
+        try:
+            with open(os.path.join(self._coin_dir(coin), PARAMS_FILE)) as f:
+                return json.load(f).get('params', {})
+        except (OSError, ValueError):
+            return {}
+
+    def versions(self, coin):
+        """Metadata of every registered version of coin, oldest first."""
+        versions_dir = os.path.join(self._coin_dir(coin), 'versions')
+        if not os.path.isdir(versions_dir):
+            return []
+        found = []
+        for name in sorted(os.listdir(versions_dir)):
+            if name.startswith('.'):
+                continue
+            try:
+                with open(os.path.join(versions_dir, name, METADATA_FILE)) as f:
+                    found.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return found
+
+    def current_version(self, coin):
+        """The coin's current version id (legacy for unversioned models), or None."""
+        coin = coin.lower()
+        with self._lock:
+            cached = self._current.get(coin)
+        if cached and time.monotonic() - cached[1] < self.refresh_interval:
+            return cached[0]
+        try:
+            with open(os.path.join(self._coin_dir(coin), CURRENT_FILE)) as f:
+                version = json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            # Flat models/<coin>/*.joblib saved before the registry existed
+            legacy = os.path.isdir(self._coin_dir(coin)) and any(
+                n.endswith('.joblib') for n in os.listdir(self._coin_dir(coin)))
+            version = LEGACY_VERSION if legacy else None
+        with self._lock:
+            self._current[coin] = (version, time.monotonic())
+        return version
+
+    def load(self, coin, version=None, feature_names=None):
+        """Loaded ModelBundle for coin (current version by default), or None.
+
+        Tree ensembles in the bundle are compiled for serving. With
+        feature_names, a version fitted on a different feature schema is not
+        returned.
+        """
+        coin = coin.lower()
+        version = version or self.current_version(coin)
+        if version is None:
+            return None
+        key = (coin, version)
+        with self._lock:
+            bundle = self._cache.get(key)
+            if bundle is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+        if bundle is None:
+            bundle = self._read(coin, version)
+            if bundle is None:
+                return None
+            with self._lock:
+                self.stats['misses'] += 1
+                self._cache[key] = bundle
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self.stats['evictions'] += 1
+
+        expected = bundle.metadata.get('feature_schema')
+        if feature_names is not None and expected is not None and expected != schema_hash(feature_names):
+            logger.warning(f"[ModelRegistry] {coin} {version} was trained on a different feature schema")
+            return None
+        return bundle
+
+    def load_estimators(self, coin, version=None, feature_names=None):
+        """(models, scalers, metadata) of a version as full, writable estimators, or None.
+
+        For updating or inspecting models rather than serving them: nothing is
+        compiled, memory-mapped or cached.
+        """
+        version = version or self.current_version(coin)
+        if version is None:
+            return None
+        directory = self._coin_dir(coin) if version == LEGACY_VERSION else self._version_dir(coin, version)
+        try:
+            with open(os.path.join(directory, METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {'coin': coin.lower(), 'version': version}
+        expected = metadata.get('feature_schema')
+        if feature_names is not None and expected is not None and expected != schema_hash(feature_names):
+            return None
+        models, scalers = {}, {}
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            path = os.path.join(directory, name)
+            if name.endswith(SCALER_SUFFIX):
+                scalers[name[:-len(SCALER_SUFFIX)]] = joblib.load(path)
+            elif name.endswith('.joblib') and not name.endswith(COMPILED_SUFFIX):
+                models[name[:-len('.joblib')]] = joblib.load(path)
+        if not models:
+            return None
+        return models, scalers, metadata
+
+    def _read(self, coin, version):
+        directory = self._coin_dir(coin) if version == LEGACY_VERSION else self._version_dir(coin, version)
+        if not os.path.isdir(directory):
+            return None
+        models, scalers = {}, {}
+        metadata = {'coin': coin, 'version': version}
+        names = sorted(os.listdir(directory))
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith(SCALER_SUFFIX):
+                scalers[name[:-len(SCALER_SUFFIX)]] = joblib.load(path, mmap_mode=self.mmap_mode)
+            elif name.endswith(COMPILED_SUFFIX):
+                models[name[:-len(COMPILED_SUFFIX)]] = joblib.load(path, mmap_mode=self.mmap_mode)
+            elif name.endswith('.joblib'):
+                model_name = name[:-len('.joblib')]
+                if f"{model_name}{COMPILED_SUFFIX}" not in names:
+                    # Saved before compilation existed; compile in memory
+                    models[model_name] = compile_model(joblib.load(path, mmap_mode=self.mmap_mode))
+            elif name == METADATA_FILE:
+                with open(path) as f:
+                    metadata = json.load(f)
+            elif name == 'performance.json' and version == LEGACY_VERSION:
+                with open(path) as f:
+                    metadata['metrics'] = json.load(f)
+        if not models:
+            return None
+        return ModelBundle(coin, version, models, scalers, metadata)
+
+    def invalidate(self, coin=None):
+        """Drop cached bundles and version pointers (for coin, or all)."""
+        with self._lock:
+            for key in [k for k in self._cache if coin is None or k[0] == coin.lower()]:
+                del self._cache[key]
+            if coin is None:
+                self._current.clear()
+            else:
+                self._current.pop(coin.lower(), None)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(root=None):
+    """Process-wide registry for root, so its cache is shared.
+
+    The default is MODEL_DIR, else ./models while it exists (models saved
+    before DATA_DIR, including the flat legacy layout), else DATA_DIR/models.
+    """
+    root = os.path.abspath(root or data_path('models', 'MODEL_DIR', legacy='models'))
+    with _registries_lock:
+        registry = _registries.get(root)
+        if registry is None:
+            registry = _registries[root] = ModelRegistry(root)
+        return registry
@@ -0,0 +1,186 @@
+"""
+Hyperparameter search for the tree models of the price prediction ensemble.
+
+tune() searches RandomForest and GradientBoosting parameters per coin with
+successive halving: every sampled candidate is first scored cheaply (few trees),
+and only the best 1/eta of them are re-scored at eta times the budget, until
+one candidate per model is left at the full budget. Most of the grid is thus
+pruned after a fraction of the cost of scoring it in full.
+
+Candidates are scored with time-series cross-validation (expanding folds, each
+validated on the rows right after its training rows), so the tuned parameters
+are chosen on out-of-sample errors like the walk-forward metrics. Every rung of
+every (coin, model) study is fanned out over one process pool capped by a CPU
+budget; workers memory-map the coin's training matrix (see ml_training.py) and
+cache its fold slices, so later rungs don't rebuild them.
+
+The winners are stored per coin in the model registry (params.json) and are
+picked up by every later training of that coin.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+
+from ml_predictions import CryptoPricePredictor, create_models
+from ml_training import _limit_worker_threads, _prepare
+from model_registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACES = {
+    'RandomForest': {
+        'max_depth': [None, 4, 8, 16],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    },
+    'GradientBoosting': {
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 5],
+        'subsample': [1.0, 0.8],
+        'min_samples_leaf': [1, 5, 10],
+    },
+}
+
+
+def budgets(min_estimators=25, max_estimators=100, eta=3):
+    """n_estimators of each successive-halving rung, growing eta-fold up to max_estimators."""
+    rungs = [min_estimators]
+    while rungs[-1] * eta < max_estimators:
+        rungs.append(rungs[-1] * eta)
+    if rungs[-1] < max_estimators:
+        rungs.append(max_estimators)
+    return rungs
+
+
+def sample_candidates(space, n_candidates, seed=42):
+    """Up to n_candidates distinct parameter dicts drawn from a grid space."""
+    grid = list(ParameterGrid(space))
+    if n_candidates >= len(grid):
+        return grid
+    rng = np.random.default_rng(seed)
+    return [grid[i] for i in sorted(rng.choice(len(grid), n_candidates, replace=False))]
+
+
+@lru_cache(maxsize=8)
+def _folds(x_path, y_path, n_splits):
+    """Worker-local fold cache: contiguous (X_train, y_train, X_test, y_test) per time-series split."""
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    return [(np.array(X[train]), np.array(y[train]), np.array(X[test]), np.array(y[test]))
+            for train, test in TimeSeriesSplit(n_splits=n_splits).split(X)]
+
+
+def _score(model_name, params, n_estimators, x_path, y_path, n_splits):
+    """Worker: mean out-of-sample RMSE of one candidate over the time-series folds."""
+    rmses = []
+    for X_train, y_train, X_test, y_test in _folds(x_path, y_path, n_splits):
+        model = create_models(n_jobs=1, params={model_name: dict(params, n_estimators=n_estimators)})[model_name]
+        model.fit(X_train, y_train)
+        err = y_test - model.predict(X_test)
+        rmses.append(float(np.sqrt(np.mean(err ** 2))))
+    return float(np.mean(rmses))
+
+
+def tune(coins, model_names=('RandomForest', 'GradientBoosting'), n_candidates=27, days=365, cpu_budget=None,
+         model_dir=None, feature_store_dir=None, n_splits=4, min_estimators=25, max_estimators=100, eta=3,
+         fetch_workers=8, seed=42):
+    """Tune model_names for every coin and store the winners in the registry; returns a summary.
+
+    cpu_budget caps the number of scoring processes (default: all CPUs).
+    Coins whose data cannot be loaded or is too short are reported, not raised.
+    """
+    started = time.perf_counter()
+    coins = [c.lower() for c in coins]
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    predictor = CryptoPricePredictor(feature_store_dir=feature_store_dir, model_dir=model_dir)
+    registry = get_registry(model_dir)
+    rungs = budgets(min_estimators, max_estimators, eta)
+    report = {coin: {'status': 'pending', 'samples': 0, 'models': {}} for coin in coins}
+    scratch = tempfile.mkdtemp(prefix='tune-')
+    evaluations = 0
+    try:
+        prepared = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(fetch_workers, len(coins)))) as pool:
+            futures = {pool.submit(_prepare, predictor, coin, days, scratch): coin for coin in coins}
+            for future in as_completed(futures):
+                coin = futures[future]
+                try:
+                    train_window, x_path, y_path = future.result()
+                except Exception as e:
+                    report[coin].update(status='failed', error=f"data: {e}")
+                    continue
+                report[coin]['samples'] = train_window['rows']
+                if x_path is None:
+                    report[coin]['status'] = 'insufficient_data'
+                else:
+                    prepared[coin] = (x_path, y_path)
+
+        # (coin, model) -> surviving [(params, rmse)]; all studies advance rung by rung together
+        studies = {(coin, name): [(params, None) for params in sample_candidates(SEARCH_SPACES[name], n_candidates, seed)]
+                   for coin in prepared for name in model_names}
+        if studies:
+            workers = min(cpu_budget, sum(len(c) for c in studies.values()))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_limit_worker_threads) as pool:
+                for rung, n_estimators in enumerate(rungs):
+                    futures = {pool.submit(_score, name, params, n_estimators, *prepared[coin], n_splits):
+                               (coin, name, i)
+                               for (coin, name), candidates in studies.items()
+                               for i, (params, _) in enumerate(candidates)}
+                    scores = {}
+                    for future in as_completed(futures):
+                        coin, name, i = futures[future]
+                        try:
+                            scores[futures[future]] = future.result()
+                        except Exception as e:
+                            logger.warning(f"[tune] {name} candidate failed for {coin}: {e}")
+                            scores[futures[future]] = np.inf
+                    evaluations += len(futures)
+
+                    last = rung == len(rungs) - 1
+                    for (coin, name), candidates in studies.items():
+                        ranked = sorted(((params, scores[(coin, name, i)]) for i, (params, _) in enumerate(candidates)),
+                                        key=lambda c: c[1])
+                        keep = 1 if last else max(1, len(ranked) // eta)
+                        studies[(coin, name)] = ranked[:keep]
+
+        for coin in prepared:
+            best = {}
+            for name in model_names:
+                params, rmse = studies[(coin, name)][0]
+                if np.isfinite(rmse):
+                    best[name] = dict(params, n_estimators=rungs[-1])
+                    report[coin]['models'][name] = {'params': best[name], 'cv_rmse': rmse}
+            if len(best) != len(model_names):
+                report[coin]['status'] = 'failed'
+                continue
+            registry.save_params(coin, best, cv_rmse={n: report[coin]['models'][n]['cv_rmse'] for n in best},
+                                 n_candidates=n_candidates, budgets=rungs, n_splits=n_splits, days=days)
+            report[coin]['status'] = 'ok'
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        'coins': report,
+        'tuned': sorted(c for c, r in report.items() if r['status'] == 'ok'),
+        'failed': sorted(c for c, r in report.items() if r['status'] != 'ok'),
+        'budgets': rungs,
+        'evaluations': evaluations,
+        'cpu_budget': cpu_budget,
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+
+
+def print_tuning_summary(summary):
+    print(f"\nTuned {len(summary['tuned'])}/{len(summary['coins'])} coins in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['evaluations']} evaluations, n_estimators rungs {summary['budgets']})")
+    for coin, entry in sorted(summary['coins'].items()):
+        print(f"{coin:<15} {entry['status']}")
+        for name, result in entry['models'].items():
+            print(f"    {name:<18} cv rmse {result['cv_rmse']:.4f}  {result['params']}")
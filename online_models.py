@@ -0,0 +1,137 @@
+"""
+Online models that learn from every new bar.
+
+The batch models are only refreshed when they are retrained or updated, so
+between refreshes they go stale. The models here update in O(features^2)
+(RLS) or O(features) (logistic) per row, a few microseconds, and can be kept
+current on every bar:
+
+- RecursiveLeastSquares: exponentially weighted least-squares regression,
+  used as the 'Online' member of the price prediction ensemble;
+- OnlineLogisticRegression: AdaGrad logistic regression, used by the trading
+  bot for up/down direction next to its forest.
+
+Both standardize their inputs with the moments of the first batch they see
+(normally the training history), so they take the raw feature rows the batch
+models use. The scaling is then frozen: re-scaling later would silently change
+the meaning of everything learned so far. Both pickle (and load through the
+model registry) like any other model.
+"""
+import numpy as np
+
+
+class Standardizer:
+    """Fixed per-feature centring and scaling, estimated once from a batch."""
+
+    def __init__(self, X):
+        X = np.asarray(X, dtype=float)
+        self.mean = X.mean(axis=0)
+        std = X.std(axis=0) if len(X) > 1 else np.abs(self.mean)
+        self.scale = np.where(std > 0, std, 1.0)
+
+    def transform(self, X):
+        return (X - self.mean) / self.scale
+
+
+class RecursiveLeastSquares:
+    """RLS linear regression with a forgetting factor.
+
+    forgetting < 1 discounts old rows geometrically (0.99 ~ a 100-row memory),
+    which lets the model track drifting relationships. y may have several
+    columns (forecast horizons); they share the gain computation.
+    """
+
+    def __init__(self, forgetting=0.99, delta=0.01):
+        self.forgetting = forgetting
+        self.delta = delta
+        self.scaler = None
+        self.coef_ = None
+        self.P = None
+        self.y_mean = 0.0
+        self.n_seen = 0
+
+    @property
+    def n_features_in_(self):
+        return None if self.coef_ is None else len(self.coef_) - 1
+
+    def _start(self, X, y):
+        self.scaler = Standardizer(X)
+        self.coef_ = np.zeros((X.shape[1] + 1,) + y.shape[1:])
+        self.P = np.eye(X.shape[1] + 1) / self.delta
+        # Targets are centred so the intercept starts near zero
+        self.y_mean = np.mean(y, axis=0)
+        self.n_seen = 0
+
+    def _design(self, X):
+        Z = self.scaler.transform(np.asarray(X, dtype=float))
+        return np.hstack([Z, np.ones((len(Z), 1))])
+
+    def fit(self, X, y):
+        self.coef_ = None
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.coef_ is None:
+            self._start(X, y)
+        lam = self.forgetting
+        for x_row, target in zip(X, y):
+            self.n_seen += 1
+            x = np.append(self.scaler.transform(x_row), 1.0)
+            Px = self.P @ x
+            gain = Px / (lam + x @ Px)
+            self.coef_ = self.coef_ + np.multiply.outer(gain, target - self.y_mean - x @ self.coef_)
+            P = (self.P - np.outer(gain, Px)) / lam
+            self.P = (P + P.T) / 2
+        return self
+
+    def predict(self, X):
+        return self._design(np.atleast_2d(X)) @ self.coef_ + self.y_mean
+
+    def copy(self):
+        """Independent, writable copy (e.g. of a memory-mapped registry model)."""
+        clone = RecursiveLeastSquares(self.forgetting, self.delta)
+        if self.coef_ is not None:
+            clone.scaler = self.scaler  # Never modified after creation
+            clone.coef_ = np.array(self.coef_)
+            clone.P = np.array(self.P)
+            clone.y_mean = np.array(self.y_mean)
+            clone.n_seen = self.n_seen
+        return clone
+
+
+class OnlineLogisticRegression:
+    """Binary logistic regression trained by per-row AdaGrad SGD."""
+
+    def __init__(self, learning_rate=0.1, l2=1e-4):
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.scaler = None
+        self.coef_ = None
+        self._grad_sq = None
+
+    def fit(self, X, y):
+        self.coef_ = None
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.coef_ is None:
+            self.scaler = Standardizer(X)
+            self.coef_ = np.zeros(X.shape[1] + 1)
+            self._grad_sq = np.full(X.shape[1] + 1, 1e-8)
+        for x_row, target in zip(X, y):
+            x = np.append(self.scaler.transform(x_row), 1.0)
+            p = 1.0 / (1.0 + np.exp(-np.clip(x @ self.coef_, -30, 30)))
+            grad = (p - target) * x + self.l2 * self.coef_
+            self._grad_sq += grad * grad
+            self.coef_ = self.coef_ - self.learning_rate * grad / np.sqrt(self._grad_sq)
+        return self
+
+    def predict_proba(self, X):
+        """Probability of the positive class for each row."""
+        Z = self.scaler.transform(np.atleast_2d(np.asarray(X, dtype=float)))
+        logits = Z @ self.coef_[:-1] + self.coef_[-1]
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))
@@ -0,0 +1,214 @@
+"""
+Incremental position and PnL accounting for the trading bot.
+
+The ledger keeps cash plus, per coin, quantity, average cost, realized PnL and
+fees. Every fill and every price mark updates the running totals (market value,
+unrealized PnL, peak equity, drawdown) in O(1), so valuation and performance
+metrics never need to re-price the whole book or touch the network.
+
+Buy fees are capitalised into the average cost and sell fees are charged to
+realized PnL, so realized PnL is always net of fees.
+"""
+
+
+class Position:
+    """Holdings and cost basis for a single coin."""
+
+    __slots__ = ('coin', 'quantity', 'avg_cost', 'realized_pnl', 'fees', 'last_price')
+
+    def __init__(self, coin, quantity=0.0, avg_cost=0.0, realized_pnl=0.0, fees=0.0, last_price=None):
+        self.coin = coin
+        self.quantity = quantity
+        self.avg_cost = avg_cost
+        self.realized_pnl = realized_pnl
+        self.fees = fees
+        self.last_price = last_price
+
+    @property
+    def market_value(self):
+        return self.quantity * (self.last_price if self.last_price is not None else self.avg_cost)
+
+    @property
+    def unrealized_pnl(self):
+        if self.last_price is None:
+            return 0.0
+        return self.quantity * (self.last_price - self.avg_cost)
+
+    def to_dict(self):
+        return {
+            'coin': self.coin,
+            'quantity': self.quantity,
+            'avg_cost': self.avg_cost,
+            'last_price': self.last_price,
+            'market_value': self.market_value,
+            'unrealized_pnl': self.unrealized_pnl,
+            'realized_pnl': self.realized_pnl,
+            'fees': self.fees,
+        }
+
+
+class PositionLedger:
+    """Long-only book of cash and positions with running PnL totals."""
+
+    def __init__(self, initial_cash=10000.0):
+        self.initial_cash = initial_cash
+        self.cash = initial_cash
+        self.positions = {}
+        self.market_value = 0.0
+        self.unrealized_pnl = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.open_positions = 0
+        self.closing_trades = 0
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.peak_equity = initial_cash
+        self.max_drawdown = 0.0
+
+    # --- Updates -------------------------------------------------------------
+
+    def _detach(self, pos):
+        """Remove pos's contribution from the running totals."""
+        self.market_value -= pos.market_value
+        self.unrealized_pnl -= pos.unrealized_pnl
+        if pos.quantity > 0:
+            self.open_positions -= 1
+
+    def _attach(self, pos):
+        """Add pos's contribution back to the running totals."""
+        self.market_value += pos.market_value
+        self.unrealized_pnl += pos.unrealized_pnl
+        if pos.quantity > 0:
+            self.open_positions += 1
+        equity = self.equity
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        elif self.peak_equity > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak_equity - equity) / self.peak_equity)
+
+    def on_fill(self, coin, side, quantity, price, fee=0.0):
+        """Book a fill. Returns the realized PnL of the fill (0 for buys)."""
+        if quantity <= 0:
+            return 0.0
+        pos = self.positions.get(coin)
+        if pos is None:
+            pos = self.positions[coin] = Position(coin)
+        self._detach(pos)
+
+        realized = 0.0
+        if side == 'buy':
+            cost = quantity * price + fee
+            pos.avg_cost = (pos.quantity * pos.avg_cost + cost) / (pos.quantity + quantity)
+            pos.quantity += quantity
+            self.cash -= cost
+        elif side == 'sell':
+            if quantity > pos.quantity + 1e-12:
+                self._attach(pos)
+                raise ValueError(f"Cannot sell {quantity} {coin}; only {pos.quantity} held")
+            quantity = min(quantity, pos.quantity)
+            realized = quantity * (price - pos.avg_cost) - fee
+            pos.quantity -= quantity
+            if pos.quantity <= 1e-12:
+                pos.quantity = 0.0
+                pos.avg_cost = 0.0
+            pos.realized_pnl += realized
+            self.realized_pnl += realized
+            self.cash += quantity * price - fee
+            self.closing_trades += 1
+            if realized > 0:
+                self.winning_trades += 1
+                self.gross_profit += realized
+            elif realized < 0:
+                self.losing_trades += 1
+                self.gross_loss -= realized
+        else:
+            self._attach(pos)
+            raise ValueError(f"Unknown side {side!r}")
+
+        pos.fees += fee
+        self.fees += fee
+        pos.last_price = price
+        self._attach(pos)
+        return realized
+
+    def mark(self, coin, price):
+        """Revalue coin at price. Unknown coins and empty prices are ignored."""
+        pos = self.positions.get(coin)
+        if pos is None or not price:
+            return
+        self._detach(pos)
+        pos.last_price = price
+        self._attach(pos)
+
+    # --- Views ---------------------------------------------------------------
+
+    @property
+    def equity(self):
+        return self.cash + self.market_value
+
+    @property
+    def drawdown(self):
+        if self.peak_equity <= 0:
+            return 0.0
+        return max(0.0, (self.peak_equity - self.equity) / self.peak_equity)
+
+    def quantity(self, coin):
+        pos = self.positions.get(coin)
+        return pos.quantity if pos is not None else 0.0
+
+    def holdings(self):
+        """Cash plus quantity per traded coin, in the bot's portfolio dict format."""
+        holdings = {'cash': self.cash}
+        for coin, pos in self.positions.items():
+            holdings[coin] = pos.quantity
+        return holdings
+
+    def metrics(self):
+        """Aggregate PnL, exposure and drawdown figures."""
+        equity = self.equity
+        total_pnl = equity - self.initial_cash
+        return {
+            'portfolio_value': equity,
+            'cash': self.cash,
+            'total_pnl': total_pnl,
+            'total_return': (total_pnl / self.initial_cash) * 100 if self.initial_cash else 0.0,
+            'realized_pnl': self.realized_pnl,
+            'unrealized_pnl': self.unrealized_pnl,
+            'fees': self.fees,
+            'exposure': self.market_value,
+            'exposure_pct': (self.market_value / equity) * 100 if equity > 0 else 0.0,
+            'open_positions': self.open_positions,
+            'closing_trades': self.closing_trades,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'win_rate': self.winning_trades / self.closing_trades if self.closing_trades else 0.0,
+            'profit_factor': self.gross_profit / self.gross_loss if self.gross_loss else None,
+            'drawdown': self.drawdown,
+            'max_drawdown': self.max_drawdown,
+        }
+
+    # --- Persistence ---------------------------------------------------------
+
+    def to_state(self):
+        state = {name: getattr(self, name) for name in _SCALAR_FIELDS}
+        state['positions'] = {coin: pos.to_dict() for coin, pos in self.positions.items()}
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        ledger = cls(state['initial_cash'])
+        for name in _SCALAR_FIELDS:
+            setattr(ledger, name, state[name])
+        for coin, pos in state['positions'].items():
+            ledger.positions[coin] = Position(coin, pos['quantity'], pos['avg_cost'], pos['realized_pnl'],
+                                              pos['fees'], pos['last_price'])
+        return ledger
+
+
+_SCALAR_FIELDS = (
+    'initial_cash', 'cash', 'market_value', 'unrealized_pnl', 'realized_pnl', 'fees', 'open_positions',
+    'closing_trades', 'winning_trades', 'losing_trades', 'gross_profit', 'gross_loss', 'peak_equity',
+    'max_drawdown',
+)
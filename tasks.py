@@ -1,6 +1,12 @@
 from celery import Celery
+import json
 import os
-from fetch_volume import fetch_coingecko_trending, fetch_all_volumes, fetch_all_historical, detect_volume_spike
+from collections import Counter
+from adaptive_scheduler import AdaptiveScheduler
+from fetch_volume import (
+    fetch_coingecko_trending, fetch_all_volumes, fetch_all_historical, detect_volume_spike,
+    fetch_price_from_exchange, redis_client
+)
 # Import alert functions and DB helpers from web_dashboard
 from web_dashboard import send_telegram_alert, send_discord_alert, get_db, query_db, notify_major_alert
 
@@ -9,6 +15,21 @@ CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localho
 
 celery = Celery('tasks', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
 
+# Volume refresh cadence per symbol. Its state is kept in Redis so every worker process
+# shares one due-time table; without Redis it lives in this process.
+VOLUME_EXCHANGES = ['binance', 'coinbase', 'kraken', 'kucoin', 'okx', 'bybit']
+SCHEDULER_KEY = 'adaptive_scheduler:volumes'
+refresh_scheduler = AdaptiveScheduler(base_interval=600, min_interval=60, max_interval=3600,
+                                      target_volatility=0.005, sources=VOLUME_EXCHANGES)
+
+
+def _spot_price(symbol):
+    for exchange in ('binance', 'coinbase', 'kraken'):
+        price = fetch_price_from_exchange(symbol, exchange)
+        if price:
+            return price
+    return None
+
 @celery.task
 def refresh_trending_and_volumes():
     trending = fetch_coingecko_trending()
@@ -16,6 +37,46 @@ def refresh_trending_and_volumes():
         fetch_all_volumes(coin.upper())
     return f"Refreshed volumes for: {', '.join(trending)}"
 
+@celery.task
+def refresh_volumes_adaptive():
+    """Refresh trending and favourited coins whose adaptive interval has elapsed"""
+    if redis_client is None:
+        return _refresh_volumes_adaptive()
+    # One run at a time across workers; a run still in progress makes this one a no-op
+    lock = redis_client.lock(f'{SCHEDULER_KEY}:lock', timeout=600, blocking_timeout=0)
+    if not lock.acquire():
+        return "Refresh already running"
+    try:
+        state = redis_client.get(SCHEDULER_KEY)
+        if state:
+            refresh_scheduler.restore_state(json.loads(state))
+        try:
+            return _refresh_volumes_adaptive()
+        finally:
+            redis_client.set(SCHEDULER_KEY, json.dumps(refresh_scheduler.get_state()))
+    finally:
+        lock.release()
+
+def _refresh_volumes_adaptive():
+    watchers = Counter()
+    for (favorites,) in query_db('SELECT favorites FROM users'):
+        for coin in (favorites or '').split(','):
+            if coin.strip():
+                watchers[coin.strip().upper()] += 1
+    symbols = {coin.upper() for coin in fetch_coingecko_trending() or []} | set(watchers)
+    
+    refreshed = []
+    for symbol in sorted(symbols):
+        refresh_scheduler.set_interest(symbol, watchers.get(symbol, 0))
+        if not refresh_scheduler.due(symbol):
+            continue
+        fetch_all_volumes(symbol)
+        # Realized price volatility drives the cadence: fast-moving markets are refreshed sooner
+        refresh_scheduler.observe(symbol, _spot_price(symbol))
+        refresh_scheduler.mark_refreshed(symbol)
+        refreshed.append(symbol)
+    return f"Refreshed volumes for: {', '.join(refreshed)}" if refreshed else "Nothing due"
+
 @celery.task
 def send_alerts():
     # Query all users with alert settings
@@ -48,9 +109,9 @@ def send_alerts():
 
 # Optionally, add periodic task schedule in Celery config
 celery.conf.beat_schedule = {
-    'refresh-every-10-minutes': {
-        'task': 'tasks.refresh_trending_and_volumes',
-        'schedule': 600.0,  # every 10 minutes
+    'refresh-adaptive-every-minute': {
+        'task': 'tasks.refresh_volumes_adaptive',
+        'schedule': 60.0,  # only symbols whose adaptive interval has elapsed are fetched
     },
     'alerts-every-5-minutes': {
         'task': 'tasks.send_alerts',
@@ -0,0 +1,69 @@
+import json
+import math
+
+import pytest
+
+from adaptive_scheduler import AdaptiveScheduler
+
+
+def feed(scheduler, symbol, step_return, n=30, dt=60.0):
+    price = 100.0
+    for i in range(n):
+        price *= math.exp(step_return if i % 2 == 0 else -step_return)
+        scheduler.observe(symbol, price, timestamp=i * dt)
+
+
+def test_volatile_symbols_are_polled_faster_than_quiet_ones():
+    scheduler = AdaptiveScheduler(base_interval=300, min_interval=15, max_interval=900, budgets={})
+    feed(scheduler, 'calm', 0.0005)
+    feed(scheduler, 'wild', 0.02)
+
+    assert scheduler.interval('wild') < 300 < scheduler.interval('calm')
+    assert scheduler.interval('wild') >= 15
+    assert scheduler.interval('calm') == 900
+
+
+def test_unobserved_symbol_uses_base_interval():
+    scheduler = AdaptiveScheduler(base_interval=300, budgets={})
+    assert scheduler.interval('bitcoin') == 300
+
+
+def test_open_positions_and_interest_shorten_interval():
+    scheduler = AdaptiveScheduler(base_interval=300, position_factor=0.5, interest_weight=1.0, budgets={})
+    scheduler.set_position('bitcoin', True)
+    assert scheduler.interval('bitcoin') == pytest.approx(150)
+    scheduler.set_position('bitcoin', False)
+    scheduler.set_interest('bitcoin', 10)
+    assert scheduler.interval('bitcoin') == pytest.approx(300 / (1 + math.log1p(10)))
+
+
+def test_budget_stretches_all_intervals():
+    scheduler = AdaptiveScheduler(base_interval=60, min_interval=1, budgets={'binance': 5})
+    for i in range(10):
+        scheduler.set_interest(f'coin{i}', 0)
+    # Ten symbols at one refresh a minute each against a budget of five per minute
+    assert scheduler.budget_scale() == pytest.approx(2.0)
+    assert scheduler.interval('coin0') == pytest.approx(120)
+
+
+def test_due_and_mark_refreshed():
+    scheduler = AdaptiveScheduler(base_interval=300, budgets={})
+    assert scheduler.due('bitcoin', now=0)
+    delay = scheduler.mark_refreshed('bitcoin', now=0)
+    assert not scheduler.due('bitcoin', now=delay - 1)
+    assert scheduler.due('bitcoin', now=delay)
+
+
+def test_state_round_trips_through_json():
+    scheduler = AdaptiveScheduler(base_interval=300, budgets={})
+    feed(scheduler, 'wild', 0.02)
+    scheduler.set_position('wild', True)
+    scheduler.set_interest('calm', 3)
+    delay = scheduler.mark_refreshed('wild', now=1000)
+
+    # Another process picks up where this one left off
+    other = AdaptiveScheduler(base_interval=300, budgets={})
+    other.restore_state(json.loads(json.dumps(scheduler.get_state())))
+    assert not other.due('wild', now=1000 + delay - 1) and other.due('wild', now=1000 + delay)
+    assert other.interval('wild') == scheduler.interval('wild')
+    assert other.interval('calm') == scheduler.interval('calm')
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from advanced_backtest import AdvancedBacktester, positions_from_signals, simulate, wilder_rsi
+from ml_benchmark import synthetic_prices
+
+
+def reference_backtest(prices, positions, fee, capital):
+    """Cash/quantity loop: all in at the close on a 1, all out on a 0."""
+    cash, qty, equity = capital, 0.0, []
+    for price, target in zip(prices, positions):
+        if target == 1 and qty == 0:
+            qty, cash = cash * (1 - fee) / price, 0.0
+        elif target == 0 and qty > 0:
+            cash, qty = qty * price * (1 - fee), 0.0
+        equity.append(cash + qty * price)
+    return np.array(equity)
+
+
+def reference_rsi(prices, period=14):
+    delta = np.diff(prices)
+    gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    rsi = np.full(len(prices), np.nan)
+    avg_gain, avg_loss = gain[:period].mean(), loss[:period].mean()
+    for i in range(period, len(prices)):
+        if i > period:
+            avg_gain = (avg_gain * (period - 1) + gain[i - 1]) / period
+            avg_loss = (avg_loss * (period - 1) + loss[i - 1]) / period
+        rsi[i] = 100 - 100 / (1 + avg_gain / avg_loss)
+    return rsi
+
+
+def test_simulate_matches_cash_and_quantity_loop():
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 500)))
+    positions = (rng.random(500) < 0.5).astype(float)
+    sim = simulate(prices, positions, fee=0.002, initial_capital=5000)
+
+    expected = reference_backtest(prices, positions, 0.002, 5000)
+    np.testing.assert_allclose(sim['equity'], expected, rtol=1e-10)
+    assert np.isclose(sim['total_return'], expected[-1] / 5000 - 1)
+    assert sim['buy_trades'] + sim['sell_trades'] == np.count_nonzero(np.diff(positions, prepend=0))
+    assert sim['max_drawdown'] <= 0
+    # Trade returns compound to the strategy's return
+    assert np.isclose(np.prod(1 + sim['trade_returns']), expected[-1] / 5000)
+
+
+def test_positions_from_signals_hold_until_exit():
+    entries = np.array([0, 1, 0, 1, 0, 0, 1, 1], dtype=bool)
+    exits = np.array([1, 0, 0, 0, 1, 0, 1, 0], dtype=bool)
+    assert positions_from_signals(entries, exits).tolist() == [0, 1, 1, 1, 0, 0, 0, 1]
+
+
+def test_wilder_rsi_matches_recursive_definition():
+    prices = synthetic_prices(200, seed=3)['price'].to_numpy()
+    np.testing.assert_allclose(wilder_rsi(prices)[14:], reference_rsi(prices)[14:], rtol=1e-9)
+    assert np.isnan(wilder_rsi(prices)[:14]).all()
+
+
+def test_comprehensive_backtest_results_are_json_ready(tmp_path):
+    backtester = AdvancedBacktester(initial_capital=10000)
+    bars = synthetic_prices(400, seed=1)
+    results = backtester.run_comprehensive_backtest('bitcoin', bars=bars)
+
+    assert set(results) == {'RSI Strategy', 'MACD Strategy', 'Volume Spike Strategy', 'Moving Average Strategy',
+                            'ML Strategy', 'Buy and Hold'}
+    json.dumps(results)
+    hold = results['Buy and Hold']
+    assert np.isclose(hold['total_return'], (bars['price'].iloc[-1] / bars['price'].iloc[0]) * 0.999 - 1)
+    assert hold['num_trades'] == 1 and hold['trades'][0]['open']
+    for result in results.values():
+        assert result['num_trades'] == result['buy_trades'] + result['sell_trades']
+        assert len(result['equity_curve']) == len(bars)
+        assert np.isclose(result['final_value'], result['equity_curve'][-1])
+
+    path = backtester.plot_results(results, 'bitcoin', path=str(tmp_path / 'backtest.html'))
+    with open(path) as f:
+        assert 'Moving Average Strategy' in f.read()
+
+
+def test_ml_strategy_only_uses_past_bars():
+    backtester = AdvancedBacktester()
+    bars = synthetic_prices(300, seed=2)
+    positions = backtester.ml_positions(bars)
+    # Changing the future must not change earlier positions
+    later = bars.copy()
+    later.loc[250:, 'price'] *= 3
+    np.testing.assert_array_equal(backtester.ml_positions(later)[:240], positions[:240])
+
+
+def test_years_of_hourly_bars_match_cash_and_quantity_loop():
+    n = 5 * 8760
+    rng = np.random.default_rng(0)
+    bars = pd.DataFrame({'date': pd.date_range('2020-01-01', periods=n, freq='h'),
+                         'price': 100 * np.exp(np.cumsum(rng.normal(0, 0.005, n))),
+                         'volume': rng.lognormal(10, 0.5, n)})
+    positions = AdvancedBacktester().rsi_positions(bars)
+    sim = simulate(bars['price'], positions, bars_per_year=8760)
+    assert len(sim['equity']) == n
+    expected = reference_backtest(bars['price'].to_numpy(), positions, 0.001, 10000)
+    np.testing.assert_allclose(sim['equity'], expected, rtol=1e-8)
@@ -0,0 +1,99 @@
+import numpy as np
+
+import backtest
+from backtest import (backtest_rsi, backtest_volume_spike, rsi_signals, run_signals, volume_ratio,
+                      volume_spike_signals)
+
+
+def reference_orders(prices, entries, exits, buy_amount, cash):
+    """The original per-bar loop: buy buy_amount while cash lasts, sell everything on exit."""
+    position, trades, equity = 0.0, [], []
+    for i, price in enumerate(prices):
+        if entries[i] and cash >= buy_amount:
+            qty = buy_amount / price
+            position += qty
+            cash -= buy_amount
+            trades.append(('BUY', i, qty))
+        elif exits[i] and position > 0:
+            cash += position * price
+            trades.append(('SELL', i, position))
+            position = 0.0
+        equity.append(cash + position * price)
+    return trades, np.array(equity)
+
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), rng.lognormal(10, 0.6, n)
+
+
+def test_run_signals_matches_per_bar_loop():
+    for seed in range(5):
+        rng = np.random.default_rng(seed)
+        prices = random_walk(400, seed)[0]
+        entries, exits = rng.random(400) < 0.15, rng.random(400) < 0.08
+        result = run_signals(prices, entries, exits, buy_amount=150, initial_cash=1000)
+
+        trades, equity = reference_orders(prices, entries, exits, 150, 1000)
+        assert [(side, bar) for side, bar, _ in trades] == \
+            sorted([('BUY', b) for b in result['buy_bars']] + [('SELL', b) for b in result['sell_bars']],
+                   key=lambda t: t[1])
+        np.testing.assert_allclose(result['equity'], equity, rtol=1e-10)
+        assert np.isclose(result['final_value'], equity[-1])
+        assert result['num_trades'] == len(trades)
+
+
+def test_bars_with_both_signals_buy_only_while_cash_lasts():
+    prices = np.array([10.0, 10, 12, 12, 15])
+    entries = np.array([1, 1, 1, 0, 1], dtype=bool)
+    exits = np.array([0, 1, 1, 1, 0], dtype=bool)
+    result = run_signals(prices, entries, exits, buy_amount=500, initial_cash=1000)
+    trades, equity = reference_orders(prices, entries, exits, 500, 1000)
+    assert result['buy_bars'].tolist() == [0, 1, 4] and result['sell_bars'].tolist() == [2]
+    assert [t[1] for t in trades] == [0, 1, 2, 4]
+    np.testing.assert_allclose(result['equity'], equity)
+
+
+def test_volume_ratio_uses_trailing_average():
+    volume = np.array([1.0, 3, 2, 8, 1])
+    ratio = volume_ratio(volume, window=3)
+    assert np.isnan(ratio[:2]).all()
+    np.testing.assert_allclose(ratio[2:], [2 / 2, 8 / 2, 1 / (13 / 3)])
+
+
+def test_backtests_return_structured_results_on_given_bars():
+    prices, volume = random_walk(300, 7)
+    result = backtest_volume_spike('btc', prices=prices, volume=volume, spike_threshold=1.5)
+    assert result['strategy'] == 'volume_spike' and len(result['equity']) == 300
+    assert [t['side'] for t in result['trades']].count('BUY') == result['buy_trades']
+    assert result['max_drawdown'] <= 0
+
+    result = backtest_rsi('btc', prices=prices)
+    buys = [t for t in result['trades'] if t['side'] == 'BUY']
+    assert all(np.isclose(t['qty'] * t['price'], 100) for t in buys)
+    assert backtest_rsi('btc', prices=prices[:10]) is None
+
+
+def test_backtests_fetch_and_align_data(monkeypatch):
+    prices, volume = random_walk(60, 1)
+    monkeypatch.setattr(backtest, 'fetch_price_history', lambda coin, days: list(prices))
+    monkeypatch.setattr(backtest, 'fetch_all_historical',
+                        lambda coin, days: {'binance': list(volume[10:]), 'kraken': list(volume[5:] / 2), 'okx': []})
+    result = backtest_volume_spike('btc', days=60)
+    # Aligned on the 50 most recent bars every series has
+    assert result['bars'] == 50
+    assert backtest_rsi('btc', days=60)['bars'] == 60
+
+
+def test_minute_bars_match_per_bar_loop():
+    # About a year of minute bars moving 0.1% a minute
+    rng = np.random.default_rng(2)
+    prices, volume = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, 500_000))), rng.lognormal(10, 0.6, 500_000)
+    results = [
+        (backtest_rsi('btc', prices=prices, buy_amount=10, bars_per_year=365 * 1440), rsi_signals(prices)),
+        (backtest_volume_spike('btc', prices=prices, volume=volume, buy_amount=10), volume_spike_signals(volume)),
+    ]
+    for result, (entries, exits) in results:
+        trades, equity = reference_orders(prices, entries, exits, 10, 1000)
+        assert result['bars'] == len(prices) and result['num_trades'] == len(trades)
+        np.testing.assert_allclose(result['equity'], equity, rtol=1e-8)
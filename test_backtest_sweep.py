@@ -0,0 +1,78 @@
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import backtest_rsi, backtest_volume_spike, macd_signals, run_signals
+from backtest_sweep import DEFAULT_GRIDS, combinations, heatmap, iter_sweep, sweep
+from ml_benchmark import synthetic_market
+
+
+@pytest.fixture(scope='module')
+def market():
+    bars = synthetic_market(2, 400, seed=5)
+    return {coin: (b['price'].to_numpy(), b['volume'].to_numpy()) for coin, b in bars.items()}
+
+
+GRIDS = {
+    'rsi': {'period': [7, 14], 'oversold': [25, 30], 'overbought': [70, 75], 'buy_amount': [100, 300]},
+    'volume_spike': {'window': [10, 20], 'spike_threshold': [1.5, 2.0], 'buy_amount': [100]},
+    'macd': {'fast': [8, 30], 'slow': [26], 'signal': [9], 'buy_amount': [200]},
+}
+
+
+def test_combinations_expand_grid_and_skip_inverted_macd():
+    assert len(combinations(GRIDS['rsi'])) == 16
+    assert combinations(GRIDS['macd']) == [{'buy_amount': 200, 'fast': 8, 'signal': 9, 'slow': 26}]
+    assert len(combinations(DEFAULT_GRIDS['macd'])) == 108
+
+
+def test_sweep_matches_single_backtests(market, tmp_path):
+    output = tmp_path / 'sweep.csv'
+    table = sweep(market, GRIDS, workers=2, chunk_size=3, output=str(output))
+    assert len(table) == 2 * (16 + 4 + 1)
+    assert table['rank'].tolist() == list(range(1, len(table) + 1))
+    assert table['sharpe_ratio'].is_monotonic_decreasing
+
+    prices, volume = market['coin1']
+    row = table[(table.coin == 'coin1') & (table.strategy == 'rsi') & (table.period == 7) & (table.oversold == 25)
+                & (table.overbought == 75) & (table.buy_amount == 300)].iloc[0]
+    expected = backtest_rsi('coin1', prices=prices, period=7, oversold=25, overbought=75, buy_amount=300)
+    assert np.isclose(row['final_value'], expected['final_value'])
+    assert row['num_trades'] == expected['num_trades']
+
+    row = table[(table.coin == 'coin0') & (table.strategy == 'volume_spike') & (table.window == 10)
+                & (table.spike_threshold == 1.5)].iloc[0]
+    expected = backtest_volume_spike('coin0', prices=market['coin0'][0], volume=market['coin0'][1],
+                                     window=10, spike_threshold=1.5)
+    assert np.isclose(row['sharpe_ratio'], expected['sharpe_ratio'])
+
+    row = table[(table.coin == 'coin0') & (table.strategy == 'macd')].iloc[0]
+    expected = run_signals(market['coin0'][0], *macd_signals(market['coin0'][0], 8, 26, 9), buy_amount=200)
+    assert np.isclose(row['total_return'], expected['total_return'])
+
+    # Rows were streamed to the CSV with every strategy's parameters
+    with open(output) as f:
+        streamed = list(csv.DictReader(f))
+    assert len(streamed) == len(table)
+    assert {'period', 'window', 'fast', 'sharpe_ratio'} <= set(streamed[0])
+
+
+def test_iter_sweep_streams_rows_and_rejects_unknown_strategies(market):
+    rows = iter_sweep({'coin0': market['coin0']}, {'volume_spike': GRIDS['volume_spike']}, workers=1, chunk_size=1)
+    first = next(rows)
+    assert first['coin'] == 'coin0' and first['strategy'] == 'volume_spike'
+    assert len([first, *rows]) == 4
+    with pytest.raises(ValueError):
+        list(iter_sweep(market, {'bollinger': {}}))
+
+
+def test_heatmap_takes_best_value_per_cell(tmp_path):
+    table = pd.DataFrame({'oversold': [25, 25, 30, 30], 'overbought': [70, 70, 70, 75],
+                          'sharpe_ratio': [0.5, 1.5, -1.0, 2.0]})
+    path = tmp_path / 'heatmap.html'
+    pivot = heatmap(table, 'oversold', 'overbought', path=str(path))
+    assert pivot.loc[70, 25] == 1.5 and pivot.loc[75, 30] == 2.0
+    assert np.isnan(pivot.loc[75, 25])
+    assert path.exists()
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import backtest_walk_forward
+from backtest import run_signals
+from backtest_sweep import combinations, strategy_signals
+from backtest_walk_forward import FoldCache, folds, walk_forward_optimize
+from ml_benchmark import synthetic_market
+
+GRID = {'period': [7, 14], 'oversold': [30, 40], 'overbought': [60, 70], 'buy_amount': [100, 300]}
+
+
+@pytest.fixture(scope='module')
+def market():
+    bars = synthetic_market(2, 330, seed=11)
+    return {coin: (b['price'].to_numpy(), b['volume'].to_numpy()) for coin, b in bars.items()}
+
+
+def test_folds_roll_or_anchor_by_the_test_window():
+    assert folds(100, 50, 20) == [(0, 50, 70), (20, 70, 90)]
+    assert folds(100, 50, 20, anchored=True) == [(0, 50, 70), (0, 70, 90)]
+    assert folds(60, 50, 20) == []
+    # Aligned to absolute bars: bar 0 is bar 5, so test windows start at absolute 60 and 80
+    assert folds(100, 50, 20, first_bar=5) == [(5, 55, 75), (25, 75, 95)]
+
+
+def test_each_fold_trades_the_best_in_sample_parameters_out_of_sample(market):
+    result = walk_forward_optimize(market, 'rsi', GRID, train_bars=120, test_bars=60, workers=2)['coin0']
+    prices, volume = market['coin0']
+    assert [(f['train_end'], f['test_end']) for f in result['folds']] == [(120, 180), (180, 240), (240, 300)]
+    assert len(result['equity']) == 180 and result['test_start'] == 120
+
+    cash = 1000
+    for fold in result['folds']:
+        # The chosen parameters are the in-sample optimum
+        window = slice(fold['train_start'], fold['train_end'])
+        scores = [run_signals(prices[window], *strategy_signals('rsi', prices[window], volume[window], params),
+                              buy_amount=params['buy_amount'])['sharpe_ratio'] for params in combinations(GRID)]
+        assert np.isclose(fold['train']['sharpe_ratio'], max(scores))
+        # ...and are traded on the next window with indicators warmed up on the bars before it
+        entries, exits = strategy_signals('rsi', prices[:fold['test_end']], volume[:fold['test_end']], fold['params'])
+        test = run_signals(prices[fold['train_end']:fold['test_end']], entries[fold['train_end']:],
+                           exits[fold['train_end']:], buy_amount=fold['params']['buy_amount'], initial_cash=cash)
+        assert np.isclose(fold['test']['final_value'], test['final_value'])
+        cash = test['final_value']
+    assert np.isclose(result['final_value'], cash)
+    assert np.isclose(result['total_return'], cash / 1000 - 1)
+
+
+def test_new_window_only_optimizes_the_new_fold(market, tmp_path, monkeypatch):
+    shorter = {coin: (prices[:270], volume[:270]) for coin, (prices, volume) in market.items()}
+    first = walk_forward_optimize(shorter, 'rsi', GRID, train_bars=120, test_bars=60, cache=str(tmp_path))
+    assert [r['optimized_folds'] for r in first.values()] == [2, 2]
+
+    swept = []
+    original = backtest_walk_forward.iter_sweep
+
+    def recording_sweep(windows, *args, **kwargs):
+        swept.append(sorted(windows))
+        return original(windows, *args, **kwargs)
+
+    monkeypatch.setattr(backtest_walk_forward, 'iter_sweep', recording_sweep)
+    # A fresh cache object reads the folds back from disk
+    second = walk_forward_optimize(market, 'rsi', GRID, train_bars=120, test_bars=60, cache=FoldCache(str(tmp_path)))
+    assert swept == [['coin0:120:240', 'coin1:120:240']]
+    assert [r['optimized_folds'] for r in second.values()] == [1, 1]
+    for coin in market:
+        assert second[coin]['folds'][:2] == first[coin]['folds']
+        np.testing.assert_allclose(second[coin]['equity'][:120], first[coin]['equity'])
+
+    # Changed bars invalidate the folds that saw them
+    changed = {coin: (prices * 1.01, volume) for coin, (prices, volume) in market.items()}
+    third = walk_forward_optimize(changed, 'rsi', GRID, train_bars=120, test_bars=60, cache=str(tmp_path))
+    assert [r['optimized_folds'] for r in third.values()] == [3, 3]
+
+
+def test_trailing_window_reuses_the_folds_it_still_covers(market, tmp_path):
+    def window(start, end):
+        # Bars [start, end) of the fixture, numbered by their absolute position
+        bars = {coin: (prices[start:end], volume[start:end]) for coin, (prices, volume) in market.items()}
+        return walk_forward_optimize(bars, 'rsi', GRID, train_bars=120, test_bars=60, cache=str(tmp_path),
+                                     last_bar=end - 1)
+
+    first = window(0, 290)
+    assert [(f['train_start'], f['test_end']) for f in first['coin0']['folds']] == [(0, 180), (60, 240)]
+    assert [r['optimized_folds'] for r in first.values()] == [2, 2]
+
+    # Moved forward by a few days: the first fold has left the window, the second is unchanged
+    shifted = window(5, 295)
+    assert [(f['train_start'] + 5, f['test_end'] + 5) for f in shifted['coin0']['folds']] == [(60, 240)]
+    assert [r['optimized_folds'] for r in shifted.values()] == [0, 0]
+    assert shifted['coin1']['folds'][0]['params'] == first['coin1']['folds'][1]['params']
+
+    # Past the next fold boundary only the new fold is optimized
+    later = window(20, 310)
+    assert len(later['coin0']['folds']) == 2
+    assert [r['optimized_folds'] for r in later.values()] == [1, 1]
+
+
+def test_ties_go_to_the_smallest_parameters_whatever_the_completion_order(market, monkeypatch):
+    original = backtest_walk_forward.iter_sweep
+
+    def sweep(order):
+        def shuffled(*args, **kwargs):
+            rows = list(original(*args, **kwargs))
+            # Every combination scores the same
+            rows = [dict(row, sharpe_ratio=0.0) for row in rows]
+            return iter(rows if order else rows[::-1])
+        return shuffled
+
+    chosen = []
+    for order in (True, False):
+        monkeypatch.setattr(backtest_walk_forward, 'iter_sweep', sweep(order))
+        result = walk_forward_optimize(market, 'rsi', GRID, train_bars=120, test_bars=60, workers=1)
+        chosen.append([f['params'] for f in result['coin0']['folds']])
+    assert chosen[0] == chosen[1]
+    assert chosen[0][0] == min(combinations(GRID), key=lambda c: tuple(c[p] for p in sorted(GRID)))
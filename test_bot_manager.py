@@ -0,0 +1,120 @@
+import asyncio
+
+from bot_manager import BotManager
+
+
+class FakeMarketData:
+    """In-memory stand-in for MarketDataHub that counts requests."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = 0
+        self.stats = {'requests': 0}
+
+    async def get_price(self, coin):
+        self.calls += 1
+        return self.prices.get(coin)
+
+    async def get_volumes(self, symbol):
+        return {'binance': 1.0}
+
+    async def get_historical(self, symbol, days=7):
+        # Zig-zag of +3/-1 moves, which calculate_rsi scores as oversold (25)
+        prices = [100.0]
+        for i in range(days + 15):
+            prices.append(prices[-1] + (3.0 if i % 2 == 0 else -1.0))
+        return {'binance': prices}
+
+    def last_price(self, coin):
+        return self.prices.get(coin)
+
+    async def close(self):
+        pass
+
+
+def rsi_only_config():
+    return {
+        'ml_enabled': False,
+        'sentiment_enabled': False,
+        'volume_spike_enabled': False,
+        'rsi_enabled': True,
+        'macd_enabled': False,
+        'check_interval': 0.01,
+    }
+
+
+def test_manager_trades_many_coins_with_one_portfolio():
+    market = FakeMarketData({'bitcoin': 50000.0, 'ethereum': 3000.0})
+    manager = BotManager(rsi_only_config(), coins=['bitcoin', 'ethereum'], market_data=market)
+
+    asyncio.run(manager.run(duration=0.1))
+
+    status = manager.status()
+    assert set(status['coins']) == {'bitcoin', 'ethereum'}
+    assert all(c['iterations'] > 0 for c in status['coins'].values())
+    # Both coins bought into the same shared portfolio
+    assert manager.bot.portfolio.get('bitcoin', 0) > 0
+    assert manager.bot.portfolio.get('ethereum', 0) > 0
+    assert manager.bot.portfolio['cash'] < 10000
+
+
+def test_manager_restarts_crashed_coin_then_gives_up():
+    market = FakeMarketData({'bitcoin': 50000.0})
+    manager = BotManager(rsi_only_config(), coins=['bitcoin'], market_data=market,
+                         max_restarts=2, restart_backoff=0.001)
+
+    async def boom(coin):
+        raise RuntimeError("exchange down")
+
+    manager.bot.run_strategy_iteration = boom
+    asyncio.run(manager.run(duration=0.5))
+
+    status = manager.status()['coins']['bitcoin']
+    assert status['state'] == 'failed'
+    assert status['restarts'] == 3
+    assert status['last_error'] == "exchange down"
+
+
+def test_add_and_remove_coin_while_running():
+    market = FakeMarketData({'bitcoin': 50000.0, 'solana': 150.0})
+    manager = BotManager(rsi_only_config(), coins=['bitcoin'], market_data=market)
+
+    async def scenario():
+        manager.start()
+        await asyncio.sleep(0.02)
+        manager.add_coin('SOLANA')
+        await asyncio.sleep(0.05)
+        manager.remove_coin('bitcoin')
+        await asyncio.sleep(0.01)
+        await manager.stop()
+
+    asyncio.run(scenario())
+    assert manager.coins == ['solana']
+    assert manager.iterations['solana'] > 0
+
+
+def test_market_data_hub_coalesces_and_caches(monkeypatch):
+    import market_data
+
+    calls = []
+
+    async def fake_fetch_all_volumes(symbol, session):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        return {'binance': 42.0}
+
+    class DummySession:
+        closed = False
+
+    monkeypatch.setattr(market_data, 'fetch_all_volumes_async', fake_fetch_all_volumes)
+    hub = market_data.MarketDataHub(ttl=60, session=DummySession())
+
+    async def scenario():
+        results = await asyncio.gather(*[hub.get_volumes('btc') for _ in range(10)])
+        results.append(await hub.get_volumes('BTC'))
+        return results
+
+    results = asyncio.run(scenario())
+    assert calls == ['BTC']
+    assert all(r == {'binance': 42.0} for r in results)
+    assert hub.stats == {'requests': 1, 'cache_hits': 1, 'coalesced': 9}
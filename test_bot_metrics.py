@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from bot_metrics import LoopLagMonitor, StageTimer
+from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+
+def test_loop_lag_monitor_detects_blocking_call():
+    monitor = LoopLagMonitor(interval=0.01)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Deliberately block the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(scenario())
+    snapshot = monitor.snapshot()
+    assert snapshot['samples'] > 3
+    assert snapshot['max_ms'] >= 150
+    assert snapshot['p50_ms'] < 150
+
+
+def test_model_training_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    bot = AdvancedTradingBot(create_advanced_strategy_config())
+    prices = [100 + (i % 7) - (i % 3) * 0.5 + i * 0.1 for i in range(60)]
+
+    async def scenario():
+        bot.loop_monitor.interval = 0.01
+        bot.loop_monitor.start()
+        trained = await bot.train_ml_model_async('bitcoin', prices)
+        bot.close()
+        return trained
+
+    assert asyncio.run(scenario()) is True
+    assert 0.0 <= bot.predict_price_direction('bitcoin', prices=prices) <= 1.0
+    assert bot.ml_models['bitcoin'] is bot.ml_model
+
+
+def test_stage_timer_percentiles_and_prometheus_export():
+    timer = StageTimer()
+    for ms in range(1, 101):
+        timer.record('fetch.price', ms / 1000)
+    with timer.time('indicators'):
+        pass
+
+    summary = timer.summary()
+    assert summary['fetch.price']['count'] == 100
+    assert 49 <= summary['fetch.price']['p50_ms'] <= 51
+    assert 98 <= summary['fetch.price']['p99_ms'] <= 100
+    assert summary['fetch.price']['max_ms'] == 100
+    assert summary['indicators']['count'] == 1
+
+    text = timer.prometheus()
+    assert '# TYPE trading_bot_stage_latency_seconds histogram' in text
+    assert 'trading_bot_stage_latency_seconds_bucket{stage="fetch.price",le="0.01"} 10' in text
+    assert 'trading_bot_stage_latency_seconds_bucket{stage="fetch.price",le="+Inf"} 100' in text
+    assert 'trading_bot_stage_latency_seconds_count{stage="indicators"} 1' in text
+
+
+def test_bot_iteration_records_every_stage(tmp_path, monkeypatch):
+    from test_bot_manager import FakeMarketData, rsi_only_config
+
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    bot = AdvancedTradingBot(rsi_only_config(), market_data=FakeMarketData({'bitcoin': 50000.0}))
+    asyncio.run(bot.run_strategy_iteration('bitcoin'))
+
+    latency = bot.get_performance_metrics()['latency']
+    for stage in ('iteration', 'fetch.price', 'fetch.volumes', 'fetch.historical', 'indicators',
+                  'risk_checks', 'order_routing'):
+        assert latency[stage]['count'] >= 1, stage
+    assert latency['iteration']['max_ms'] >= latency['fetch.price']['max_ms']
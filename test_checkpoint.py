@@ -0,0 +1,111 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from checkpoint import BotCheckpointer
+from clock import VirtualClock
+from market_data import MarketDataHub
+from online_models import OnlineLogisticRegression
+from replay import ReplayMarketData, replay_strategy_config
+from test_replay import START, replay_config, synthetic_feed
+from trading_bot import AdvancedTradingBot
+
+
+def test_save_is_atomic_and_prunes_old_checkpoints(tmp_path):
+    checkpointer = BotCheckpointer(str(tmp_path), keep=2)
+    for i in range(4):
+        checkpointer.save({'n': i})
+
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 2
+    assert not any(name.endswith('.tmp') for name in names)
+    assert checkpointer.load_latest()['n'] == 3
+
+
+def test_corrupt_checkpoint_falls_back_to_previous(tmp_path):
+    checkpointer = BotCheckpointer(str(tmp_path))
+    checkpointer.save({'n': 1})
+    newest = checkpointer.save({'n': 2})
+    with open(newest, 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert checkpointer.load_latest()['n'] == 1
+
+
+def test_maybe_save_respects_interval(tmp_path):
+    checkpointer = BotCheckpointer(str(tmp_path), interval=3600)
+    assert checkpointer.maybe_save(lambda: {'n': 1}) is None
+    checkpointer.interval = 0
+    assert checkpointer.maybe_save(lambda: {'n': 1}) is not None
+
+
+def test_failed_save_is_logged_and_retried_after_interval(tmp_path):
+    blocker = tmp_path / 'not-a-dir'
+    blocker.write_text('')
+    checkpointer = BotCheckpointer(str(blocker), interval=60)
+    checkpointer.last_saved -= 120
+    assert checkpointer.maybe_save(lambda: {'n': 1}) is None
+    assert not checkpointer.due()
+
+
+def test_bot_keeps_trading_when_checkpoints_fail(tmp_path):
+    blocker = tmp_path / 'not-a-dir'
+    blocker.write_text('')
+    clock = VirtualClock(datetime.fromtimestamp(START + 86400))
+    config = dict(replay_strategy_config(replay_config()), checkpoint_dir=str(blocker), checkpoint_interval=0)
+    bot = AdvancedTradingBot(config, demo_mode=True, market_data=ReplayMarketData(synthetic_feed(days=2), clock),
+                             clock=clock)
+    for _ in range(2):
+        assert clock.run(bot.run_strategy_iteration('bitcoin')) > 0
+    bot.close()
+
+    # Online models in a snapshot are copies the bot can keep updating
+    bot.online_models['bitcoin'] = OnlineLogisticRegression().fit(np.ones((3, 2)), [0, 1, 1])
+    snapshot = bot.get_state()['online_models']['bitcoin']
+    assert snapshot is not bot.online_models['bitcoin']
+    np.testing.assert_array_equal(snapshot.coef_, bot.online_models['bitcoin'].coef_)
+
+
+def test_market_data_state_round_trip():
+    hub = MarketDataHub()
+    hub._cache[('historical', 'BTC', 7)] = (0.0, {'binance': [1.0, 2.0]})
+    hub._cache[('price', 'bitcoin')] = (0.0, 50000.0)
+    hub._last_prices['bitcoin'] = 50000.0
+
+    restored = MarketDataHub()
+    restored.import_state(hub.export_state())
+
+    # Histories and last prices survive; short-lived price quotes do not
+    assert restored._cache[('historical', 'BTC', 7)][1] == {'binance': [1.0, 2.0]}
+    assert ('price', 'bitcoin') not in restored._cache
+    assert restored.last_price('bitcoin') == 50000.0
+
+
+def test_bot_resumes_portfolio_and_models_without_retraining(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    monkeypatch.setenv('BOT_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+    prices = list(100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 200)))
+    bot = AdvancedTradingBot(create_advanced_strategy_config())
+    assert bot.train_ml_model('bitcoin', prices=prices)
+    bot.ledger.on_fill('bitcoin', 'buy', 0.05, 50000.0)
+    bot.daily_pnl = -12.5
+    bot.simulator.update_market('bitcoin', 50000.0)
+    bot.log_trade('BUY', 'bitcoin', 0.05, 50000.0, 'test', 0.8)
+    bot.close()
+    assert bot.save_checkpoint() is not None
+    expected = bot.predict_price_direction('bitcoin', prices=prices)
+
+    fresh = AdvancedTradingBot(create_advanced_strategy_config())
+    fresh.train_ml_model = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("retrained"))
+    assert fresh.resume_from_checkpoint()
+    fresh.close()
+
+    assert fresh.portfolio == {'cash': 7500.0, 'bitcoin': 0.05}
+    assert fresh.ledger.positions['bitcoin'].avg_cost == 50000.0
+    assert fresh.daily_pnl == -12.5
+    assert fresh.total_trades == 1
+    assert fresh.trade_history[-1]['price'] == 50000.0
+    assert fresh.predict_price_direction('bitcoin', prices=prices) == expected
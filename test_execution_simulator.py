@@ -0,0 +1,140 @@
+import pytest
+
+from execution_simulator import SimulatedExchange
+
+
+def make_exchange(**kwargs):
+    params = dict(maker_fee=0.0005, taker_fee=0.001, levels=5, half_spread_bps=10.0,
+                  level_step_bps=10.0, depth_per_level=1000.0, depth_growth=0.0)
+    params.update(kwargs)
+    return SimulatedExchange(**params)
+
+
+def test_market_buy_walks_the_book_and_pays_taker_fee():
+    ex = make_exchange()
+    ex.update_market('btc', 100.0, timestamp=0)
+    # Each ask level holds $1000 of notional; 25 coins spans three levels
+    order = ex.submit_order('btc', 'buy', 25.0, timestamp=0)
+    fills = ex.flush()
+
+    assert order.status == 'filled'
+    assert order.filled_quantity == pytest.approx(25.0)
+    assert order.avg_price > 100.1  # Worse than the best ask
+    assert fills[0].liquidity == 'taker'
+    assert fills[0].fee == pytest.approx(order.notional * 0.001)
+
+
+def test_market_order_partially_fills_when_depth_runs_out():
+    ex = make_exchange()
+    ex.update_market('btc', 100.0, timestamp=0)
+    order = ex.submit_order('btc', 'sell', 1000.0, timestamp=0)
+    ex.flush()
+
+    assert order.status == 'partially_filled'
+    assert 0 < order.filled_quantity < 1000.0
+    # The whole bid side was consumed
+    assert ex.books['btc'].best_bid is None
+
+
+def test_limit_order_rests_then_fills_as_maker():
+    ex = make_exchange()
+    ex.update_market('btc', 100.0, timestamp=0)
+    order = ex.submit_order('btc', 'buy', 5.0, order_type='limit', limit_price=99.0, timestamp=0)
+    assert ex.flush() == []
+    assert order.status == 'open'
+
+    fills = ex.update_market('btc', 98.5, timestamp=1)
+    assert order.status == 'filled'
+    assert fills[0].liquidity == 'maker'
+    assert fills[0].price == 99.0
+    assert order.fees == pytest.approx(5.0 * 99.0 * 0.0005)
+
+
+def test_stop_order_triggers_on_price_move():
+    ex = make_exchange()
+    ex.update_market('btc', 100.0, timestamp=0)
+    order = ex.submit_order('btc', 'sell', 2.0, order_type='stop', stop_price=95.0, timestamp=0)
+    ex.flush()
+    assert order.status == 'open'
+
+    ex.update_market('btc', 97.0, timestamp=1)
+    assert order.status == 'open'
+    ex.update_market('btc', 94.0, timestamp=2)
+    assert order.status == 'filled'
+    assert order.avg_price < 94.0
+
+
+def test_latency_fills_against_the_book_current_at_arrival():
+    ex = make_exchange(latency=0.5)
+    ex.update_market('btc', 100.0, timestamp=0)
+    early = ex.submit_order('btc', 'buy', 1.0, timestamp=0)
+    late = ex.submit_order('btc', 'buy', 1.0, timestamp=0.8)
+
+    ex.update_market('btc', 110.0, timestamp=1.0)
+    assert early.avg_price < 101  # Arrived at 0.5, before the move
+    assert late.status == 'pending'
+    ex.advance(1.3)
+    assert late.avg_price > 110
+
+
+def test_recorded_book_snapshot():
+    ex = make_exchange()
+    ex.set_order_book('eth', bids=[(99.0, 1.0), (98.0, 2.0)], asks=[(101.0, 1.0), (102.0, 2.0)], timestamp=0)
+    qty, avg_price, fee = ex.estimate_fill('eth', 'buy', 2.0)
+    assert qty == 2.0
+    assert avg_price == pytest.approx(101.5)
+    assert ex.book_mid('eth') == 100.0
+
+
+def test_long_replay_fills_every_order_and_keeps_only_live_ones():
+    ex = make_exchange(depth_per_level=1e9)
+    for i in range(5000):
+        ex.update_market('btc', 100.0 + (i % 10), timestamp=i)
+        ex.submit_order('btc', 'buy' if i % 2 else 'sell', 0.1, timestamp=i)
+    ex.flush()
+    assert ex.stats['fills'] == 5000
+    assert ex.stats['volume'] == pytest.approx(0.1 * sum(100.0 + (i % 10) for i in range(5000)), rel=2e-3)
+    assert ex.orders == {}  # Finished orders are not retained
+
+
+def test_bot_routes_demo_orders_through_simulator(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+    config = create_advanced_strategy_config()
+    config['execution']['latency'] = 0.0
+    bot = AdvancedTradingBot(config, demo_mode=True)
+    assert bot.execute_buy('bitcoin', 0.01, 50000.0, 'test', 0.5)
+    trade = bot.trade_history[-1]
+    assert trade['price'] > 50000.0  # Paid the spread
+    assert trade['fee'] > 0
+    assert bot.portfolio['cash'] < 10000 - 0.01 * 50000.0
+
+    assert bot.execute_sell('bitcoin', bot.portfolio['bitcoin'], 50000.0, 'test', 0.5)
+    assert bot.portfolio['bitcoin'] == pytest.approx(0.0)
+    assert bot.portfolio['cash'] < 10000
+
+
+def test_bot_orders_fill_at_the_quote_seen_after_the_latency(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    from clock import VirtualClock
+    from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+    config = create_advanced_strategy_config()
+    config['execution'].update(latency=2.0, half_spread_bps=0.0)
+    clock = VirtualClock()
+    bot = AdvancedTradingBot(config, demo_mode=True, clock=clock)
+    assert bot.execute_buy('bitcoin', 0.01, 50000.0, 'test', 0.5)
+    assert not bot.trade_history
+    # Coins still in flight cannot be sold, and neither can the cash reserved for them
+    assert not bot.execute_sell('bitcoin', 0.01, 50000.0, 'test', 0.5)
+    assert not bot.execute_buy('bitcoin', 0.195, 50000.0, 'test', 0.5)
+
+    clock.elapsed = 1.0
+    assert bot.settle_orders('bitcoin', 50500.0) == []
+    clock.elapsed = 3.0
+    fills = bot.settle_orders('bitcoin', 51000.0)
+    assert [f.price for f in fills] == [pytest.approx(51000.0)]
+    assert fills[0].timestamp == clock.time() - 1.0  # Arrived at submission + latency
+    assert bot.trade_history[-1]['price'] == pytest.approx(51000.0)
+    assert bot.portfolio['bitcoin'] == pytest.approx(0.01)
@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from ml_predictions import FEATURE_NAMES, CryptoPricePredictor
+
+
+def synthetic_bars(n, end=None, seed=0):
+    rng = np.random.default_rng(seed)
+    end = end if end is not None else pd.Timestamp('2024-06-30')
+    return pd.DataFrame({
+        'date': pd.date_range(end=end, periods=n, freq='D'),
+        'price': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        'volume': rng.uniform(1e5, 1e6, n),
+    })
+
+
+def test_incremental_updates_match_full_recompute(tmp_path):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    store = predictor.feature_store
+    bars = synthetic_bars(400)
+
+    assert store.update('bitcoin', bars.iloc[:300]) == 300
+    assert store.update('bitcoin', bars.iloc[:301]) == 1  # Only the new bar is appended
+    assert store.update('bitcoin', bars) == 99
+    assert store.update('bitcoin', bars) == 0
+
+    X, y, dates = store.training_matrix('bitcoin')
+    X_ref, y_ref, dates_ref = predictor.prepare_features(predictor.add_indicators(bars))
+    assert X.dtype == np.float32
+    np.testing.assert_allclose(X, X_ref.astype(np.float32), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(y, y_ref, rtol=1e-6)
+    assert dates == dates_ref
+
+    latest = store.latest('bitcoin')
+    full = predictor.featurize(bars)
+    np.testing.assert_allclose(latest['features'][0], full[-1], rtol=1e-5, atol=1e-5)
+    assert latest['price'] == bars['price'].iloc[-1]
+    assert latest['date'] == bars['date'].iloc[-1]
+
+
+def test_horizon_targets_are_later_prices(tmp_path):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    store = predictor.feature_store
+    bars = synthetic_bars(120)
+    store.update('bitcoin', bars)
+
+    X1, y1, dates1 = store.training_matrix('bitcoin')
+    X, Y, dates = store.training_matrix('bitcoin', horizons=[1, 3, 7])
+    assert Y.shape == (len(X), 3)
+    assert dates == dates1[:-6]  # The newest rows don't have a 7-day target yet
+    np.testing.assert_array_equal(Y[:, 0], y1[:-6])
+    prices = bars.set_index('date')['price']
+    for j, h in enumerate([1, 3, 7]):
+        expected = [prices[d + pd.Timedelta(days=h)] for d in dates]
+        np.testing.assert_allclose(Y[:, j], expected, rtol=1e-6)
+
+
+def test_interrupted_append_is_discarded(tmp_path):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    store = predictor.feature_store
+    bars = synthetic_bars(100)
+    store.update('bitcoin', bars.iloc[:99])
+    # Simulate a crash after writing column bytes but before meta.json was updated
+    with open(os.path.join(str(tmp_path), 'bitcoin', 'bar_price.bin'), 'ab') as f:
+        f.write(b'\0' * 24)
+
+    store.update('bitcoin', bars)
+    assert store.meta('bitcoin')['rows'] == 100
+    assert store.latest('bitcoin')['price'] == bars['price'].iloc[-1]
+
+
+def test_revised_newest_bar_is_rewritten(tmp_path):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    store = predictor.feature_store
+    bars = synthetic_bars(300)
+    partial = bars.copy()
+    partial.loc[299, 'price'] *= 0.97  # The same day fetched earlier, before its close
+    store.update('bitcoin', partial.iloc[:299])
+    assert store.update('bitcoin', partial) == 1
+    assert store.latest('bitcoin')['price'] == partial['price'].iloc[-1]
+
+    assert store.update('bitcoin', bars) == 1
+    assert store.meta('bitcoin')['rows'] == 300
+    latest = store.latest('bitcoin')
+    assert latest['price'] == bars['price'].iloc[-1]
+    np.testing.assert_allclose(latest['features'][0], predictor.featurize(bars)[-1], rtol=1e-5, atol=1e-5)
+    X, y, _ = store.training_matrix('bitcoin')
+    X_ref, y_ref, _ = predictor.prepare_features(predictor.add_indicators(bars))
+    np.testing.assert_allclose(y, y_ref, rtol=1e-6)  # The row before it targets the revised close
+    np.testing.assert_allclose(X, X_ref.astype(np.float32), rtol=1e-5, atol=1e-5)
+
+
+def test_todays_open_bar_is_kept_out_of_the_store(tmp_path, monkeypatch):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    bars = synthetic_bars(100, end=pd.Timestamp.now())
+    monkeypatch.setattr(predictor, 'load_bars', lambda coin, days: bars)
+    assert predictor.refresh_features('bitcoin', 100)
+    yesterday = bars['date'].dt.normalize().iloc[-2]
+    assert predictor.feature_store.latest('bitcoin')['date'] == yesterday
+
+    # Fetching the same day again with a moved close changes nothing stored
+    moved = bars.copy()
+    moved.loc[99, 'price'] *= 1.05
+    assert predictor.feature_store.update('bitcoin', moved, closed_before=pd.Timestamp.now()) == 0
+    assert predictor.feature_store.latest('bitcoin')['price'] == bars['price'].iloc[-2]
+    assert predictor.feature_store.meta('bitcoin')['rows'] == 99
+
+
+def test_backfill_rebuilds_store(tmp_path):
+    store = CryptoPricePredictor(feature_store_dir=str(tmp_path)).feature_store
+    bars = synthetic_bars(200)
+    store.update('bitcoin', bars.iloc[150:])
+    assert store.update('bitcoin', bars) == 200
+    assert store.meta('bitcoin')['rows'] == 200
+
+
+def test_predictions_reuse_stored_features(tmp_path, monkeypatch):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    calls = []
+
+    def load_bars(coin, days):
+        calls.append(days)
+        return synthetic_bars(400, end=pd.Timestamp.now())
+
+    monkeypatch.setattr(predictor, 'load_bars', load_bars)
+    assert predictor.train_models('bitcoin', days=400)
+    first = predictor.predict_price('bitcoin')
+    second = predictor.predict_price('bitcoin')
+
+    assert calls == [400]  # Today's bar is already stored; nothing is refetched
+    assert first['predicted_price'] == second['predicted_price']
+    assert first['current_price'] == predictor.feature_store.latest('bitcoin')['price']
+    assert 0.0 <= predictor.get_prediction_confidence('bitcoin') <= 1.0
+    assert len(FEATURE_NAMES) == predictor.feature_store.latest('bitcoin')['features'].shape[1]
@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from inference_batcher import MicroBatcher
+from ml_predictions import CryptoPricePredictor
+from test_feature_store import synthetic_bars
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    def batch_fn(keys):
+        calls.append(list(keys))
+        return {key: key * 2 for key in keys if key != 3}
+
+    batcher = MicroBatcher(batch_fn, max_batch=8, max_delay=0.05)
+    results = {}
+    gate = threading.Barrier(6)
+
+    def request(key):
+        gate.wait()
+        results[key] = batcher.predict(key, timeout=5)
+
+    threads = [threading.Thread(target=request, args=(k,)) for k in (1, 2, 3, 4, 4, 5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {1: 2, 2: 4, 3: None, 4: 8, 5: 10}
+    assert sum(len(c) for c in calls) == 5  # The duplicate key is computed once
+    assert len(calls) < 5
+    assert batcher.stats['requests'] == 6
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(keys):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(batch_fn, max_delay=0)
+    future = batcher.submit('btc')
+    try:
+        future.result(timeout=5)
+    except ValueError as e:
+        assert str(e) == 'boom'
+    else:
+        raise AssertionError('expected the batch error')
+    batcher.close()
+
+
+class CountingModel:
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return self.model.predict(X)
+
+
+def test_predict_many_calls_each_model_once(tmp_path, monkeypatch):
+    def load_bars(self, coin, days):
+        return synthetic_bars(120, end=pd.Timestamp.now(), seed=len(coin))
+
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars', load_bars)
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path / 'm'))
+    coins = ['bitcoin', 'ethereum', 'solana']
+    for coin in coins:
+        predictor.refresh_features(coin, 120)
+    X, y, _ = predictor.feature_store.training_matrix('bitcoin')
+    model = CountingModel(LinearRegression().fit(X, y))
+    predictor.model_performance = {'LinearRegression': {'r2': 0.8}}
+
+    batched = predictor.predict_many(coins, models={'LinearRegression': model})
+    assert model.calls == 1
+    for coin in coins:
+        expected = model.model.predict(predictor.feature_store.latest(coin)['features'])[0]
+        assert np.isclose(batched[coin]['predicted_price'], expected)
+        assert 0 <= batched[coin]['confidence'] <= 1
+
+
+def test_predictions_and_confidence_are_cached_until_a_new_bar(tmp_path, monkeypatch):
+    bars = synthetic_bars(121, end=pd.Timestamp.now() + pd.Timedelta(days=1))
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars', lambda self, coin, days: bars.iloc[:120])
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path / 'm'))
+    predictor.refresh_features('bitcoin', 120)
+    X, y, _ = predictor.feature_store.training_matrix('bitcoin')
+    model = CountingModel(LinearRegression().fit(X, y))
+    models = {'LinearRegression': model}
+    predictor.model_performance = {'LinearRegression': {'r2': 0.8, 'rmse': 2.0}}
+
+    first = predictor.predict_many(['bitcoin'], models=models)['bitcoin']
+    assert predictor.predict_many(['bitcoin'], models=models)['bitcoin'] is first
+    assert model.calls == 1
+    assert first['confidence'] == 0.8  # A single member has no dispersion
+
+    predictor.feature_store.update('bitcoin', bars)
+    assert predictor.predict_many(['bitcoin'], models=models)['bitcoin'] is not first
+    assert model.calls == 2
+
+
+def test_confidence_drops_when_members_disagree(tmp_path):
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path))
+    performance = {'RandomForest': {'r2': 0.6, 'rmse': 2.0}, 'LinearRegression': {'r2': 0.6, 'rmse': 2.0}}
+    agree = predictor._confidence(performance, {'RandomForest': np.array([100.0]),
+                                                'LinearRegression': np.array([100.0])})
+    apart = predictor._confidence(performance, {'RandomForest': np.array([96.0]),
+                                                'LinearRegression': np.array([104.0])})
+    assert np.isclose(agree, 0.6)
+    assert 0 < apart < agree
+
+    # Per-horizon out-of-sample metrics are used when present
+    performance['RandomForest'].update(r2_by_horizon=[0.6, 0.2], rmse_by_horizon=[2.0, 4.0])
+    performance['LinearRegression'].update(r2_by_horizon=[0.6, 0.2], rmse_by_horizon=[2.0, 4.0])
+    later = predictor._confidence(performance, {'RandomForest': np.array([100.0, 100.0]),
+                                                'LinearRegression': np.array([100.0, 100.0])}, col=1)
+    assert np.isclose(later, 0.2)
@@ -0,0 +1,47 @@
+import json
+
+from ml_benchmark import find_regressions, main, run_benchmark, synthetic_market
+from ml_predictions import MODEL_NAMES
+
+
+def test_synthetic_market_is_reproducible():
+    first = synthetic_market(3, 50, seed=1)
+    assert list(first) == ['coin0', 'coin1', 'coin2']
+    assert first['coin1'].equals(synthetic_market(3, 50, seed=1)['coin1'])
+    assert (first['coin0']['price'] > 0).all() and len(first['coin0']) == 50
+
+
+def test_benchmark_writes_comparable_results(tmp_path):
+    output = tmp_path / 'bench.json'
+    results = run_benchmark(days=150, n_coins=2, repeat=2, batch_size=8, walk_forward=False, output=str(output))
+
+    with open(output) as f:
+        saved = json.load(f)
+    assert saved['config']['coins'] == 2
+    assert set(saved['train']['models']) == set(MODEL_NAMES)
+    assert saved['features']['prepare_rows_per_second'] > 0
+    assert saved['inference']['RandomForest']['single_row']['p50_ms'] > 0
+    assert saved['inference']['predict_many']['cached']['p50_ms'] >= 0
+    assert saved['load']['cold_ms'] > 0
+    assert find_regressions(results, saved) == []
+
+    slower = json.loads(json.dumps(saved))
+    slower['train']['models']['GradientBoosting']['fit_seconds'] *= 2
+    regressions = find_regressions(saved, slower)
+    assert [r['metric'] for r in regressions] == ['train.models.GradientBoosting.fit_seconds']
+    assert regressions[0]['change'] == 1.0
+
+
+def test_cli_fails_on_regression(tmp_path, capsys):
+    baseline = tmp_path / 'baseline.json'
+    args = ['--days', '120', '--coins', '1', '--repeat', '2', '--batch-size', '4', '--no-walk-forward',
+            '--models', 'LinearRegression,Online']
+    assert main(args + ['--output', str(baseline)]) == 0
+
+    with open(baseline) as f:
+        fast = json.load(f)
+    fast['features']['prepare_seconds'] /= 100
+    with open(baseline, 'w') as f:
+        json.dump(fast, f)
+    assert main(args + ['--baseline', str(baseline)]) == 1
+    assert 'REGRESSION features.prepare_seconds' in capsys.readouterr().out
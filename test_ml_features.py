@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from ml_predictions import CryptoPricePredictor
+from trading_bot import build_direction_features
+
+
+def reference_prepare_features(df, lookback=30):
+    """The original row-by-row implementation of prepare_features."""
+    features, targets, dates = [], [], []
+    for i in range(lookback, len(df) - 1):
+        price_window = df['price'].iloc[i-lookback:i]
+        returns = df['returns'].iloc[i-lookback:i]
+        feature_vector = [
+            np.mean(price_window), np.std(price_window), np.min(price_window), np.max(price_window),
+            price_window.iloc[-1] / price_window.iloc[0] - 1,
+            np.mean(returns), np.std(returns), np.sum(returns > 0) / len(returns),
+            df['rsi'].iloc[i] if not np.isnan(df['rsi'].iloc[i]) else 50,
+            df['macd'].iloc[i] if not np.isnan(df['macd'].iloc[i]) else 0,
+            df['macd_signal'].iloc[i] if not np.isnan(df['macd_signal'].iloc[i]) else 0,
+            df['price_ma_5'].iloc[i] if not np.isnan(df['price_ma_5'].iloc[i]) else df['price'].iloc[i],
+            df['price_ma_20'].iloc[i] if not np.isnan(df['price_ma_20'].iloc[i]) else df['price'].iloc[i],
+            df['volume'].iloc[i] if not np.isnan(df['volume'].iloc[i]) else 0,
+            df['volume_ma'].iloc[i] if not np.isnan(df['volume_ma'].iloc[i]) else 0,
+            df['volume'].iloc[i] / df['volume_ma'].iloc[i]
+            if not np.isnan(df['volume_ma'].iloc[i]) and df['volume_ma'].iloc[i] > 0 else 1,
+            df['volatility'].iloc[i] if not np.isnan(df['volatility'].iloc[i]) else 0,
+            df['price'].iloc[i] / df['price'].iloc[i-1] - 1,
+            df['price'].iloc[i] / df['price'].iloc[i-5] - 1,
+            df['price'].iloc[i] / df['price'].iloc[i-10] - 1,
+            (np.max(price_window) - df['price'].iloc[i]) / df['price'].iloc[i],
+            (df['price'].iloc[i] - np.min(price_window)) / df['price'].iloc[i],
+        ]
+        if not any(np.isnan(feature_vector)):
+            features.append(feature_vector)
+            targets.append(df['price'].iloc[i+1])
+            dates.append(df['date'].iloc[i])
+    return np.array(features), np.array(targets), dates
+
+
+def reference_direction_features(prices, window=20):
+    features, targets = [], []
+    for i in range(window, len(prices) - 1):
+        price_window = prices[i-window:i]
+        features.append([
+            np.mean(price_window), np.std(price_window),
+            prices[i] / prices[i-1] - 1, prices[i] / prices[i-5] - 1,
+            prices[i] / prices[i-10] - 1, prices[i] / prices[i-20] - 1,
+            np.max(price_window) / prices[i] - 1, prices[i] / np.min(price_window) - 1,
+        ])
+        targets.append(1 if prices[i+1] > prices[i] else 0)
+    return np.array(features), np.array(targets)
+
+
+def indicator_frame(n, seed=0, gaps=False):
+    rng = np.random.default_rng(seed)
+    predictor = CryptoPricePredictor()
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    volumes = rng.uniform(1e5, 1e6, n)
+    volumes[rng.random(n) < 0.05] = 0  # Zero volume days exercise the ratio fallback
+    if gaps:
+        prices[rng.choice(np.arange(40, n), 3, replace=False)] = np.nan
+        volumes[rng.choice(n, 5, replace=False)] = np.nan
+    df = pd.DataFrame({'date': pd.date_range('2022-01-01', periods=n, freq='D'),
+                       'price': prices, 'volume': volumes})
+    df['returns'] = df['price'].pct_change()
+    df['rsi'] = predictor.calculate_rsi_series(df['price'])
+    df['macd'], df['macd_signal'] = predictor.calculate_macd_series(df['price'])
+    df['volume_ma'] = df['volume'].rolling(window=7).mean()
+    df['price_ma_5'] = df['price'].rolling(window=5).mean()
+    df['price_ma_20'] = df['price'].rolling(window=20).mean()
+    df['volatility'] = df['price'].rolling(window=10).std()
+    return df
+
+
+def test_prepare_features_matches_reference_loop():
+    for gaps in (False, True):
+        df = indicator_frame(300, gaps=gaps)
+        X, y, dates = CryptoPricePredictor().prepare_features(df)
+        X_ref, y_ref, dates_ref = reference_prepare_features(df)
+        assert X.shape == X_ref.shape
+        np.testing.assert_allclose(X, X_ref, rtol=1e-12, atol=1e-12)
+        np.testing.assert_array_equal(y, y_ref)
+        assert dates == dates_ref
+
+
+def test_prepare_features_short_input():
+    X, y, dates = CryptoPricePredictor().prepare_features(indicator_frame(31))
+    assert len(X) == 0 and len(y) == 0 and dates == []
+
+
+def test_direction_features_match_reference_loop():
+    prices = list(100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 500)))
+    X, y = build_direction_features(prices)
+    X_ref, y_ref = reference_direction_features(prices)
+    np.testing.assert_allclose(X, X_ref, rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(y, y_ref)
+    assert len(build_direction_features(prices[:21])[0]) == 0
+
+
+def test_prepare_features_scales_to_years_of_data():
+    df = indicator_frame(365 * 10)
+    X, y, dates = CryptoPricePredictor().prepare_features(df)
+    assert X.shape == (len(df) - 31, 22) and len(y) == len(dates) == len(X)
+    # Rows only look back 30 bars, so the tail matches the reference loop on the last bars alone
+    X_ref, y_ref, dates_ref = reference_prepare_features(df.iloc[-131:].reset_index(drop=True))
+    np.testing.assert_allclose(X[-100:], X_ref, rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(y[-100:], y_ref)
+    assert dates[-100:] == dates_ref
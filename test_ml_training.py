@@ -0,0 +1,67 @@
+import json
+import os
+
+import pandas as pd
+
+from ml_predictions import MODEL_NAMES, CryptoPricePredictor
+from ml_training import train_many
+from test_feature_store import synthetic_bars
+from tree_compiler import CompiledTreeEnsemble
+
+
+def test_train_many_trains_each_coin_and_reports(tmp_path, monkeypatch):
+    def load_bars(self, coin, days):
+        if coin == 'tinycoin':
+            return synthetic_bars(40, end=pd.Timestamp.now())
+        return synthetic_bars(days, end=pd.Timestamp.now(), seed=len(coin))
+
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars', load_bars)
+    model_dir = str(tmp_path / 'models')
+    summary = train_many(['bitcoin', 'ethereum', 'solana', 'tinycoin'], days=200, cpu_budget=2,
+                         model_dir=model_dir, feature_store_dir=str(tmp_path / 'features'))
+
+    assert summary['trained'] == ['bitcoin', 'ethereum', 'solana']
+    assert summary['failed'] == ['tinycoin']
+    assert summary['coins']['tinycoin']['status'] == 'insufficient_data'
+    assert summary['workers'] == 2
+    assert set(summary['coins']['bitcoin']['models']) == set(MODEL_NAMES)
+    with open(os.path.join(model_dir, 'training_summary.json')) as f:
+        assert json.load(f)['trained'] == summary['trained']
+    versions = os.listdir(os.path.join(model_dir, 'bitcoin', 'versions'))
+    assert versions == [summary['coins']['bitcoin']['version']]
+    assert not os.path.exists(os.path.join(model_dir, 'tinycoin'))
+
+    # Artifacts load and serve through the existing predictor API
+    monkeypatch.chdir(tmp_path)
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'features'))
+    assert predictor.load_models('bitcoin')
+    assert predictor.model_version == summary['coins']['bitcoin']['version']
+    assert predictor.train_window['rows'] == summary['coins']['bitcoin']['samples']
+    assert set(predictor.models) == set(MODEL_NAMES)
+    assert not predictor.scalers  # The incremental linear model standardizes internally
+    assert isinstance(predictor.models['RandomForest'], CompiledTreeEnsemble)
+    assert predictor.predict_price('bitcoin')['predicted_price'] > 0
+
+    # Every horizon comes from the same feature row and model calls
+    prediction = predictor.predict_price('bitcoin', horizons=[1, 3, 7])
+    assert [point['days_ahead'] for point in prediction['forecast']] == [1, 3, 7]
+    assert prediction['predicted_price'] == prediction['forecast'][0]['predicted_price']
+    assert set(prediction['forecast'][2]['individual_predictions']) == set(MODEL_NAMES)
+    assert predictor.predict_price('bitcoin', days_ahead=30) is None
+
+
+def test_train_many_defaults_to_the_registry_model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars',
+                        lambda self, coin, days: synthetic_bars(days, end=pd.Timestamp.now()))
+    model_dir = tmp_path / 'shared-models'
+    monkeypatch.setenv('MODEL_DIR', str(model_dir))
+    monkeypatch.chdir(tmp_path)
+    summary = train_many(['bitcoin'], days=120, cpu_budget=1, feature_store_dir=str(tmp_path / 'features'))
+
+    assert summary['trained'] == ['bitcoin']
+    assert (model_dir / 'training_summary.json').exists()
+    assert not (tmp_path / 'models').exists()
+    # The predictor's default registry serves what was trained
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'features'))
+    assert predictor.load_models('bitcoin')
+    assert predictor.model_version == summary['coins']['bitcoin']['version']
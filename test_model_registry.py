@@ -0,0 +1,83 @@
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from ml_predictions import FEATURE_NAMES, CryptoPricePredictor
+from model_registry import ModelRegistry, get_registry, schema_hash
+
+
+def fitted(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(50, len(FEATURE_NAMES)))
+    y = X @ rng.normal(size=len(FEATURE_NAMES))
+    return {'LinearRegression': LinearRegression().fit(X, y)}, {'LinearRegression': StandardScaler().fit(X)}
+
+
+def test_register_versions_and_serve_from_cache(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path))
+    models, scalers = fitted()
+    first = registry.register('BTC', models, scalers, metrics={'LinearRegression': {'r2': 0.5}},
+                              feature_names=FEATURE_NAMES, train_window={'rows': 50})
+    second = registry.register('btc', *fitted(1), feature_names=FEATURE_NAMES)
+    assert first < second
+    assert [v['version'] for v in registry.versions('btc')] == [first, second]
+    assert registry.versions('btc')[0]['feature_schema'] == schema_hash(FEATURE_NAMES)
+    with open(tmp_path / 'btc' / 'current.json') as f:
+        assert json.load(f)['version'] == second
+
+    bundle = registry.load('btc')
+    assert bundle.version == second
+    assert registry.load('btc', first).metrics == {'LinearRegression': {'r2': 0.5}}
+
+    # Warm loads never touch the artifacts
+    def no_disk(*args, **kwargs):
+        raise AssertionError('model loaded from disk')
+    monkeypatch.setattr('model_registry.joblib.load', no_disk)
+    assert registry.load('btc') is bundle
+    assert registry.stats['hits'] == 1 and registry.stats['misses'] == 2
+
+
+def test_lru_eviction_and_schema_check(tmp_path):
+    registry = ModelRegistry(str(tmp_path), cache_size=1)
+    registry.register('btc', *fitted(), feature_names=FEATURE_NAMES)
+    registry.register('eth', *fitted(), feature_names=['price_mean'])
+    assert registry.load('btc') is not None
+    assert registry.load('eth', feature_names=FEATURE_NAMES) is None
+    assert registry.stats['evictions'] == 1
+    assert registry.load('doge') is None
+
+
+def test_predictors_share_registry_and_read_legacy_layout(tmp_path):
+    models, scalers = fitted()
+    legacy = tmp_path / 'bitcoin'
+    legacy.mkdir()
+    joblib.dump(models['LinearRegression'], legacy / 'LinearRegression.joblib')
+    joblib.dump(scalers['LinearRegression'], legacy / 'LinearRegression_scaler.joblib')
+
+    first = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path))
+    second = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path))
+    assert first.registry is second.registry is get_registry(str(tmp_path))
+    assert first.load_models('bitcoin') and second.load_models('bitcoin')
+    assert first.model_version == 'legacy'
+    assert first.models['LinearRegression'] is second.models['LinearRegression']
+    assert not os.path.exists(tmp_path / 'bitcoin' / 'versions')
+
+
+def test_default_registry_keeps_serving_models_saved_in_models_dir(tmp_path, monkeypatch):
+    for name in ('DATA_DIR', 'MODEL_DIR'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert get_registry().root == str(tmp_path / 'data' / 'models')
+
+    models, scalers = fitted()
+    legacy = tmp_path / 'models' / 'bitcoin'
+    legacy.mkdir(parents=True)
+    joblib.dump(models['LinearRegression'], legacy / 'LinearRegression.joblib')
+    joblib.dump(scalers['LinearRegression'], legacy / 'LinearRegression_scaler.joblib')
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'f'))
+    assert predictor.registry.root == str(tmp_path / 'models')
+    assert predictor.load_models('bitcoin') and predictor.model_version == 'legacy'
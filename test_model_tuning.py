@@ -0,0 +1,49 @@
+import json
+import os
+
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+
+from ml_predictions import CryptoPricePredictor
+from model_registry import get_registry
+from model_tuning import SEARCH_SPACES, budgets, sample_candidates, tune
+from test_feature_store import synthetic_bars
+
+
+def test_budgets_grow_by_eta_up_to_the_maximum():
+    assert budgets(25, 100, 3) == [25, 75, 100]
+    assert budgets(10, 90, 3) == [10, 30, 90]
+
+
+def test_sample_candidates_is_seeded_and_distinct():
+    first = sample_candidates(SEARCH_SPACES['RandomForest'], 9, seed=1)
+    assert first == sample_candidates(SEARCH_SPACES['RandomForest'], 9, seed=1)
+    assert len({json.dumps(c, sort_keys=True) for c in first}) == 9
+    assert len(sample_candidates({'a': [1, 2]}, 9)) == 2
+
+
+def test_tune_stores_params_that_training_uses(tmp_path, monkeypatch):
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars',
+                        lambda self, coin, days: synthetic_bars(days, end=pd.Timestamp.now()))
+    model_dir = str(tmp_path / 'models')
+    summary = tune(['bitcoin'], n_candidates=9, days=150, cpu_budget=2, model_dir=model_dir,
+                   feature_store_dir=str(tmp_path / 'features'), n_splits=3, min_estimators=4, max_estimators=12)
+
+    assert summary['tuned'] == ['bitcoin']
+    assert summary['budgets'] == [4, 12]
+    # 9 + 3 per model instead of 9 at every rung
+    assert summary['evaluations'] == 2 * (9 + 3)
+    params = get_registry(model_dir).tuned_params('bitcoin')
+    assert set(params) == {'RandomForest', 'GradientBoosting'}
+    assert params['RandomForest']['n_estimators'] == 12
+    assert {k: v for k, v in params['RandomForest'].items() if k != 'n_estimators'} in \
+        list(ParameterGrid(SEARCH_SPACES['RandomForest']))
+    assert os.path.exists(os.path.join(model_dir, 'bitcoin', 'params.json'))
+
+    predictor = CryptoPricePredictor(feature_store_dir=str(tmp_path / 'features'), model_dir=model_dir)
+    predictor.train_models('bitcoin', days=150)
+    assert len(predictor.models['RandomForest'].estimators_) >= 12
+    assert predictor.models['GradientBoosting'].estimators_[0].learning_rate == params['GradientBoosting']['learning_rate']
+    version = predictor.save_models('bitcoin')
+    assert get_registry(model_dir).versions('bitcoin')[-1]['params'] == params
+    assert version
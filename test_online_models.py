@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from ml_predictions import ONLINE_MODEL, CryptoPricePredictor
+from online_models import OnlineLogisticRegression, RecursiveLeastSquares
+from test_bot_manager import rsi_only_config
+from test_feature_store import synthetic_bars
+from trading_bot import AdvancedTradingBot
+
+
+def test_rls_tracks_a_drifting_relationship():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4)) * [1, 100, 0.01, 1e4]
+    w = np.array([2.0, 0.03, 300.0, 1e-4])
+    y = X @ w + 50
+    y[300:] = X[300:] @ (w * [-1, 1, 1, 1]) + 50  # Regime change
+
+    model = RecursiveLeastSquares().fit(X[:300], y[:300])
+    assert np.allclose(model.predict(X[250:300]), y[250:300], atol=0.5)
+    for i in range(300, 600):
+        model.partial_fit(X[i:i + 1], y[i:i + 1])
+    assert np.allclose(model.predict(X[550:]), y[550:], atol=0.5)
+
+    # Copies are independent of the original
+    clone = model.copy()
+    clone.partial_fit(X[:10], y[:10] + 100)
+    assert not np.allclose(clone.predict(X[:5]), model.predict(X[:5]))
+
+
+def test_online_logistic_regression_learns_direction():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(1000, 8)) * 50
+    y = (X[:, 2] - X[:, 5] > 0).astype(int)
+    model = OnlineLogisticRegression().fit(X[:800], y[:800])
+    assert ((model.predict_proba(X[800:]) > 0.5) == y[800:]).mean() > 0.9
+
+
+def test_bot_learns_each_closed_bar_once():
+    config = dict(rsi_only_config(), online_learning=True)
+    bot = AdvancedTradingBot(config, demo_mode=True)
+    prices = list(100 * np.exp(np.cumsum(np.random.default_rng(2).normal(0, 0.02, 40))))
+    assert bot.train_ml_model('bitcoin', prices=prices)
+    model = bot.online_models['bitcoin']
+    coef = model.coef_.copy()
+
+    # A moving last price alone does not teach the model anything
+    assert bot.predict_price_direction('bitcoin', prices=prices[:-1] + [prices[-1] * 1.01]) is not None
+    assert np.array_equal(model.coef_, coef)
+
+    # A newly closed bar does
+    bot.predict_price_direction('bitcoin', prices=prices[1:] + [prices[-1] * 1.02])
+    assert not np.array_equal(model.coef_, coef)
+    assert 'bitcoin' in bot.get_state()['online_models']
+
+
+def test_online_member_catches_up_on_new_bars(tmp_path, monkeypatch):
+    today = pd.Timestamp.now().normalize()
+    feed = {'end': today - pd.Timedelta(days=3)}
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars',
+                        lambda self, coin, days: synthetic_bars(days, end=feed['end']))
+    dirs = dict(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path / 'm'))
+    trainer = CryptoPricePredictor(**dirs)
+    assert trainer.train_models('bitcoin', days=120)
+    trainer.save_models('bitcoin')
+
+    server = CryptoPricePredictor(**dirs)
+    stored = server.registry.load('bitcoin').models[ONLINE_MODEL]
+    seen = stored.n_seen
+
+    feed['end'] = today
+    prediction = server.predict_many(['bitcoin'])['bitcoin']
+    assert ONLINE_MODEL in prediction['individual_predictions']
+    live = server._online['bitcoin']['model']
+    assert live.n_seen == seen + 2  # Today's bar is still open, so two new closed rows
+    assert stored.n_seen == seen  # The cached registry model is untouched
+    server.predict_many(['bitcoin'])
+    assert live.n_seen == seen + 2
@@ -0,0 +1,93 @@
+import pytest
+
+from position_ledger import PositionLedger
+
+
+def test_average_cost_and_realized_pnl_net_of_fees():
+    ledger = PositionLedger(initial_cash=10000)
+    ledger.on_fill('bitcoin', 'buy', 0.1, 20000.0, fee=2.0)
+    ledger.on_fill('bitcoin', 'buy', 0.1, 30000.0, fee=3.0)
+
+    pos = ledger.positions['bitcoin']
+    assert pos.avg_cost == pytest.approx((2000 + 2 + 3000 + 3) / 0.2)
+    assert ledger.cash == pytest.approx(10000 - 5005)
+
+    realized = ledger.on_fill('bitcoin', 'sell', 0.1, 30000.0, fee=3.0)
+    assert realized == pytest.approx(0.1 * (30000 - 25025) - 3)
+    assert ledger.realized_pnl == pytest.approx(realized)
+    assert ledger.fees == pytest.approx(8.0)
+    assert ledger.quantity('bitcoin') == pytest.approx(0.1)
+
+
+def test_wins_and_losses_are_counted_per_closing_fill():
+    ledger = PositionLedger()
+    ledger.on_fill('bitcoin', 'buy', 1.0, 100.0)
+    ledger.on_fill('bitcoin', 'sell', 0.5, 110.0)
+    ledger.on_fill('bitcoin', 'sell', 0.5, 90.0)
+
+    metrics = ledger.metrics()
+    assert metrics['winning_trades'] == 1
+    assert metrics['losing_trades'] == 1
+    assert metrics['win_rate'] == 0.5
+    assert metrics['profit_factor'] == pytest.approx(1.0)
+    assert metrics['open_positions'] == 0
+    assert ledger.positions['bitcoin'].avg_cost == 0.0
+
+
+def test_marks_update_unrealized_pnl_exposure_and_drawdown():
+    ledger = PositionLedger(initial_cash=1000)
+    ledger.on_fill('ethereum', 'buy', 1.0, 500.0)
+    ledger.mark('ethereum', 600.0)
+    assert ledger.unrealized_pnl == pytest.approx(100.0)
+    assert ledger.equity == pytest.approx(1100.0)
+    assert ledger.peak_equity == pytest.approx(1100.0)
+
+    ledger.mark('ethereum', 390.0)
+    assert ledger.metrics()['exposure'] == pytest.approx(390.0)
+    assert ledger.drawdown == pytest.approx((1100 - 890) / 1100)
+    assert ledger.max_drawdown == pytest.approx(ledger.drawdown)
+
+    ledger.mark('ethereum', 500.0)
+    assert ledger.max_drawdown == pytest.approx((1100 - 890) / 1100)
+
+
+def test_overselling_is_rejected_without_changing_the_book():
+    ledger = PositionLedger()
+    ledger.on_fill('bitcoin', 'buy', 0.1, 100.0)
+    with pytest.raises(ValueError):
+        ledger.on_fill('bitcoin', 'sell', 0.2, 100.0)
+    assert ledger.quantity('bitcoin') == pytest.approx(0.1)
+    assert ledger.market_value == pytest.approx(10.0)
+
+
+def test_state_round_trip():
+    ledger = PositionLedger()
+    ledger.on_fill('bitcoin', 'buy', 0.1, 100.0, fee=0.1)
+    ledger.mark('bitcoin', 120.0)
+    restored = PositionLedger.from_state(ledger.to_state())
+    assert restored.metrics() == ledger.metrics()
+    assert restored.positions['bitcoin'].to_dict() == ledger.positions['bitcoin'].to_dict()
+
+
+def test_bot_metrics_need_no_trades_and_no_network(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    monkeypatch.setenv('BOT_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    import trading_bot
+    monkeypatch.setattr(trading_bot, 'fetch_price', lambda coin: pytest.fail("network call"))
+    config = trading_bot.create_advanced_strategy_config()
+    config['execution']['latency'] = 0.0
+    bot = trading_bot.AdvancedTradingBot(config)
+
+    metrics = bot.get_performance_metrics()
+    assert metrics['total_trades'] == 0
+    assert metrics['portfolio_value'] == 10000
+
+    assert bot.execute_buy('bitcoin', 0.01, 50000.0, 'test', 0.5)
+    assert bot.execute_sell('bitcoin', 0.01, 50000.0, 'test', 0.5)
+    metrics = bot.get_performance_metrics()
+    # Round trip through the simulated book loses spread and fees
+    assert metrics['losing_trades'] == 1
+    assert metrics['winning_trades'] == 0
+    assert metrics['realized_pnl'] < 0
+    assert metrics['fees'] > 0
+    bot.stop()
@@ -0,0 +1,78 @@
+import os
+from datetime import datetime, timedelta
+
+from trade_journal import TradeJournal
+
+
+def make_trade(coin, ts, action='BUY', price=100.0):
+    return {
+        'timestamp': ts.isoformat(),
+        'action': action,
+        'coin': coin,
+        'amount': 1.0,
+        'price': price,
+        'fee': 0.1,
+        'reason': 'test',
+        'confidence': 0.5,
+    }
+
+
+def test_journal_persists_and_filters_by_coin_and_time(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = TradeJournal(path, batch_size=10, flush_interval=0.05, recent_size=3)
+    base = datetime(2024, 1, 1)
+    for i in range(20):
+        coin = 'bitcoin' if i % 2 == 0 else 'ethereum'
+        journal.record_trade(make_trade(coin, base + timedelta(hours=i), price=100.0 + i))
+    journal.record_fill({'coin': 'bitcoin', 'side': 'buy', 'order_id': 1, 'quantity': 1.0,
+                         'price': 100.0, 'fee': 0.1, 'liquidity': 'taker', 'timestamp': base.timestamp()})
+    journal.close()
+
+    # In-memory ring stays bounded
+    assert len(journal.recent) == 3
+    assert journal.written == 21
+
+    reader = TradeJournal(path, read_only=True)
+    assert len(reader.query_trades()) == 20
+    btc = reader.query_trades(coin='bitcoin', start=base + timedelta(hours=4), end=base + timedelta(hours=10))
+    assert [t['price'] for t in btc] == [110.0, 108.0, 106.0, 104.0]
+    assert reader.query_fills(coin='bitcoin')[0]['liquidity'] == 'taker'
+
+
+def test_bot_journals_trades_and_bounds_history(tmp_path, monkeypatch):
+    from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+    monkeypatch.setenv('BOT_JOURNAL_PATH', str(tmp_path / 'bot.db'))
+    config = create_advanced_strategy_config()
+    config['trade_history_size'] = 5
+    config['execution']['latency'] = 0.0
+    bot = AdvancedTradingBot(config, demo_mode=True)
+    for _ in range(8):
+        bot.execute_buy('bitcoin', 0.001, 50000.0, 'test', 0.5)
+    bot.close()
+
+    assert len(bot.trade_history) == 5
+    assert bot.total_trades == 8
+    assert len(bot.journal.query_trades(coin='bitcoin')) == 8
+    assert len(bot.journal.query_fills(coin='bitcoin')) == 8
+
+
+def test_journal_creates_its_directory(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'nested' / 'journal.db'), flush_interval=0.01)
+    journal.record_trade(make_trade('bitcoin', datetime(2024, 1, 1)))
+    journal.close()
+    assert len(journal.query_trades()) == 1
+
+
+def test_bot_starts_with_the_default_journal_path(tmp_path, monkeypatch):
+    from trading_bot import AdvancedTradingBot, create_advanced_strategy_config
+
+    for name in ('DATA_DIR', 'BOT_JOURNAL_PATH', 'BOT_CHECKPOINT_DIR'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    config = create_advanced_strategy_config()
+    bot = AdvancedTradingBot(config, demo_mode=True)
+    bot.close()
+    assert config['journal_path'] == os.path.join('data', 'trade_journal.db')
+    assert (tmp_path / 'data' / 'trade_journal.db').exists()
+    assert config['checkpoint_dir'] == os.path.join('data', 'checkpoints')
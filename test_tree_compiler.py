@@ -0,0 +1,70 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from tree_compiler import CompiledTreeEnsemble, compile_model
+
+
+def data(n=300, features=22, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, features)).astype(np.float32)
+    y = 3 * X[:, 0] - X[:, 1] ** 2 + rng.normal(size=n)
+    return X, y
+
+
+@pytest.mark.parametrize('model', [
+    RandomForestRegressor(n_estimators=50, random_state=42),
+    ExtraTreesRegressor(n_estimators=20, random_state=1),
+    GradientBoostingRegressor(n_estimators=100, random_state=42),
+    GradientBoostingRegressor(n_estimators=30, init='zero', learning_rate=0.3, random_state=0),
+    DecisionTreeRegressor(max_depth=6, random_state=0),
+])
+def test_compiled_predictions_match_sklearn_exactly(model):
+    X, y = data()
+    model.fit(X, y)
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledTreeEnsemble)
+
+    # float64 inputs (e.g. scaled features) and single rows included
+    X_new = np.random.default_rng(1).normal(size=(200, X.shape[1]))
+    assert np.array_equal(compiled.predict(X_new), model.predict(X_new))
+    assert np.array_equal(compiled.predict(X_new[:1]), model.predict(X_new[:1]))
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+
+@pytest.mark.parametrize('model', [
+    RandomForestRegressor(n_estimators=30, random_state=42),
+    MultiOutputRegressor(GradientBoostingRegressor(n_estimators=40, subsample=0.8, random_state=42)),
+])
+def test_multi_output_models_compile_to_one_ensemble(model):
+    X, y = data()
+    Y = np.column_stack([y, y + X[:, 2], 2 * y])
+    model.fit(X, Y)
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledTreeEnsemble)
+
+    X_new = np.random.default_rng(1).normal(size=(100, X.shape[1]))
+    assert compiled.predict(X_new).shape == (100, 3)
+    assert np.array_equal(compiled.predict(X_new), model.predict(X_new))
+    assert np.array_equal(compiled.predict(X_new[:1]), model.predict(X_new[:1]))
+
+
+def test_compiled_artifact_is_smaller_and_rejects_bad_input():
+    X, y = data()
+    model = RandomForestRegressor(n_estimators=50, random_state=42).fit(X, y)
+    compiled = compile_model(model)
+    assert len(pickle.dumps(compiled)) < len(pickle.dumps(model)) / 2
+    assert compile_model(compiled) is compiled
+    with pytest.raises(ValueError):
+        compiled.predict(X[:, :5])
+
+
+def test_other_models_pass_through():
+    X, y = data()
+    model = LinearRegression().fit(X, y)
+    assert compile_model(model) is model
@@ -3,6 +3,7 @@ import logging
 
 from utils import (
     safe_getenv,
+    data_path,
     format_currency,
     format_percentage,
     format_large_number,
@@ -37,6 +38,20 @@ def test_safe_getenv_logs_warning_when_required_and_missing(caplog):
     assert any(key in record.getMessage() for record in caplog.records)
 
 
+def test_data_path_defaults_to_data_dir_and_honours_overrides(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATA_DIR", raising=False)
+    monkeypatch.delenv("BOT_JOURNAL_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert data_path("trade_journal.db", "BOT_JOURNAL_PATH") == os.path.join("data", "trade_journal.db")
+    # Data written before DATA_DIR keeps being used
+    (tmp_path / "checkpoints").mkdir()
+    assert data_path("checkpoints", legacy="checkpoints") == "checkpoints"
+    monkeypatch.setenv("DATA_DIR", "/var/lib/bot")
+    assert data_path("models", legacy="models") == os.path.join("/var/lib/bot", "models")
+    monkeypatch.setenv("BOT_JOURNAL_PATH", "/tmp/journal.db")
+    assert data_path("trade_journal.db", "BOT_JOURNAL_PATH") == "/tmp/journal.db"
+
+
 def test_format_currency_usd():
     assert format_currency(1234.56) == "$1,234.56"
     assert format_currency(0) == "$0.00"
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from ml_predictions import CryptoPricePredictor
+from test_feature_store import synthetic_bars
+from walk_forward import ForecastErrors, IncrementalLinearRegression, advance, walk_forward
+
+
+def data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6)) * [1, 10, 1e3, 1e-2, 1, 5] + [0, 0, 1e4, 0, 0, 0]
+    y = X @ [1.0, -0.5, 0.01, 30.0, 0.0, 2.0] + rng.normal(size=n)
+    return X, y
+
+
+def test_incremental_linear_regression_matches_batch_fit():
+    X, y = data()
+    model = IncrementalLinearRegression().fit(X[:50], y[:50])
+    model.partial_fit(X[50:120], y[50:120])
+    model.partial_fit(X[120:], y[120:])
+    assert np.allclose(model.predict(X), LinearRegression().fit(X, y).predict(X))
+
+    # Rolling: forgetting the oldest rows equals fitting the remainder
+    model.forget(X[:80], y[:80])
+    assert np.allclose(model.predict(X), LinearRegression().fit(X[80:], y[80:]).predict(X))
+
+
+def test_multi_horizon_targets_fit_per_column():
+    X, y = data()
+    Y = np.column_stack([y, 2 * y + X[:, 0], -y])
+    model = IncrementalLinearRegression().fit(X[:100], Y[:100])
+    model.partial_fit(X[100:], Y[100:])
+    model.forget(X[:40], Y[:40])
+    assert np.allclose(model.predict(X), LinearRegression().fit(X[40:], Y[40:]).predict(X))
+
+    errors = ForecastErrors()
+    errors.update(Y[:10], Y[:10] + [1.0, 2.0, 0.0])
+    metrics = ForecastErrors.from_metrics(errors.metrics()).metrics()
+    assert np.allclose(metrics['rmse_by_horizon'], [1.0, 2.0, 0.0])
+    assert np.isclose(metrics['mse'], 5 / 3)
+
+
+def test_walk_forward_predicts_only_unseen_rows():
+    X, y = data()
+
+    class Guard(IncrementalLinearRegression):
+        def _merge(self, X_rows, y_rows, sign):
+            self.rows = getattr(self, 'rows', set())
+            for row in map(tuple, X_rows):
+                (self.rows.add if sign > 0 else self.rows.discard)(row)
+            return super()._merge(X_rows, y_rows, sign)
+
+        def predict(self, X_rows):
+            assert not self.rows & set(map(tuple, X_rows))
+            return super().predict(X_rows)
+
+    model, errors, start = walk_forward(Guard(), X, y, initial=100, step=7, window=60)
+    assert errors.n == 100
+    assert start == 140
+    assert len(model.rows) == 60
+    metrics = errors.metrics()
+    assert metrics['r2'] > 0.9 and metrics['oos']['n'] == 100
+
+
+def test_tree_models_grow_on_recent_data():
+    X, y = data()
+    forest = RandomForestRegressor(n_estimators=20, random_state=0).fit(X[:100], y[:100])
+    advance(forest, X, y, 0, 100, 110, trees_per_step=5, max_trees=30)
+    assert len(forest.estimators_) == 25
+    first = forest.estimators_[5]
+    advance(forest, X, y, 0, 110, 120, trees_per_step=10, max_trees=30)
+    assert len(forest.estimators_) == 30 and forest.estimators_[0] is first
+
+    boosted = GradientBoostingRegressor(n_estimators=20, random_state=0).fit(X[:100], y[:100])
+    advance(boosted, X, y, 0, 100, 110, trees_per_step=5)
+    assert boosted.estimators_.shape[0] == 25
+
+
+def test_update_models_folds_new_days_into_current_version(tmp_path, monkeypatch):
+    today = pd.Timestamp.now().normalize()
+    feed = {'end': today - pd.Timedelta(days=5)}
+    monkeypatch.setattr(CryptoPricePredictor, 'load_bars',
+                        lambda self, coin, days: synthetic_bars(days, end=feed['end']))
+    dirs = dict(feature_store_dir=str(tmp_path / 'f'), model_dir=str(tmp_path / 'm'))
+
+    predictor = CryptoPricePredictor(**dirs)
+    assert predictor.train_models('bitcoin', days=150)
+    first = predictor.save_models('bitcoin')
+    assert predictor.model_performance['RandomForest']['oos']['n'] > 0
+    oos_before = {name: m['oos']['n'] for name, m in predictor.model_performance.items()}
+
+    feed['end'] = today
+    updater = CryptoPricePredictor(**dirs)
+    assert updater.update_models('bitcoin', days=150)
+    # Four newly closed days; today's bar is still open
+    assert updater.model_performance['LinearRegression']['oos']['n'] == oos_before['LinearRegression'] + 4
+    assert pd.Timestamp(updater.train_window['end']) > pd.Timestamp(predictor.train_window['end'])
+    trees = len(predictor.models['RandomForest'].estimators_)
+    assert len(updater.models['RandomForest'].estimators_) == min(trees + 10, 300)
+    second = updater.save_models('bitcoin')
+    assert second != first
+
+    assert not CryptoPricePredictor(**dirs).update_models('bitcoin', days=150)
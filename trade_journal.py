@@ -0,0 +1,211 @@
+"""
+Persistent, append-only trade journal for the trading bot.
+
+Trades and fills are queued in memory and written to SQLite (WAL mode) by a
+background thread in batches, so logging a trade never waits on disk. Only a
+bounded ring of recent trades is kept in memory; the full audit trail lives in
+the database and can be queried by coin and time range.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    coin TEXT NOT NULL,
+    action TEXT NOT NULL,
+    amount REAL,
+    price REAL,
+    fee REAL,
+    reason TEXT,
+    confidence REAL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_coin_ts ON trades (coin, ts);
+CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades (ts);
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    coin TEXT NOT NULL,
+    side TEXT NOT NULL,
+    order_id INTEGER,
+    quantity REAL,
+    price REAL,
+    fee REAL,
+    liquidity TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fills_coin_ts ON fills (coin, ts);
+"""
+
+_STOP = object()
+
+
+def _to_epoch(value, default=None):
+    """Accept epoch seconds, datetime or ISO-8601 strings."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+class TradeJournal:
+    """SQLite-backed trade log with a batched background writer."""
+
+    def __init__(self, path='trade_journal.db', batch_size=500, flush_interval=1.0, recent_size=1000,
+                 read_only=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recent = deque(maxlen=recent_size)
+        self.written = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        if read_only:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+        self._thread = threading.Thread(target=self._writer, name='trade-journal', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    # --- Writes --------------------------------------------------------------
+
+    def _ensure_writable(self):
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError(f"Trade journal {self.path} is closed or read-only")
+
+    def record_trade(self, trade):
+        """Queue a trade dict as produced by AdvancedTradingBot.log_trade."""
+        self._ensure_writable()
+        self.recent.append(trade)
+        row = (
+            _to_epoch(trade.get('timestamp'), datetime.now().timestamp()),
+            trade['coin'],
+            trade['action'],
+            trade.get('amount'),
+            trade.get('price'),
+            trade.get('fee'),
+            trade.get('reason'),
+            trade.get('confidence'),
+            json.dumps(trade, default=str),
+        )
+        self._queue.put(('trade', row))
+
+    def record_fill(self, fill):
+        """Queue a fill dict as produced by execution_simulator.Fill.to_dict."""
+        self._ensure_writable()
+        row = (
+            _to_epoch(fill.get('timestamp'), datetime.now().timestamp()),
+            fill['coin'],
+            fill['side'],
+            fill.get('order_id'),
+            fill.get('quantity'),
+            fill.get('price'),
+            fill.get('fee'),
+            fill.get('liquidity'),
+        )
+        self._queue.put(('fill', row))
+
+    def _writer(self):
+        conn = self._connect()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(entry is _STOP for entry in batch)
+                self._write_batch(conn, [entry for entry in batch if entry is not _STOP])
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        trades = [row for kind, row in batch if kind == 'trade']
+        fills = [row for kind, row in batch if kind == 'fill']
+        try:
+            with conn:
+                if trades:
+                    conn.executemany(
+                        'INSERT INTO trades (ts, coin, action, amount, price, fee, reason, confidence, payload) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', trades)
+                if fills:
+                    conn.executemany(
+                        'INSERT INTO fills (ts, coin, side, order_id, quantity, price, fee, liquidity) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', fills)
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            logger.error(f"[TradeJournal] Failed to write {len(batch)} entries: {e}")
+
+    def flush(self):
+        """Block until every queued entry has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write outstanding entries and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # --- Reads ---------------------------------------------------------------
+
+    def _query(self, table, columns, coin, start, end, limit):
+        clauses = []
+        params = []
+        if coin:
+            clauses.append('coin = ?')
+            params.append(coin)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(_to_epoch(start))
+        if end is not None:
+            clauses.append('ts <= ?')
+            params.append(_to_epoch(end))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = f"SELECT {', '.join(columns)} FROM {table} {where} ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+        # WAL lets readers run alongside the writer thread
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def query_trades(self, coin=None, start=None, end=None, limit=1000):
+        """Most recent trades first, optionally filtered by coin and time range."""
+        rows = self._query('trades', ('ts', 'payload'), coin, start, end, limit)
+        return [json.loads(row['payload']) for row in rows]
+
+    def query_fills(self, coin=None, start=None, end=None, limit=1000):
+        """Most recent fills first, optionally filtered by coin and time range."""
+        columns = ('ts', 'coin', 'side', 'order_id', 'quantity', 'price', 'fee', 'liquidity')
+        return self._query('fills', columns, coin, start, end, limit)
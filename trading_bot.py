@@ -1,8 +1,13 @@
 import asyncio
+import copy
 import json
 import time
+import logging
 import requests
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from fetch_volume import (
     fetch_all_volumes, detect_volume_spike, calculate_rsi, 
@@ -10,6 +15,17 @@ from fetch_volume import (
     fetch_all_historical, calculate_macd
 )
 import websockets
+from market_data import MarketDataHub
+from bot_metrics import LoopLagMonitor, StageTimer
+from execution_simulator import SimulatedExchange
+from trade_journal import TradeJournal
+from checkpoint import BotCheckpointer
+from position_ledger import PositionLedger
+from adaptive_scheduler import AdaptiveScheduler
+from clock import WallClock
+from tree_compiler import compile_model
+from online_models import OnlineLogisticRegression
+from utils import data_path
 try:
     from sklearn.ensemble import RandomForestRegressor
     from sklearn.preprocessing import StandardScaler
@@ -19,6 +35,8 @@ except Exception:  # Handles ImportError and binary compatibility issues
 import pickle
 import os
 
+logger = logging.getLogger(__name__)
+
 def fetch_price(symbol):
     url = f'https://api.coingecko.com/api/v3/simple/price?ids={symbol.lower()}&vs_currencies=usd'
     response = requests.get(url)
@@ -27,15 +45,90 @@ def fetch_price(symbol):
     data = response.json()
     return data.get(symbol.lower(), {}).get('usd')
 
+def build_direction_features(prices, window=20):
+    """Build the direction model's feature matrix and up/down targets from a price series"""
+    prices = np.asarray(prices, dtype=float)
+    n_rows = len(prices) - 1 - window
+    if n_rows <= 0:
+        return np.array([]), np.array([])
+    
+    idx = np.arange(window, len(prices) - 1)
+    current = prices[idx]
+    # Row i uses the window prices before i
+    windows = sliding_window_view(prices, window)[:n_rows]
+    features = np.column_stack([
+        windows.mean(axis=1),  # Average price
+        windows.std(axis=1),   # Price volatility
+        current / prices[idx - 1] - 1,   # Price change
+        current / prices[idx - 5] - 1,   # 5-day change
+        current / prices[idx - 10] - 1,  # 10-day change
+        current / prices[idx - 20] - 1,  # 20-day change
+        windows.max(axis=1) / current - 1,  # Distance from high
+        current / windows.min(axis=1) - 1,  # Distance from low
+    ])
+    targets = (prices[idx + 1] > current).astype(int)
+    
+    return features, targets
+
+def latest_direction_features(prices, window=20):
+    """Feature row for the most recent price, matching build_direction_features"""
+    price_window = prices[-window:]
+    return [[
+        np.mean(price_window),
+        np.std(price_window),
+        prices[-1] / prices[-2] - 1,
+        prices[-1] / prices[-6] - 1,
+        prices[-1] / prices[-11] - 1,
+        prices[-1] / prices[-20] - 1,
+        np.max(price_window) / prices[-1] - 1,
+        prices[-1] / np.min(price_window) - 1,
+    ]]
+
+def fit_direction_model(prices):
+    """Fit the scaler and RandomForest direction model.
+
+    Module-level so it can run in a worker process; returns
+    (model, scaler, n_samples) or None when there is too little data.
+    """
+    X, y = build_direction_features(prices)
+    if len(X) < 10:
+        return None
+    
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(X_scaled, y)
+    return model, scaler, len(X)
+
 class AdvancedTradingBot:
-    def __init__(self, strategy_config, demo_mode=True):
+    def __init__(self, strategy_config, demo_mode=True, market_data=None, clock=None):
         self.strategy_config = strategy_config
         self.demo_mode = demo_mode
-        self.portfolio = {'cash': 10000}  # Starting with $10,000
-        self.trade_history = []
+        # All timestamps and daily resets go through the clock so replays can run in virtual time
+        self.clock = clock if clock is not None else WallClock()
+        self.market_data = market_data if market_data is not None else MarketDataHub()
+        # Cash, positions and cost basis; updated incrementally on every fill and price mark
+        self.ledger = PositionLedger(initial_cash=10000)  # Starting with $10,000
+        # Recent trades only; the full history is persisted by the journal
+        self.trade_history = deque(maxlen=strategy_config.get('trade_history_size', 1000))
+        self.total_trades = 0
+        journal_path = strategy_config.get('journal_path')
+        self.journal = TradeJournal(journal_path) if journal_path else None
         self.is_running = False
+        # Per-coin models; ml_model/scaler mirror the most recently trained coin
+        self.ml_models = {}
+        self.scalers = {}
         self.ml_model = None
         self.scaler = StandardScaler() if StandardScaler is not None else None
+        # Per-coin direction classifiers learning every closed bar between forest retrains
+        self.online_models = {}
+        self._online_last_bar = {}
+        # CPU-bound model training runs here so the event loop stays responsive
+        self.executor = None
+        self.loop_monitor = LoopLagMonitor(enabled=strategy_config.get('monitor_loop_lag', True))
+        # Per-stage tick-to-decision latency (fetch, indicators, inference, risk, routing)
+        self.timings = StageTimer()
         self.risk_metrics = {
             'max_position_size': 0.1,  # Max 10% of portfolio in single position
             'stop_loss': 0.05,  # 5% stop loss
@@ -44,31 +137,49 @@ class AdvancedTradingBot:
             'max_open_positions': 5
         }
         self.daily_pnl = 0
-        self.last_reset = datetime.now().date()
+        self.last_reset = self.clock.now().date()
+        checkpoint_dir = strategy_config.get('checkpoint_dir')
+        self.checkpointer = None
+        if checkpoint_dir:
+            self.checkpointer = BotCheckpointer(checkpoint_dir, interval=strategy_config.get('checkpoint_interval', 300))
+        # Per-coin polling cadence from volatility and open positions instead of a fixed check_interval
+        self.scheduler = None
+        adaptive = strategy_config.get('adaptive_polling')
+        if adaptive:
+            self.scheduler = AdaptiveScheduler(base_interval=strategy_config.get('check_interval', 300), **adaptive)
+        # Demo orders fill against a simulated order book with fees and slippage
+        self.simulator = None
+        if demo_mode:
+            self.simulator = SimulatedExchange(on_fill=self._apply_fill, **strategy_config.get('execution', {}))
         
-    def log_trade(self, action, coin, amount, price, reason, confidence=None):
+    def log_trade(self, action, coin, amount, price, reason, confidence=None, fee=0.0):
         trade = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'action': action,
             'coin': coin,
             'amount': amount,
             'price': price,
             'reason': reason,
             'confidence': confidence,
+            'fee': fee,
             'portfolio_value': self.get_portfolio_value(),
             'daily_pnl': self.daily_pnl
         }
         self.trade_history.append(trade)
-        print(f"[{trade['timestamp']}][{trade['action']}]: {amount} {trade['coin']} @ ${price:0.2f} due to {trade['reason']} (confidence: {confidence:.2f})")
+        self.total_trades += 1
+        if self.journal is not None:
+            self.journal.record_trade(trade)
+        logger.info("[%s][%s]: %s %s @ $%0.2f due to %s (confidence: %.2f)",
+                    trade['timestamp'], action, amount, coin, price, reason, confidence or 0)
+    
+    @property
+    def portfolio(self):
+        """Cash and quantity per coin, as tracked by the ledger"""
+        return self.ledger.holdings()
     
     def get_portfolio_value(self):
-        total = self.portfolio['cash']
-        for coin, amount in self.portfolio.items():
-            if coin != 'cash':
-                price = fetch_price(coin)
-                if price:
-                    total += amount * price
-        return total
+        """Cash plus positions at their latest marks; never touches the network"""
+        return self.ledger.equity
     
     def calculate_position_size(self, coin, confidence):
         """Calculate position size based on risk management rules"""
@@ -89,124 +200,207 @@ class AdvancedTradingBot:
     def check_risk_limits(self):
         """Check if we should stop trading due to risk limits"""
         # Reset daily PnL if it's a new day
-        if datetime.now().date() > self.last_reset:
+        today = self.clock.now().date()
+        if today > self.last_reset:
             self.daily_pnl = 0
-            self.last_reset = datetime.now().date()
+            self.last_reset = today
         
         # Check daily loss limit
         if self.daily_pnl < -self.get_portfolio_value() * self.risk_metrics['max_daily_loss']:
             return False, "Daily loss limit exceeded"
         
         # Check number of open positions
-        open_positions = len([k for k in self.portfolio.keys() if k != 'cash' and self.portfolio[k] > 0])
-        if open_positions >= self.risk_metrics['max_open_positions']:
+        if self.ledger.open_positions >= self.risk_metrics['max_open_positions']:
             return False, "Maximum open positions reached"
         
         return True, "OK"
     
+    def _apply_fill(self, order, fill):
+        """Book a simulator fill into the portfolio"""
+        self.ledger.on_fill(fill.coin, fill.side, fill.quantity, fill.price, fill.fee)
+        if self.journal is not None:
+            self.journal.record_fill(fill.to_dict())
+        reason, confidence = order.meta or (None, None)
+        self.log_trade(fill.side.upper(), fill.coin, fill.quantity, fill.price, reason, confidence, fee=fill.fee)
+    
+    def settle_orders(self, coin, price):
+        """Quote coin to the simulator and fill demo orders whose latency has elapsed.
+
+        Prices are polled, so an order meets the first quote seen after it arrives.
+        """
+        now = self.clock.time()
+        self.simulator.update_market(coin, price, now, release=False)
+        return self.simulator.advance(now)
+    
+    def _pending(self, coin, side):
+        return [o for o in self.simulator.orders.values()
+                if o.status == 'pending' and o.side == side and (coin is None or o.coin == coin)]
+    
+    def _execute_simulated(self, side, coin, amount, price, reason, confidence):
+        """Route a market order through the simulated exchange.
+        
+        The order reaches the book after the configured latency, on a later
+        settle_orders(); returns whether it was accepted.
+        """
+        sim = self.simulator
+        now = self.clock.time()
+        if sim.book_mid(coin) != price:
+            sim.update_market(coin, price, now, release=False)
+        
+        # Cash and coins already committed to orders still in flight
+        if side == 'buy':
+            qty, avg_price, fee = sim.estimate_fill(coin, 'buy', amount)
+            reserved = sum(o.quantity * sim.book_mid(o.coin) for o in self._pending(None, 'buy'))
+            if qty <= 0 or self.ledger.cash - reserved < qty * avg_price + fee:
+                return False
+        elif self.ledger.quantity(coin) - sum(o.quantity for o in self._pending(coin, 'sell')) < amount:
+            return False
+        
+        order = sim.submit_order(coin, side, amount, timestamp=now, meta=(reason, confidence))
+        sim.advance(now)  # Without latency the order fills at once
+        return order.status != 'rejected'
+    
     def execute_buy(self, coin, amount, price, reason, confidence=None):
+        with self.timings.time('order_routing'):
+            return self._execute_buy(coin, amount, price, reason, confidence)
+    
+    def _execute_buy(self, coin, amount, price, reason, confidence):
+        if self.simulator is not None:
+            return self._execute_simulated('buy', coin, amount, price, reason, confidence)
         cost = amount * price
-        if self.portfolio['cash'] >= cost:
-            self.portfolio['cash'] -= cost
-            if coin not in self.portfolio:
-                self.portfolio[coin] = 0
-            self.portfolio[coin] += amount
+        if self.ledger.cash >= cost:
+            self.ledger.on_fill(coin, 'buy', amount, price)
             self.log_trade('BUY', coin, amount, price, reason, confidence)
             return True
         return False
     
     def execute_sell(self, coin, amount, price, reason, confidence=None):
-        if coin in self.portfolio and self.portfolio[coin] >= amount:
-            self.portfolio[coin] -= amount
-            self.portfolio['cash'] += amount * price
+        with self.timings.time('order_routing'):
+            return self._execute_sell(coin, amount, price, reason, confidence)
+    
+    def _execute_sell(self, coin, amount, price, reason, confidence):
+        if self.simulator is not None:
+            return self._execute_simulated('sell', coin, amount, price, reason, confidence)
+        if self.ledger.quantity(coin) >= amount:
+            self.ledger.on_fill(coin, 'sell', amount, price)
             self.log_trade('SELL', coin, amount, price, reason, confidence)
             return True
         return False
     
-    def train_ml_model(self, coin, days=30):
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.strategy_config.get('ml_workers', 1))
+        return self.executor
+    
+    def _install_model(self, coin, model, scaler):
+        # Served through flattened node arrays; sklearn's per-call overhead dominates one-row predicts
+        model = compile_model(model)
+        self.ml_models[coin] = model
+        self.scalers[coin] = scaler
+        self.ml_model = model
+        self.scaler = scaler
+    
+    def train_ml_model(self, coin, days=30, prices=None):
         """Train a machine learning model for price prediction"""
         if RandomForestRegressor is None or self.scaler is None:
             print("ML components are unavailable; skipping model training.")
             return False
         try:
             # Get historical data
-            hist_data = fetch_all_historical(coin.upper(), days=days)
-            if not hist_data or not hist_data.get('binance'):
-                return False
+            if prices is None:
+                hist_data = fetch_all_historical(coin.upper(), days=days)
+                if not hist_data or not hist_data.get('binance'):
+                    return False
+                prices = hist_data['binance']
             
-            prices = hist_data['binance']
             if len(prices) < 20:
                 return False
             
-            # Create features
-            features = []
-            targets = []
-            
-            for i in range(20, len(prices) - 1):
-                # Price features
-                price_window = prices[i-20:i]
-                features.append([
-                    np.mean(price_window),  # Average price
-                    np.std(price_window),   # Price volatility
-                    prices[i] / prices[i-1] - 1,  # Price change
-                    prices[i] / prices[i-5] - 1,  # 5-day change
-                    prices[i] / prices[i-10] - 1, # 10-day change
-                    prices[i] / prices[i-20] - 1, # 20-day change
-                    np.max(price_window) / prices[i] - 1,  # Distance from high
-                    prices[i] / np.min(price_window) - 1,  # Distance from low
-                ])
-                targets.append(1 if prices[i+1] > prices[i] else 0)
-            
-            if len(features) < 10:
+            result = fit_direction_model(prices)
+            if result is None:
                 return False
             
-            # Train model
-            X = np.array(features)
-            y = np.array(targets)
-            
-            self.scaler.fit(X)
-            X_scaled = self.scaler.transform(X)
-            
-            self.ml_model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.ml_model.fit(X_scaled, y)
-            
-            print(f"ML model trained for {coin} with {len(features)} samples")
+            model, scaler, n_samples = result
+            self._install_model(coin, model, scaler)
+            self._start_online_model(coin, prices)
+            print(f"ML model trained for {coin} with {n_samples} samples")
             return True
             
         except Exception as e:
             print(f"Error training ML model for {coin}: {e}")
             return False
     
-    def predict_price_direction(self, coin):
+    async def train_ml_model_async(self, coin, prices):
+        """Train the direction model in the process pool without blocking the event loop"""
+        if RandomForestRegressor is None or self.scaler is None:
+            print("ML components are unavailable; skipping model training.")
+            return False
+        if not prices or len(prices) < 20:
+            return False
+        
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), fit_direction_model, list(prices))
+        except Exception as e:
+            print(f"Error training ML model for {coin}: {e}")
+            return False
+        if result is None:
+            return False
+        
+        model, scaler, n_samples = result
+        self._install_model(coin, model, scaler)
+        self._start_online_model(coin, prices)
+        print(f"ML model trained for {coin} with {n_samples} samples")
+        return True
+    
+    def _start_online_model(self, coin, prices):
+        """Fit the online direction model on the closed bars the forest was trained on"""
+        if not self.strategy_config.get('online_learning', False):
+            return
+        X, y = build_direction_features(prices[:-1])
+        if len(X):
+            self.online_models[coin] = OnlineLogisticRegression().fit(X, y)
+            self._online_last_bar[coin] = prices[-2]
+    
+    def update_online_model(self, coin, prices):
+        """Learn the newest closed bar, if one closed since the last call; microseconds per bar"""
+        model = self.online_models.get(coin)
+        if model is None or len(prices) < 23 or prices[-2] == self._online_last_bar.get(coin):
+            return model
+        # prices[-1] is still moving; the newest labelled row ends at the last closed bar
+        X, y = build_direction_features(prices[-23:-1])
+        model.partial_fit(X[-1:], y[-1:])
+        self._online_last_bar[coin] = prices[-2]
+        return model
+    
+    def predict_price_direction(self, coin, prices=None):
         """Predict price direction using ML model"""
-        if not self.ml_model:
+        model = self.ml_models.get(coin)
+        if not model:
             return None
         
         try:
             # Get recent price data
-            hist_data = fetch_all_historical(coin.upper(), days=30)
-            if not hist_data or not hist_data.get('binance'):
-                return None
+            if prices is None:
+                hist_data = fetch_all_historical(coin.upper(), days=30)
+                if not hist_data or not hist_data.get('binance'):
+                    return None
+                prices = hist_data['binance']
             
-            prices = hist_data['binance']
             if len(prices) < 20:
                 return None
             
             # Create features for prediction
-            price_window = prices[-20:]
-            features = [[
-                np.mean(price_window),
-                np.std(price_window),
-                prices[-1] / prices[-2] - 1,
-                prices[-1] / prices[-6] - 1,
-                prices[-1] / prices[-11] - 1,
-                prices[-1] / prices[-20] - 1,
-                np.max(price_window) / prices[-1] - 1,
-                prices[-1] / np.min(price_window) - 1,
-            ]]
+            features = latest_direction_features(prices)
+            
+            X_scaled = self.scalers[coin].transform(features)
+            prediction = model.predict(X_scaled)[0]
             
-            X_scaled = self.scaler.transform(features)
-            prediction = self.ml_model.predict(X_scaled)[0]
+            # Blend in the online model, which has seen every bar since the forest was trained
+            online = self.update_online_model(coin, prices)
+            if online is not None:
+                weight = self.strategy_config.get('online_weight', 0.3)
+                prediction = (1 - weight) * prediction + weight * online.predict_proba(features)[0]
             
             return prediction
             
@@ -214,121 +408,176 @@ class AdvancedTradingBot:
             print(f"Error predicting price direction for {coin}: {e}")
             return None
     
-    async def run_advanced_strategy(self, coin):
-        """Execute advanced trading strategy with ML and sentiment analysis"""
-        while self.is_running:
-            try:
-                # Check risk limits
-                can_trade, reason = self.check_risk_limits()
-                if not can_trade:
-                    print(f"Risk limit check failed: {reason}")
-                    await asyncio.sleep(300)  # Wait 5 minutes
-                    continue
-                
-                # Get current market data
-                volumes = fetch_all_volumes(coin.upper())
-                current_price = fetch_price(coin)
-                
-                if not current_price:
-                    await asyncio.sleep(60)
-                    continue
+    async def run_strategy_iteration(self, coin):
+        """Run one pass of every enabled strategy for a coin.
+
+        Returns the number of seconds to wait before the next pass.
+        """
+        with self.timings.time('iteration'):
+            return await self._strategy_iteration(coin)
+    
+    async def _strategy_iteration(self, coin):
+        timings = self.timings
+        # Mark held coins through the shared hub so valuation never blocks on HTTP
+        with timings.time('fetch.portfolio_prices'):
+            await self.refresh_portfolio_prices()
+        
+        # Check risk limits
+        with timings.time('risk_checks'):
+            can_trade, reason = self.check_risk_limits()
+        if not can_trade:
+            print(f"Risk limit check failed: {reason}")
+            return 300  # Wait 5 minutes
+        
+        # Get current market data
+        with timings.time('fetch.volumes'):
+            volumes = await self.market_data.get_volumes(coin.upper()) or {}
+        with timings.time('fetch.price'):
+            current_price = await self.market_data.get_price(coin)
+        
+        if not current_price:
+            return 60
+        self.ledger.mark(coin, current_price)
+        if self.simulator is not None:
+            with timings.time('order_routing'):
+                self.settle_orders(coin, current_price)
+        if self.scheduler is not None:
+            self.scheduler.observe(coin, current_price, self.clock.time())
+        
+        # Strategy 1: ML-based prediction
+        if self.strategy_config.get('ml_enabled', False):
+            with timings.time('fetch.historical'):
+                ml_hist = await self.market_data.get_historical(coin.upper(), days=30)
+            ml_prices = ml_hist.get('binance') if ml_hist else None
+            if ml_prices:
+                if coin not in self.ml_models:
+                    with timings.time('ml_training'):
+                        await self.train_ml_model_async(coin, ml_prices)
                 
-                # Strategy 1: ML-based prediction
-                if self.strategy_config.get('ml_enabled', False):
-                    if not self.ml_model:
-                        self.train_ml_model(coin)
+                with timings.time('ml_inference'):
+                    prediction = self.predict_price_direction(coin, prices=ml_prices)
+                if prediction is not None:
+                    confidence = abs(prediction - 0.5) * 2  # Convert to 0-1 scale
                     
-                    if self.ml_model:
-                        prediction = self.predict_price_direction(coin)
-                        if prediction is not None:
-                            confidence = abs(prediction - 0.5) * 2  # Convert to 0-1 scale
-                            
-                            if prediction > 0.6:  # Strong buy signal
-                                position_size = self.calculate_position_size(coin, confidence)
-                                buy_amount = position_size / current_price
-                                if self.execute_buy(coin, buy_amount, current_price, f"ML prediction: {prediction:.3f}", confidence):
-                                    print(f"ML BUY: {buy_amount:.4f} {coin} (confidence: {confidence:.2f})")
-                            
-                            elif prediction < 0.4:  # Strong sell signal
-                                if coin in self.portfolio and self.portfolio[coin] > 0:
-                                    sell_amount = self.portfolio[coin] * 0.5  # Sell half position
-                                    if self.execute_sell(coin, sell_amount, current_price, f"ML prediction: {prediction:.3f}", confidence):
-                                        print(f"ML SELL: {sell_amount:.4f} {coin} (confidence: {confidence:.2f})")
-                
-                # Strategy 2: Sentiment-based trading
-                if self.strategy_config.get('sentiment_enabled', False):
-                    sentiment = fetch_market_sentiment_analysis(coin)
-                    if sentiment:
-                        sentiment_score = sentiment['composite_score']
-                        confidence = abs(sentiment_score)
-                        
-                        if sentiment_score > 0.4:  # Strong bullish sentiment
-                            position_size = self.calculate_position_size(coin, confidence)
-                            buy_amount = position_size / current_price
-                            if self.execute_buy(coin, buy_amount, current_price, f"Bullish sentiment: {sentiment_score:.3f}", confidence):
-                                print(f"SENTIMENT BUY: {buy_amount:.4f} {coin} (sentiment: {sentiment_score:.3f})")
-                        
-                        elif sentiment_score < -0.4:  # Strong bearish sentiment
-                            if coin in self.portfolio and self.portfolio[coin] > 0:
-                                sell_amount = self.portfolio[coin] * 0.5
-                                if self.execute_sell(coin, sell_amount, current_price, f"Bearish sentiment: {sentiment_score:.3f}", confidence):
-                                    print(f"SENTIMENT SELL: {sell_amount:.4f} {coin} (sentiment: {sentiment_score:.3f})")
-                
-                # Strategy 3: Volume spike detection
-                if self.strategy_config.get('volume_spike_enabled', False):
-                    for exchange, volume in volumes.items():
-                        if volume:
-                            hist = fetch_all_historical(coin.upper())
-                            if hist and hist.get(exchange):
-                                is_spike, ratio = detect_volume_spike(hist[exchange])
-                                if is_spike and ratio > self.strategy_config.get('spike_threshold', 2.0):
-                                    position_size = self.calculate_position_size(coin, min(ratio / 10, 0.8))
-                                    buy_amount = position_size / current_price
-                                    if self.execute_buy(coin, buy_amount, current_price, f"Volume spike on {exchange} ({ratio:.2f}x)", ratio / 10):
-                                        print(f"VOLUME BUY: {buy_amount:.4f} {coin} (spike: {ratio:.2f}x)")
-                
-                # Strategy 4: RSI-based trading
-                if self.strategy_config.get('rsi_enabled', False):
-                    hist = fetch_all_historical(coin.upper())
-                    if hist and hist.get('binance'):
-                        rsi = calculate_rsi(hist['binance'])
-                        if rsi:
-                            if rsi < 30:  # Oversold
-                                position_size = self.calculate_position_size(coin, 0.7)
-                                buy_amount = position_size / current_price
-                                if self.execute_buy(coin, buy_amount, current_price, f"RSI oversold: {rsi:.1f}", 0.7):
-                                    print(f"RSI BUY: {buy_amount:.4f} {coin} (RSI: {rsi:.1f})")
-                            
-                            elif rsi > 70:  # Overbought
-                                if coin in self.portfolio and self.portfolio[coin] > 0:
-                                    sell_amount = self.portfolio[coin] * 0.5
-                                    if self.execute_sell(coin, sell_amount, current_price, f"RSI overbought: {rsi:.1f}", 0.7):
-                                        print(f"RSI SELL: {sell_amount:.4f} {coin} (RSI: {rsi:.1f})")
-                
-                # Strategy 5: MACD-based trading
-                if self.strategy_config.get('macd_enabled', False):
-                    hist = fetch_all_historical(coin.upper())
-                    if hist and hist.get('binance'):
-                        macd, signal, hist_macd = calculate_macd(hist['binance'])
-                        if macd and signal:
-                            if macd > signal and macd > 0:  # Bullish crossover
-                                position_size = self.calculate_position_size(coin, 0.6)
-                                buy_amount = position_size / current_price
-                                if self.execute_buy(coin, buy_amount, current_price, f"MACD bullish: {macd:.3f}", 0.6):
-                                    print(f"MACD BUY: {buy_amount:.4f} {coin} (MACD: {macd:.3f})")
-                            
-                            elif macd < signal and macd < 0:  # Bearish crossover
-                                if coin in self.portfolio and self.portfolio[coin] > 0:
-                                    sell_amount = self.portfolio[coin] * 0.5
-                                    if self.execute_sell(coin, sell_amount, current_price, f"MACD bearish: {macd:.3f}", 0.6):
-                                        print(f"MACD SELL: {sell_amount:.4f} {coin} (MACD: {macd:.3f})")
-                
-                # Update daily PnL
-                self.update_daily_pnl()
+                    if prediction > 0.6:  # Strong buy signal
+                        position_size = self.calculate_position_size(coin, confidence)
+                        buy_amount = position_size / current_price
+                        if self.execute_buy(coin, buy_amount, current_price, f"ML prediction: {prediction:.3f}", confidence):
+                            print(f"ML BUY: {buy_amount:.4f} {coin} (confidence: {confidence:.2f})")
+                    
+                    elif prediction < 0.4:  # Strong sell signal
+                        if self.ledger.quantity(coin) > 0:
+                            sell_amount = self.ledger.quantity(coin) * 0.5  # Sell half position
+                            if self.execute_sell(coin, sell_amount, current_price, f"ML prediction: {prediction:.3f}", confidence):
+                                print(f"ML SELL: {sell_amount:.4f} {coin} (confidence: {confidence:.2f})")
+        
+        # Strategy 2: Sentiment-based trading
+        if self.strategy_config.get('sentiment_enabled', False):
+            # Blocking HTTP client with its own event loop; run it on a worker thread
+            loop = asyncio.get_running_loop()
+            with timings.time('fetch.sentiment'):
+                sentiment = await loop.run_in_executor(None, fetch_market_sentiment_analysis, coin)
+            if sentiment:
+                sentiment_score = sentiment['composite_score']
+                confidence = abs(sentiment_score)
                 
-                # Wait before next iteration
-                await asyncio.sleep(self.strategy_config.get('check_interval', 300))  # 5 minutes default
+                if sentiment_score > 0.4:  # Strong bullish sentiment
+                    position_size = self.calculate_position_size(coin, confidence)
+                    buy_amount = position_size / current_price
+                    if self.execute_buy(coin, buy_amount, current_price, f"Bullish sentiment: {sentiment_score:.3f}", confidence):
+                        print(f"SENTIMENT BUY: {buy_amount:.4f} {coin} (sentiment: {sentiment_score:.3f})")
                 
+                elif sentiment_score < -0.4:  # Strong bearish sentiment
+                    if self.ledger.quantity(coin) > 0:
+                        sell_amount = self.ledger.quantity(coin) * 0.5
+                        if self.execute_sell(coin, sell_amount, current_price, f"Bearish sentiment: {sentiment_score:.3f}", confidence):
+                            print(f"SENTIMENT SELL: {sell_amount:.4f} {coin} (sentiment: {sentiment_score:.3f})")
+        
+        # Strategies 3-5 share one (cached) history fetch
+        hist = None
+        if any(self.strategy_config.get(k, False) for k in ('volume_spike_enabled', 'rsi_enabled', 'macd_enabled')):
+            with timings.time('fetch.historical'):
+                hist = await self.market_data.get_historical(coin.upper())
+        
+        # Strategy 3: Volume spike detection
+        if self.strategy_config.get('volume_spike_enabled', False):
+            for exchange, volume in volumes.items():
+                if volume:
+                    if hist and hist.get(exchange):
+                        with timings.time('indicators'):
+                            is_spike, ratio = detect_volume_spike(hist[exchange])
+                        if is_spike and ratio > self.strategy_config.get('spike_threshold', 2.0):
+                            position_size = self.calculate_position_size(coin, min(ratio / 10, 0.8))
+                            buy_amount = position_size / current_price
+                            if self.execute_buy(coin, buy_amount, current_price, f"Volume spike on {exchange} ({ratio:.2f}x)", ratio / 10):
+                                print(f"VOLUME BUY: {buy_amount:.4f} {coin} (spike: {ratio:.2f}x)")
+        
+        # Strategy 4: RSI-based trading
+        if self.strategy_config.get('rsi_enabled', False):
+            if hist and hist.get('binance'):
+                with timings.time('indicators'):
+                    rsi = calculate_rsi(hist['binance'])
+                if rsi:
+                    if rsi < 30:  # Oversold
+                        position_size = self.calculate_position_size(coin, 0.7)
+                        buy_amount = position_size / current_price
+                        if self.execute_buy(coin, buy_amount, current_price, f"RSI oversold: {rsi:.1f}", 0.7):
+                            print(f"RSI BUY: {buy_amount:.4f} {coin} (RSI: {rsi:.1f})")
+                    
+                    elif rsi > 70:  # Overbought
+                        if self.ledger.quantity(coin) > 0:
+                            sell_amount = self.ledger.quantity(coin) * 0.5
+                            if self.execute_sell(coin, sell_amount, current_price, f"RSI overbought: {rsi:.1f}", 0.7):
+                                print(f"RSI SELL: {sell_amount:.4f} {coin} (RSI: {rsi:.1f})")
+        
+        # Strategy 5: MACD-based trading
+        if self.strategy_config.get('macd_enabled', False):
+            if hist and hist.get('binance'):
+                with timings.time('indicators'):
+                    macd, signal, hist_macd = calculate_macd(hist['binance'])
+                if macd and signal:
+                    if macd > signal and macd > 0:  # Bullish crossover
+                        position_size = self.calculate_position_size(coin, 0.6)
+                        buy_amount = position_size / current_price
+                        if self.execute_buy(coin, buy_amount, current_price, f"MACD bullish: {macd:.3f}", 0.6):
+                            print(f"MACD BUY: {buy_amount:.4f} {coin} (MACD: {macd:.3f})")
+                    
+                    elif macd < signal and macd < 0:  # Bearish crossover
+                        if self.ledger.quantity(coin) > 0:
+                            sell_amount = self.ledger.quantity(coin) * 0.5
+                            if self.execute_sell(coin, sell_amount, current_price, f"MACD bearish: {macd:.3f}", 0.6):
+                                print(f"MACD SELL: {sell_amount:.4f} {coin} (MACD: {macd:.3f})")
+        
+        # Update daily PnL
+        self.update_daily_pnl()
+        
+        # Periodic checkpoint; state is snapshotted here and pickled on a worker thread.
+        # A failed save is logged and retried after another interval, never raised.
+        if self.checkpointer is not None and self.checkpointer.due():
+            with timings.time('checkpoint'):
+                state = self.get_state()
+                await asyncio.get_running_loop().run_in_executor(None, self.checkpointer.maybe_save, lambda: state)
+        
+        if self.scheduler is not None:
+            self.scheduler.set_position(coin, self.ledger.quantity(coin) > 0)
+            return self.scheduler.mark_refreshed(coin, self.clock.time())
+        return self.strategy_config.get('check_interval', 300)  # 5 minutes default
+    
+    async def refresh_portfolio_prices(self):
+        """Fetch current prices for every held coin via the market data hub"""
+        held = [c for c, pos in self.ledger.positions.items() if pos.quantity > 0]
+        if held:
+            prices = await asyncio.gather(*(self.market_data.get_price(c) for c in held))
+            for c, price in zip(held, prices):
+                self.ledger.mark(c, price)
+    
+    async def run_advanced_strategy(self, coin):
+        """Execute advanced trading strategy with ML and sentiment analysis"""
+        self.loop_monitor.start()
+        while self.is_running:
+            try:
+                delay = await self.run_strategy_iteration(coin)
+                await asyncio.sleep(delay)
             except Exception as e:
                 print(f"Error in trading strategy: {e}")
                 await asyncio.sleep(60)
@@ -341,34 +590,101 @@ class AdvancedTradingBot:
         self.last_portfolio_value = current_value
     
     def get_performance_metrics(self):
-        """Get trading performance metrics"""
-        if not self.trade_history:
-            return {}
-        
-        total_trades = len(self.trade_history)
-        winning_trades = len([t for t in self.trade_history if t['action'] == 'SELL'])
-        total_pnl = self.get_portfolio_value() - 10000  # Starting value
-        
-        return {
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'win_rate': winning_trades / total_trades if total_trades > 0 else 0,
-            'total_pnl': total_pnl,
-            'total_return': (total_pnl / 10000) * 100,
+        """Get trading performance metrics from the ledger without any network calls"""
+        metrics = self.ledger.metrics()
+        metrics.update({
+            'total_trades': self.total_trades,
+            'daily_pnl': self.daily_pnl,
+            'positions': {coin: pos.to_dict() for coin, pos in self.ledger.positions.items() if pos.quantity > 0},
+            'loop_lag': self.loop_monitor.snapshot(),
+            'latency': self.timings.summary()
+        })
+        return metrics
+    
+    def export_metrics(self):
+        """Stage latency histograms in the Prometheus text format"""
+        return self.timings.prometheus()
+    
+    def get_state(self):
+        """Snapshot of everything needed for a warm restart"""
+        state = {
+            'ledger': self.ledger.to_state(),
             'daily_pnl': self.daily_pnl,
-            'portfolio_value': self.get_portfolio_value()
+            'last_reset': self.last_reset,
+            'last_portfolio_value': getattr(self, 'last_portfolio_value', None),
+            'total_trades': self.total_trades,
+            'trade_history': list(self.trade_history),
+            'ml_models': dict(self.ml_models),
+            'scalers': dict(self.scalers),
+            # Copied: the bot keeps updating them while a worker thread pickles the snapshot
+            'online_models': copy.deepcopy(self.online_models),
+            'online_last_bar': dict(self._online_last_bar),
         }
+        export_market_data = getattr(self.market_data, 'export_state', None)
+        if export_market_data is not None:
+            state['market_data'] = export_market_data()
+        return state
+    
+    def restore_state(self, state):
+        """Load a snapshot produced by get_state"""
+        self.ledger = PositionLedger.from_state(state['ledger'])
+        self.daily_pnl = state['daily_pnl']
+        self.last_reset = state['last_reset']
+        if state.get('last_portfolio_value') is not None:
+            self.last_portfolio_value = state['last_portfolio_value']
+        self.total_trades = state.get('total_trades', 0)
+        self.trade_history.clear()
+        self.trade_history.extend(state.get('trade_history', []))
+        for coin, model in state.get('ml_models', {}).items():
+            self._install_model(coin, model, state['scalers'][coin])
+        self.online_models.update(state.get('online_models', {}))
+        self._online_last_bar.update(state.get('online_last_bar', {}))
+        import_market_data = getattr(self.market_data, 'import_state', None)
+        if import_market_data is not None and state.get('market_data'):
+            import_market_data(state['market_data'])
     
-    def start(self, coin):
-        """Start the trading bot"""
+    def save_checkpoint(self):
+        """Write a checkpoint now. Returns its path, or None if checkpointing is disabled"""
+        if self.checkpointer is None:
+            return None
+        return self.checkpointer.save(self.get_state())
+    
+    def resume_from_checkpoint(self):
+        """Restore the latest checkpoint, if any. Returns True when state was restored"""
+        if self.checkpointer is None:
+            return False
+        state = self.checkpointer.load_latest()
+        if state is None:
+            print("No checkpoint found; starting fresh")
+            return False
+        self.restore_state(state)
+        age = time.time() - state['saved_at']
+        print(f"Resumed from checkpoint saved {age:.0f}s ago ({len(self.ml_models)} trained models)")
+        return True
+    
+    def start(self, coin, resume=False):
+        """Start the trading bot, optionally resuming from the latest checkpoint"""
+        if resume:
+            self.resume_from_checkpoint()
         self.is_running = True
         print(f"Starting advanced trading bot for {coin.upper()}")
         print(f"Initial portfolio value: ${self.get_portfolio_value():.2f}")
         asyncio.create_task(self.run_advanced_strategy(coin))
     
+    def close(self):
+        """Stop loop monitoring, shut down the training worker processes and flush the journal"""
+        self.loop_monitor.stop()
+        if self.journal is not None:
+            self.journal.flush()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
     def stop(self):
         """Stop the trading bot"""
         self.is_running = False
+        self.close()
+        self.save_checkpoint()
         print("Trading bot stopped")
         
         # Print final performance
@@ -385,8 +701,26 @@ def create_advanced_strategy_config():
         'volume_spike_enabled': True,
         'rsi_enabled': True,
         'macd_enabled': True,
+        'online_learning': True,  # Update an online direction model on every closed bar
+        'online_weight': 0.3,  # Its share of the blended ML direction signal
         'spike_threshold': 2.0,
         'check_interval': 300,  # 5 minutes
+        'journal_path': data_path('trade_journal.db', 'BOT_JOURNAL_PATH', legacy='trade_journal.db'),  # Persistent trade/fill audit trail
+        'trade_history_size': 1000,  # Recent trades kept in memory
+        'checkpoint_dir': data_path('checkpoints', 'BOT_CHECKPOINT_DIR', legacy='checkpoints'),  # Warm-restart snapshots
+        'checkpoint_interval': 300,  # seconds
+        'adaptive_polling': {  # Poll volatile or held coins faster than check_interval, quiet ones slower
+            'min_interval': 30,
+            'max_interval': 900,
+            'target_volatility': 0.005,  # per check_interval
+        },
+        'execution': {  # Demo-mode order book simulator
+            'maker_fee': 0.001,
+            'taker_fee': 0.001,
+            'latency': 0.05,  # seconds
+            'half_spread_bps': 5.0,
+            'depth_per_level': 50000.0  # USD per book level
+        },
         'risk_management': {
             'max_position_size': 0.1,
             'stop_loss': 0.05,
@@ -0,0 +1,172 @@
+"""
+Compiled inference for scikit-learn tree ensembles.
+
+compile_model() flattens a fitted RandomForestRegressor, ExtraTreesRegressor,
+DecisionTreeRegressor or GradientBoostingRegressor into one set of NumPy node
+arrays (feature, threshold, left/right child, leaf value) shared by all of its
+trees. CompiledTreeEnsemble.predict walks every tree for every row at once,
+one level per step, instead of going through sklearn's per-call validation and
+per-tree dispatch, which dominates the cost of predicting a single row.
+
+Multi-output forests keep one leaf value per output. A MultiOutputRegressor
+of boosters (one per forecast horizon) becomes a single ensemble whose trees
+each contribute only to their own output, so all horizons are predicted with
+one pass over the node arrays.
+
+Predictions match sklearn bit for bit: inputs are compared as float32, like
+sklearn's trees do, and per-tree outputs are accumulated in the same order
+(the zeros a booster tree adds to the other outputs leave them unchanged).
+The compiled form drops everything only needed for fitting (impurities,
+sample counts, ...), so pickled artifacts are also much smaller.
+"""
+import numpy as np
+
+TREE_LEAF = -1
+
+
+class CompiledTreeEnsemble:
+    """Flattened tree ensemble with a vectorized predict.
+
+    Regression forests average their trees; boosted ensembles return
+    base + learning_rate * sum of their trees. value, base and learning_rate
+    have a trailing outputs axis for multi-output ensembles.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth, n_features,
+                 average=True, learning_rate=1.0, base=0.0, source=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.n_features_in_ = n_features
+        self.average = average
+        self.learning_rate = learning_rate
+        self.base = base
+        self.source = source
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn's trees split on float32 inputs; compare the same values
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        nodes = np.tile(self.roots, (len(X), 1))
+        flat = nodes.reshape(-1)
+        values = np.ascontiguousarray(X).reshape(-1)
+        # Offset of each pair's row in the flattened inputs
+        rows = np.repeat(np.arange(0, values.size, X.shape[1]), self.n_trees)
+        # (row, tree) pairs still at a split; leaves point at themselves, so a pair stops moving there
+        active = np.arange(flat.size)
+        for _ in range(self.depth):
+            current = flat[active]
+            go_left = values[rows[active] + self.feature[current]] <= self.threshold[current]
+            step = np.where(go_left, self.left[current], self.right[current])
+            flat[active] = step
+            active = active[step != current]
+            if not active.size:
+                break
+        return nodes
+
+    def predict(self, X):
+        leaves = self.value[self.apply(X)]
+        if self.average:
+            # sklearn sums trees one after another (from zero), then divides
+            return np.cumsum(leaves, axis=1)[:, -1] / self.n_trees
+        steps = np.empty((leaves.shape[0], self.n_trees + 1) + leaves.shape[2:])
+        steps[:, 0] = self.base
+        steps[:, 1:] = self.learning_rate * leaves
+        return np.cumsum(steps, axis=1)[:, -1]
+
+
+def _flatten(trees, outputs=None, n_outputs=None):
+    """Concatenate sklearn Tree objects into shared node arrays.
+
+    With outputs (the output index of each single-output tree) the leaf values
+    are laid out as (nodes, n_outputs), zero outside each tree's own output.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for i, tree in enumerate(trees):
+        if tree.value.shape[2] != 1:
+            raise ValueError('Only regression trees can be compiled')
+        n = tree.node_count
+        is_leaf = tree.children_left == TREE_LEAF
+        own = np.arange(offset, offset + n, dtype=np.int32)
+        left.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        if outputs is not None:
+            leaf_values = np.zeros((n, n_outputs))
+            leaf_values[:, outputs[i]] = tree.value[:, 0, 0]
+            value.append(leaf_values)
+        elif tree.value.shape[1] == 1:
+            value.append(tree.value[:, 0, 0].astype(np.float64))
+        else:
+            value.append(tree.value[:, :, 0].astype(np.float64))
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += n
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'value': np.concatenate(value),
+        'roots': np.array(roots, dtype=np.int32),
+        'depth': depth,
+    }
+
+
+def _boosting_base(model):
+    init = model.init_
+    if isinstance(init, str) and init == 'zero':
+        return 0.0
+    constant = getattr(init, 'constant_', None)
+    if constant is None or np.size(constant) != 1:
+        raise ValueError(f"Unsupported GradientBoosting init estimator: {init!r}")
+    return float(np.ravel(constant)[0])
+
+
+def compile_model(model):
+    """Compiled version of a fitted tree regressor, or model itself if it is not one.
+
+    Already compiled models are returned unchanged.
+    """
+    name = type(model).__name__
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        arrays = _flatten(e.tree_ for e in model.estimators_)
+        return CompiledTreeEnsemble(n_features=model.n_features_in_, source=name, **arrays)
+    if name == 'DecisionTreeRegressor':
+        arrays = _flatten([model.tree_])
+        return CompiledTreeEnsemble(n_features=model.n_features_in_, source=name, **arrays)
+    if name == 'GradientBoostingRegressor':
+        arrays = _flatten(e.tree_ for e in model.estimators_[:, 0])
+        return CompiledTreeEnsemble(n_features=model.n_features_in_, average=False,
+                                    learning_rate=model.learning_rate, base=_boosting_base(model),
+                                    source=name, **arrays)
+    if name == 'MultiOutputRegressor' and all(
+            type(e).__name__ == 'GradientBoostingRegressor' for e in model.estimators_):
+        boosters = model.estimators_
+        trees = [stage.tree_ for booster in boosters for stage in booster.estimators_[:, 0]]
+        outputs = [k for k, booster in enumerate(boosters) for _ in range(len(booster.estimators_))]
+        arrays = _flatten(trees, outputs, len(boosters))
+        return CompiledTreeEnsemble(n_features=boosters[0].n_features_in_, average=False,
+                                    learning_rate=np.array([b.learning_rate for b in boosters], dtype=float),
+                                    base=np.array([_boosting_base(b) for b in boosters]),
+                                    source=name, **arrays)
+    return model
@@ -25,6 +25,21 @@ def safe_getenv(name: str, default: Optional[str] = None, required: bool = False
     return value
 
 
+def data_path(name: str, env: Optional[str] = None, legacy: Optional[str] = None) -> str:
+    """
+    Path of a runtime data file or directory (journal, checkpoints, models, ...).
+
+    The environment variable env overrides it; otherwise it is name inside
+    DATA_DIR (default: data). legacy is where the data lived before DATA_DIR;
+    it is still used while it exists so earlier data is not orphaned.
+    """
+    if env and os.environ.get(env):
+        return os.environ[env]
+    if legacy and os.path.exists(legacy):
+        return legacy
+    return os.path.join(os.environ.get('DATA_DIR', 'data'), name)
+
+
 def generate_secret_key() -> str:
     """Generate a secure secret key for Flask."""
     return secrets.token_hex(32)
@@ -0,0 +1,242 @@
+"""
+Walk-forward training for the price prediction ensemble.
+
+walk_forward() fits a model on an initial block of rows and then steps through
+the rest in order: each step's rows are predicted first (so every error is
+out-of-sample) and only then folded into the model. Windows are expanding by
+default, or rolling with window=N rows.
+
+Updates are incremental rather than refits from zero:
+
+- forests (warm_start) grow trees_per_step new trees fitted on the current
+  window, dropping their oldest trees beyond max_trees;
+- gradient boosting (warm_start) adds trees_per_step stages fitted on the
+  current window, and is refit once it would exceed max_trees stages;
+- MultiOutputRegressor (one booster per forecast horizon) advances each of
+  its estimators on its own target column;
+- IncrementalLinearRegression adds the new rows to (and, for rolling windows,
+  removes old rows from) running least-squares statistics;
+- other models with partial_fit (the online models) just learn the new rows.
+
+The same advance() step is used by CryptoPricePredictor.update_models to fold
+newly arrived days into the current models instead of retraining them, and
+walk_forward_predictions() gives the backtester (advanced_backtest.py) an
+out-of-sample prediction for every row.
+"""
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble._forest import BaseForest
+from sklearn.multioutput import MultiOutputRegressor
+
+
+class IncrementalLinearRegression:
+    """Ordinary least squares over running, mergeable sufficient statistics.
+
+    partial_fit adds rows and forget removes them in O(batch * features^2),
+    independent of how many rows the model has already seen. The solution is
+    computed on standardized statistics, so no separate scaler is needed.
+    y may have several columns (e.g. one per forecast horizon).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = None
+        self.mean_y = 0.0
+        self.cxx = None
+        self.cxy = None
+        self.coef_ = None
+        self.intercept_ = 0.0
+
+    @property
+    def n_features_in_(self):
+        return None if self.mean_x is None else len(self.mean_x)
+
+    def fit(self, X, y):
+        self.__init__()
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y):
+        return self._merge(X, y, 1)
+
+    def forget(self, X, y):
+        """Remove rows previously passed to fit/partial_fit."""
+        return self._merge(X, y, -1)
+
+    def _merge(self, X, y, sign):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(X) == 0:
+            return self
+        nb = len(X)
+        mean_xb = X.mean(axis=0)
+        mean_yb = y.mean(axis=0)
+        Xc = X - mean_xb
+        cxx_b = Xc.T @ Xc
+        cxy_b = Xc.T @ (y - mean_yb)
+        if self.n == 0:
+            if sign < 0:
+                raise ValueError('Cannot forget rows from an empty model')
+            self.n, self.mean_x, self.mean_y, self.cxx, self.cxy = nb, mean_xb, mean_yb, cxx_b, cxy_b
+        elif sign > 0:
+            n = self.n + nb
+            dx = mean_xb - self.mean_x
+            dy = mean_yb - self.mean_y
+            weight = self.n * nb / n
+            self.cxx = self.cxx + cxx_b + np.outer(dx, dx) * weight
+            self.cxy = self.cxy + cxy_b + np.multiply.outer(dx, dy) * weight
+            self.mean_x = self.mean_x + dx * nb / n
+            self.mean_y = self.mean_y + dy * nb / n
+            self.n = n
+        else:
+            n = self.n - nb
+            if n <= 0:
+                self.__init__()
+                return self
+            # Statistics of the remaining rows, inverting the merge above
+            mean_x = (self.n * self.mean_x - nb * mean_xb) / n
+            mean_y = (self.n * self.mean_y - nb * mean_yb) / n
+            dx = mean_xb - mean_x
+            dy = mean_yb - mean_y
+            weight = n * nb / self.n
+            self.cxx = self.cxx - cxx_b - np.outer(dx, dx) * weight
+            self.cxy = self.cxy - cxy_b - np.multiply.outer(dx, dy) * weight
+            self.mean_x, self.mean_y, self.n = mean_x, mean_y, n
+        self._solve()
+        return self
+
+    def _solve(self):
+        scale = np.sqrt(np.clip(np.diag(self.cxx), 0, None))
+        varying = scale > 1e-12 * max(scale.max(), 1.0)
+        coef = np.zeros(self.cxy.shape)
+        if varying.any():
+            s = scale[varying]
+            corr = self.cxx[np.ix_(varying, varying)] / np.outer(s, s)
+            s_col = s.reshape((-1,) + (1,) * (self.cxy.ndim - 1))
+            coef[varying] = np.linalg.lstsq(corr, self.cxy[varying] / s_col, rcond=None)[0] / s_col
+        self.coef_ = coef
+        self.intercept_ = self.mean_y - self.mean_x @ coef
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
+
+
+class ForecastErrors:
+    """Running out-of-sample error sums, mergeable and JSON-serializable.
+
+    Targets with several columns (forecast horizons) keep per-column sums;
+    metrics() pools them and adds per-column rmse_by_horizon and r2_by_horizon.
+    """
+
+    def __init__(self, n=0, sse=0.0, sae=0.0, sy=0.0, syy=0.0):
+        self.n = n
+        self.sse = np.asarray(sse, dtype=float)
+        self.sae = np.asarray(sae, dtype=float)
+        self.sy = np.asarray(sy, dtype=float)
+        self.syy = np.asarray(syy, dtype=float)
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=float)
+        err = y_true - np.asarray(y_pred, dtype=float).reshape(y_true.shape)
+        self.n += len(y_true)
+        self.sse = self.sse + (err ** 2).sum(axis=0)
+        self.sae = self.sae + np.abs(err).sum(axis=0)
+        self.sy = self.sy + y_true.sum(axis=0)
+        self.syy = self.syy + (y_true ** 2).sum(axis=0)
+
+    def metrics(self):
+        """mse/mae/r2/rmse in the shape of CryptoPricePredictor.model_performance."""
+        if not self.n:
+            return {'mse': np.nan, 'mae': np.nan, 'r2': 0.0, 'rmse': np.nan, 'oos': self.to_dict()}
+        count = self.n * self.sse.size
+        mse = float(self.sse.sum()) / count
+        ss_tot = float((self.syy - self.sy ** 2 / self.n).sum())
+        metrics = {
+            'mse': mse,
+            'mae': float(self.sae.sum()) / count,
+            'r2': 1 - float(self.sse.sum()) / ss_tot if ss_tot > 0 else 0.0,
+            'rmse': float(np.sqrt(mse)),
+            'oos': self.to_dict(),
+        }
+        if self.sse.ndim:
+            metrics['rmse_by_horizon'] = np.sqrt(self.sse / self.n).tolist()
+            ss_tot_by_horizon = self.syy - self.sy ** 2 / self.n
+            metrics['r2_by_horizon'] = [1 - sse / ss if ss > 0 else 0.0
+                                        for sse, ss in zip(self.sse.tolist(), ss_tot_by_horizon.tolist())]
+        return metrics
+
+    def to_dict(self):
+        return {'n': self.n, 'sse': self.sse.tolist(), 'sae': self.sae.tolist(), 'sy': self.sy.tolist(),
+                'syy': self.syy.tolist()}
+
+    @classmethod
+    def from_metrics(cls, metrics):
+        """Errors stored by metrics(), or empty ones for metrics without them."""
+        return cls(**(metrics or {}).get('oos', {}))
+
+
+def advance(model, X, y, start, end, new_end, window=None, trees_per_step=10, max_trees=300):
+    """Fold rows [end, new_end) into model, fitted so far on rows [start, end).
+
+    Returns the start of the new training window.
+    """
+    new_start = start if window is None else max(start, new_end - window)
+    if new_end <= end:
+        return new_start
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X[end:new_end], y[end:new_end])
+        if new_start > start and hasattr(model, 'forget'):
+            model.forget(X[start:new_start], y[start:new_start])
+    elif isinstance(model, BaseForest):
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees_per_step)
+        model.fit(X[new_start:new_end], y[new_start:new_end])
+        if len(model.estimators_) > max_trees:
+            # Oldest trees saw the oldest data
+            model.estimators_ = model.estimators_[-max_trees:]
+            model.set_params(n_estimators=max_trees)
+    elif isinstance(model, MultiOutputRegressor):
+        for k, estimator in enumerate(model.estimators_):
+            advance(estimator, X, y[:, k], start, end, new_end, window, trees_per_step, max_trees)
+    elif isinstance(model, GradientBoostingRegressor):
+        stages = len(model.estimators_) + trees_per_step
+        if stages > max_trees:
+            model.set_params(warm_start=False, n_estimators=max(max_trees // 3, trees_per_step))
+        else:
+            model.set_params(warm_start=True, n_estimators=stages)
+        model.fit(X[new_start:new_end], y[new_start:new_end])
+    else:
+        model.fit(X[new_start:new_end], y[new_start:new_end])
+    return new_start
+
+
+def walk_forward_predictions(model, X, y, initial=None, step=5, window=None, trees_per_step=10, max_trees=300):
+    """Walk-forward fit of model over X, y (oldest first), keeping its predictions.
+
+    Returns (out-of-sample prediction for every row, NaN for the initial
+    block the model was first fitted on; model fitted through the last row;
+    index of the first predicted row; start row of the final training window).
+    """
+    n = len(X)
+    initial = min(initial or max(20, int(n * 0.6)), n)
+    start = 0 if window is None else max(0, initial - window)
+    model.fit(X[start:initial], y[start:initial])
+    predictions = np.full(np.shape(y), np.nan)
+    end = initial
+    while end < n:
+        new_end = min(end + step, n)
+        predictions[end:new_end] = np.reshape(model.predict(X[end:new_end]), predictions[end:new_end].shape)
+        start = advance(model, X, y, start, end, new_end, window, trees_per_step, max_trees)
+        end = new_end
+    return predictions, model, initial, start
+
+
+def walk_forward(model, X, y, initial=None, step=5, window=None, trees_per_step=10, max_trees=300):
+    """Fit model walk-forward over X, y (oldest first).
+
+    Returns (model fitted through the last row, ForecastErrors of the
+    out-of-sample predictions, start row of the final training window).
+    """
+    predictions, model, initial, start = walk_forward_predictions(
+        model, X, y, initial, step, window, trees_per_step, max_trees)
+    errors = ForecastErrors()
+    errors.update(y[initial:], predictions[initial:])
+    return model, errors, start
@@ -5,6 +5,7 @@ from fetch_volume import (
     detect_volume_spike, calculate_price_volume_correlation
 )
 from trading_bot import TradingBot, create_strategy_config
+from utils import data_path
 from functools import wraps
 import plotly.graph_objs as go
 import plotly.offline as pyo
@@ -1780,6 +1781,30 @@ def api_backtest():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/bot/trades')
+@login_required
+def api_bot_trades():
+    """Query the trading bot's persisted trade journal by coin and time range"""
+    try:
+        from trade_journal import TradeJournal
+        journal_path = data_path('trade_journal.db', 'BOT_JOURNAL_PATH', legacy='trade_journal.db')
+        if not os.path.exists(journal_path):
+            return jsonify({'trades': [], 'count': 0})
+        
+        journal = TradeJournal(journal_path, read_only=True)
+        limit = min(int(request.args.get('limit', 200)), 5000)
+        trades = journal.query_trades(
+            coin=request.args.get('coin'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            limit=limit
+        )
+        return jsonify({'trades': trades, 'count': len(trades)})
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/changelog')
 @login_required
 def changelog():
@@ -5232,9 +5257,10 @@ def changelog():
     def ml_predictions_dashboard():
         """Machine Learning Predictions Dashboard"""
     try:
-        from ml_predictions import CryptoPricePredictor
+        from inference_batcher import get_prediction_batcher
 
-        predictor = CryptoPricePredictor()
+        # Shared across requests: concurrent page loads are coalesced into batched predictions
+        batcher = get_prediction_batcher()
         predictions = {}
 
         # Get user's favorite coins
@@ -5242,20 +5268,20 @@ def changelog():
         if user_favorites and user_favorites[0]:
             favorites = json.loads(user_favorites[0])
 
-            for coin in favorites[:5]:  # Limit to 5 coins
+            pending = {coin: batcher.submit(coin.lower()) for coin in favorites[:5]}  # Limit to 5 coins
+            for coin, future in pending.items():
                 try:
-                    # Try to load existing models
-                    if predictor.load_models(coin):
-                        prediction = predictor.predict_price(coin)
-                        if prediction:
-                            confidence = predictor.get_prediction_confidence(coin)
-                            predictions[coin] = {
-                                'current_price': prediction['current_price'],
-                                'predicted_price': prediction['predicted_price'],
-                                'predicted_change': prediction['predicted_change'],
-                                'confidence': confidence,
-                                'individual_predictions': prediction['individual_predictions']
-                            }
+                    prediction = future.result(timeout=30)
+                    if prediction:
+                        predictions[coin] = {
+                            'current_price': prediction['current_price'],
+                            'predicted_price': prediction['predicted_price'],
+                            'predicted_change': prediction['predicted_change'],
+                            'confidence': prediction['confidence'],
+                            'individual_predictions': prediction['individual_predictions'],
+                            'forecast': [{'days_ahead': point['days_ahead'], 'predicted_price': point['predicted_price']}
+                                         for point in prediction.get('forecast', [])]
+                        }
                 except Exception as e:
                     print(f"Error predicting {coin}: {e}")
     except ImportError:
@@ -5324,6 +5350,10 @@ def changelog():
                                                                 Confidence: {{ "{:.1%}".format(pred.confidence) }}
                                                             </small>
                                                         </div>
+                                                        {% if pred.forecast|length > 1 %}
+                                                        <div id="forecast-{{ loop.index }}" class="forecast-chart mt-2" style="height: 160px;"
+                                                             data-current="{{ pred.current_price }}" data-forecast='{{ pred.forecast|tojson }}'></div>
+                                                        {% endif %}
                                                     </div>
                                                 </div>
                                             </div>
@@ -5375,6 +5405,21 @@ def changelog():
             
                 <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
                 <script>
+                    // Forecast curve: today's price followed by each forecast horizon
+                    document.querySelectorAll('.forecast-chart').forEach(function(el) {
+                        const forecast = JSON.parse(el.dataset.forecast);
+                        Plotly.newPlot(el, [{
+                            x: [0].concat(forecast.map(p => p.days_ahead)),
+                            y: [parseFloat(el.dataset.current)].concat(forecast.map(p => p.predicted_price)),
+                            mode: 'lines+markers',
+                            line: {color: '#007bff'}
+                        }], {
+                            margin: {l: 50, r: 10, t: 10, b: 30},
+                            xaxis: {title: 'Days ahead', dtick: 1},
+                            showlegend: false
+                        }, {displayModeBar: false, responsive: true});
+                    });
+
                     // Auto-refresh every 5 minutes
                     setTimeout(function() {
                         location.reload();